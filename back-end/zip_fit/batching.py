@@ -0,0 +1,127 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    동시에 들어온 여러 요청의 입력을 잠깐(max_wait_ms) 모아 한 번의 모델 호출로 처리합니다.
+    - submit(items)는 입력 순서대로 정렬된 결과 배열(점수/임베딩 행)을 갖는 Future를 반환합니다.
+    - 모델 호출은 전용 스레드(workers개)에서만 실행하여 요청끼리 CPU 스레드를 다투지 않도록 합니다.
+    - sort_key를 주면 묶은 입력을 길이순으로 정렬해 모델 내부 배치의 패딩을 줄이고, 결과는 원래 순서로 되돌립니다.
+    (reranker.rerank_batcher, embedding 서비스에서 사용)
+    """
+
+    def __init__(self, name: str, predict: Callable[[List[Any]], np.ndarray],
+                 max_wait_ms: float, max_batch_items: int, workers: int = 1,
+                 initializer: Callable = None, initargs: tuple = (),
+                 sort_key: Optional[Callable[[Any], int]] = None):
+        self.name = name
+        self.predict = predict
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_items = max_batch_items
+        self.workers = workers
+        self.sort_key = sort_key
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=name,
+            initializer=initializer, initargs=initargs
+        )
+        self._loop = None
+        self._pending: "deque[tuple]" = deque()
+        self._inflight = set()
+        self.requests = 0
+        self.batches = 0
+        self.items = 0
+        self.max_batch = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # 이벤트 루프별로 스케줄러 작업을 하나씩 둡니다. (벤치마크처럼 asyncio.run을 여러 번 호출하는 경우 대비)
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._scheduler = loop.create_task(self._run())
+
+    def submit(self, items: List[Any]) -> "asyncio.Future":
+        self._ensure_started()
+        future = self._loop.create_future()
+        if not items:
+            future.set_result(np.array([], dtype=np.float32))
+            return future
+        self.requests += 1
+        self._pending.append((items, future))
+        self._wakeup.set()
+        return future
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # 첫 요청 도착 후 max_wait 동안 다른 요청을 기다림 (이미 가득 찼으면 바로 실행)
+            if self.max_wait > 0 and sum(len(items) for items, _ in self._pending) < self.max_batch_items:
+                await asyncio.sleep(self.max_wait)
+
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch_items):
+                items, future = self._pending.popleft()
+                if future.cancelled():
+                    continue
+                batch.append((items, future))
+                size += len(items)
+            if not batch:
+                continue
+
+            await self._slots.acquire()
+            task = self._loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[tuple]):
+        try:
+            items = [item for request_items, _ in batch for item in request_items]
+            if self.sort_key is not None:
+                order = sorted(range(len(items)), key=lambda i: self.sort_key(items[i]))
+                sorted_results = await self._loop.run_in_executor(self._executor, self.predict, [items[i] for i in order])
+                sorted_results = np.asarray(sorted_results)
+                results = np.empty_like(sorted_results)
+                results[order] = sorted_results
+            else:
+                results = np.asarray(await self._loop.run_in_executor(self._executor, self.predict, items))
+
+            self.batches += 1
+            self.items += len(items)
+            self.max_batch = max(self.max_batch, len(items))
+
+            offset = 0
+            for request_items, future in batch:
+                if not future.done():
+                    future.set_result(results[offset:offset + len(request_items)])
+                offset += len(request_items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_items': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'max_batch_items': self.max_batch,
+            'pending': len(self._pending),
+            'max_wait_ms': self.max_wait * 1000,
+            'workers': self.workers,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,79 @@
+"""
+키워드 검색 벤치마크 (LIKE vs pg_trgm)
+- 현재 DB의 document_chunks 전체를 대상으로 검색 지연시간과 재현율을 비교합니다.
+- 재현율 기준(정답 집합): LIKE '%kw%' 로 매칭되는 전체 청크
+- migrations/001_chunk_text_trgm.sql 적용 후 실행하세요.
+
+실행: python bench_keyword_search.py [반복횟수] [top_k]
+"""
+import sys
+import time
+import asyncio
+import statistics
+from dependencies import init_db_pool, close_db_pool, acquire_connection
+import gongo
+
+# llm_handler 재구성 프롬프트가 만드는 키워드 묶음 + docs/06 테스트 케이스 키워드
+KEYWORD_SETS = [
+    ["수원시", "행복주택", "공고"],
+    ["수원매산", "A1블록", "행복주택", "신청자격", "자격요건", "입주자격", "소득", "자산", "무주택", "세대구성원"],
+    ["우선공급", "배점", "점수", "선정", "순위", "평가", "경쟁", "추첨", "우선"],
+    ["접수기간", "일정", "신청일", "기간", "발표", "당첨", "서류제출", "계약"],
+    ["임대료", "보증금", "금액", "임대보증금", "월임대료", "전환보증금"],
+    ["계약면적", "전용면적", "공급면적", "주거공용", "㎡", "평", "주택형", "타입"],
+]
+
+
+async def _all_like_matches(keywords) -> set:
+    """LIKE 기준 전체 매칭 청크 ID (재현율 정답 집합)"""
+    params = []
+    match_sql, _ = gongo._build_keyword_sql(keywords, params, mode='like')
+    async with acquire_connection() as conn:
+        rows = await conn.fetch(f"SELECT dc.id FROM document_chunks dc WHERE {match_sql}", *params)
+    return {r['id'] for r in rows}
+
+
+async def _timed_search(keywords, mode: str, top_k: int, repeat: int):
+    latencies = []
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = await gongo.keyword_search(keywords, top_k=top_k, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+async def main(repeat: int = 5, top_k: int = 50):
+    await init_db_pool()
+    try:
+        async with acquire_connection() as conn:
+            total = await conn.fetchval("SELECT count(*) FROM document_chunks")
+        print(f"[Bench] document_chunks: {total}건, 반복: {repeat}, top_k: {top_k}\n")
+        print(f"{'keywords':<28}{'mode':<6}{'p50(ms)':>10}{'max(ms)':>10}{'hits':>6}{'precision':>11}{'recall':>8}")
+
+        summary = {'like': [], 'trgm': []}
+        for keywords in KEYWORD_SETS:
+            truth = await _all_like_matches(keywords)
+            label = ",".join(keywords)[:26]
+            for mode in ('like', 'trgm'):
+                results, latencies = await _timed_search(keywords, mode, top_k, repeat)
+                ids = {r['chunk_id'] for r in results}
+                precision = len(ids & truth) / len(ids) if ids else 0.0
+                # top_k 로 잘린 상태에서 얻을 수 있는 최대 재현율 기준
+                recall = len(ids & truth) / min(len(truth), top_k) if truth else 1.0
+                p50 = statistics.median(latencies)
+                summary[mode].append(p50)
+                print(f"{label:<28}{mode:<6}{p50:>10.1f}{max(latencies):>10.1f}{len(ids):>6}{precision:>11.2f}{recall:>8.2f}")
+
+        print()
+        for mode, values in summary.items():
+            print(f"[Bench] {mode} 평균 p50: {statistics.mean(values):.1f} ms")
+    finally:
+        await close_db_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    ))
@@ -0,0 +1,592 @@
+"""
+RAG 파이프라인 오프라인 벤치마크 (chatting.chat_service)
+- OpenAI: 녹화(record)한 응답을 재생하는 가짜 AsyncOpenAI 클라이언트 사용 (녹화에 없으면 규칙 기반 합성 응답)
+- DB: 로컬 픽스처 코퍼스(JSONL)를 메모리에서 검색 (multi_query_hybrid_search와 같은 RRF 융합)
+- 임베딩/Reranker: 실제 로컬 모델 사용 (측정 대상)
+- 질문: docs/06 TC-01~04 + lab/김종민/RAG_테스트_*.csv
+- 결과: 단계별 p50/p95, 동시 사용자 수(N)별 처리량, 최대 RSS
+
+실행 순서:
+  1) python bench_pipeline.py export [--match 수원 --limit 50]   # 라이브 DB -> bench_fixtures/corpus.jsonl
+     또는 python bench_pipeline.py generate [--limit 50 --seed 0] # DB 없이 합성 공고 코퍼스 생성 (같은 seed면 같은 코퍼스)
+  2) python bench_pipeline.py record                              # 실제 OpenAI 응답 녹화 -> bench_fixtures/llm_recordings.json
+  3) python bench_pipeline.py run [--users 1,4,16 --repeat 2 --latency-scale 0]
+
+--latency-scale: 녹화된 LLM 지연시간 재생 배율 (0이면 LLM 대기 없이 파이프라인 자체 비용만 측정)
+"""
+import re
+import io
+import csv
+import random
+import sys
+import glob
+import json
+import math
+import time
+import asyncio
+import hashlib
+import argparse
+import statistics
+import contextlib
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+import config
+import dependencies
+import embedding
+import gongo
+import chatting
+import llm_handler
+import metrics
+
+FIXTURE_DIR = Path(__file__).parent / 'bench_fixtures'
+CORPUS_PATH = FIXTURE_DIR / 'corpus.jsonl'
+RECORDINGS_PATH = FIXTURE_DIR / 'llm_recordings.json'
+CSV_GLOB = str(config.PROJECT_ROOT / 'lab' / '김종민' / 'RAG_테스트_*.csv')
+
+# docs/06_테스트_계획_및_결과_보고서.md 테스트 케이스
+TEST_CASES = [
+    ("TC-01", "수원시 행복주택 공고 알려줘"),
+    ("TC-02", "수원매산 A1블록 행복주택 신청자격 알려줘"),
+    ("TC-03", "수원매산 A1블록 행복주택 우선공급 선정기준 알려줘"),
+    ("TC-04", "수원매산 A1블록 행복주택 어느 지역 사람이 신청할 수 있어?"),
+]
+
+# 노트북 CSV 컬럼 -> 파이프라인 단계 (기준값 비교용)
+CSV_STAGES = {
+    '재구성': 'rewrite', '멀티쿼리': 'multi_query', '검색': 'retrieval', '리랭킹': 'rerank',
+    '병합': 'merge', '컨텍스트': 'context_build', '답변': 'generation', '총시간': 'total',
+}
+
+
+# 1. 질문 세트
+def load_queries() -> List[tuple]:
+    """TC 질문 + CSV 질문 (중복 제거, 순서 유지)"""
+    queries = list(TEST_CASES)
+    for path in sorted(glob.glob(CSV_GLOB)):
+        with open(path, encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                if row.get('질문'):
+                    queries.append((row.get('TC', Path(path).stem), row['질문']))
+    seen, unique = set(), []
+    for tc, q in queries:
+        if q not in seen:
+            unique.append((tc, q))
+            seen.add(q)
+    return unique
+
+def load_csv_baseline() -> Dict[str, List[float]]:
+    """노트북(라이브 OpenAI/Postgres)에서 측정한 단계별 시간"""
+    baseline: Dict[str, List[float]] = {}
+    for path in sorted(glob.glob(CSV_GLOB)):
+        with open(path, encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                for column, stage in CSV_STAGES.items():
+                    try:
+                        baseline.setdefault(stage, []).append(float(row[column]))
+                    except (KeyError, TypeError, ValueError):
+                        pass
+    return baseline
+
+
+# 2. 녹화/재생 OpenAI 클라이언트
+def _request_key(kwargs: Dict) -> str:
+    """모델 + 메시지 + 응답 형식 + 스트리밍 여부로 요청을 식별합니다."""
+    response_format = kwargs.get('response_format') or {}
+    payload = {
+        'model': kwargs.get('model'),
+        'messages': kwargs.get('messages'),
+        'response_format': response_format.get('type'),
+        'stream': bool(kwargs.get('stream')),
+    }
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def _stream_chunk(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class _FakeStream:
+    """AsyncOpenAI 스트리밍 응답과 같은 async iterator"""
+
+    def __init__(self, chunks: List[str], ttft: float, interval: float):
+        self._chunks = chunks
+        self._ttft = ttft
+        self._interval = interval
+
+    async def __aiter__(self):
+        for i, chunk in enumerate(self._chunks):
+            delay = self._ttft if i == 0 else self._interval
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield _stream_chunk(chunk)
+
+
+class FakeAsyncOpenAI:
+    """
+    녹화된 응답을 재생하는 AsyncOpenAI 대체 클라이언트
+    (client.chat.completions.create 만 지원, llm_handler가 사용하는 형태와 동일)
+    """
+
+    def __init__(self, recordings: Dict[str, Dict], latency_scale: float = 0.0):
+        self.recordings = recordings
+        self.latency_scale = latency_scale
+        self.hits = 0
+        self.misses = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        record = self.recordings.get(_request_key(kwargs))
+        if record is None:
+            self.misses += 1
+            record = _synthesize(kwargs)
+        else:
+            self.hits += 1
+
+        if kwargs.get('stream'):
+            chunks = record.get('chunks') or [record.get('content', '')]
+            interval = record.get('latency', 0.0) - record.get('ttft', 0.0)
+            interval = interval / max(len(chunks) - 1, 1)
+            return _FakeStream(chunks, record.get('ttft', 0.0) * self.latency_scale, interval * self.latency_scale)
+
+        if self.latency_scale > 0 and record.get('latency'):
+            await asyncio.sleep(record['latency'] * self.latency_scale)
+        return _completion(record.get('content', ''))
+
+
+class RecordingAsyncOpenAI:
+    """실제 AsyncOpenAI 호출을 그대로 전달하면서 응답과 지연시간을 기록합니다."""
+
+    def __init__(self, client, recordings: Dict[str, Dict]):
+        self._client = client
+        self.recordings = recordings
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        key = _request_key(kwargs)
+        started = time.perf_counter()
+        response = await self._client.chat.completions.create(**kwargs)
+
+        if not kwargs.get('stream'):
+            self.recordings[key] = {'content': response.choices[0].message.content,
+                                    'latency': time.perf_counter() - started}
+            return response
+
+        recordings = self.recordings
+
+        async def tee():
+            chunks, ttft = [], None
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    chunks.append(chunk.choices[0].delta.content)
+                yield chunk
+            recordings[key] = {'chunks': chunks, 'content': ''.join(chunks),
+                               'ttft': ttft or 0.0, 'latency': time.perf_counter() - started}
+        return tee()
+
+
+# 합성 응답에서 재구성 질문이 원본과 같은 비율 (실제 gpt-4o는 대부분 질문을 다듬어 반환)
+SYNTHETIC_UNCHANGED_RATE = 0.1
+
+def _synthetic_rewrite(query: str) -> str:
+    """질문별로 고정된(해시 기반) 합성 재구성: SYNTHETIC_UNCHANGED_RATE 비율만 원본 그대로"""
+    bucket = int(hashlib.sha1(query.encode('utf-8')).hexdigest()[:8], 16) / 0xFFFFFFFF
+    if bucket < SYNTHETIC_UNCHANGED_RATE:
+        return query
+    core = re.sub(r'\s*(알려\s*줘|알려\s*주세요)?[?.!\s]*$', '', query)
+    return f"{core} (LH 공고 기준)"
+
+def _synthesize(kwargs: Dict) -> Dict:
+    """녹화가 없는 요청용 규칙 기반 응답 (llm_handler 프롬프트 형식에 맞춤)"""
+    messages = kwargs.get('messages') or []
+    prompt = messages[-1]['content'] if messages else ''
+    match = (re.search(r'현재 질문: "?(.+?)"?\s*$', prompt) or re.search(r'질문: "(.+?)"', prompt)
+             or re.search(r'원본 질문: (.+)', prompt))
+    query = match.group(1).strip() if match else prompt[-100:]
+    analysis = {**llm_handler.fallback_query_analysis(query), 'rewritten_question': _synthetic_rewrite(query)}
+    response_format = (kwargs.get('response_format') or {}).get('type')
+
+    if kwargs.get('stream'):
+        answer = f"{query}에 대한 답변입니다. " + "공고문의 신청자격, 공급일정, 임대조건을 확인하세요. " * 10
+        return {'chunks': [answer[i:i + 4] for i in range(0, len(answer), 4)], 'content': answer}
+    if response_format == 'json_schema':
+        plan = {'context_type': 'new_question', 'reason': '', 'referenced_announcement_indices': [],
+                'paraphrases': [f"{analysis['rewritten_question']} 관련 LH 공고"], **analysis}
+        return {'content': json.dumps(plan, ensure_ascii=False)}
+    if response_format == 'json_object':
+        return {'content': json.dumps({'is_context_question': False, 'context_type': 'new_question',
+                                       'reason': '', 'referenced_announcement_indices': []}, ensure_ascii=False)}
+    if '다른 버전을 생성하세요' in prompt:
+        return {'content': f"{query} 관련 LH 공고\n{query} 자세히"}
+    if '"is_followup"' in prompt:
+        return {'content': json.dumps({'is_followup': False, 'referenced_announcement_ids': [],
+                                       'context_type': 'new_question'})}
+    return {'content': json.dumps(analysis, ensure_ascii=False)}
+
+
+# 3. 픽스처 코퍼스 (메모리 검색)
+# 합성 코퍼스용 공고 구성 요소 (실제 공고의 단지명/금액이 아닌 가상의 값)
+_SYNTHETIC_SITES = [
+    ('경기도', '수원매산', 'A1'), ('경기도', '수원당수', 'A3'), ('경기도', '화성동탄', 'A7'),
+    ('경기도', '의왕초평', 'A2'), ('경기도', '남양주별내', 'B1'), ('경기도', '시흥장현', 'A5'),
+    ('서울특별시', '강서마곡', '7단지'), ('서울특별시', '송파위례', 'A1-4'), ('서울특별시', '구로항동', '4단지'),
+]
+_SYNTHETIC_TYPES = {'lease': ['행복주택', '국민임대', '영구임대'], 'sale': ['공공분양', '신혼희망타운']}
+_SYNTHETIC_SECTIONS = [
+    ('공급개요', "{site} {block}블록 {notice_type} {units}세대를 공급합니다. 전용면적 {area}㎡ 이하이며 "
+                 "입주예정은 {year}년 {month}월입니다. 단지 위치는 {region} {site} 일원입니다."),
+    ('신청자격', "입주자모집공고일 현재 무주택세대구성원으로서 {region}에 거주하거나 직장을 둔 사람이 신청할 수 있습니다. "
+                 "소득은 전년도 도시근로자 가구당 월평균소득의 {income}% 이하, 총자산은 {asset}백만원 이하여야 합니다."),
+    ('우선공급 선정기준', "우선공급 대상은 {site} 소재 거주자 및 근무자입니다. 동일 순위 경쟁 시 해당 지역 거주기간, "
+                          "부양가족 수, 청약저축 납입횟수 순으로 가점을 합산하여 입주자를 선정합니다."),
+    ('임대조건', "| 주택형 | 임대보증금 | 월임대료 |\n|---|---|---|\n| {area}A | {deposit}만원 | {rent}만원 |\n"
+                 "| {area}B | {deposit2}만원 | {rent2}만원 |\n보증금과 월임대료는 상호전환이 가능합니다."),
+    ('공급일정', "청약접수는 {year}년 {month}월 {day}일부터 3일간 인터넷으로 진행합니다. 서류제출 대상자 발표 후 "
+                 "소득 및 자산 검증을 거쳐 당첨자를 발표하며, 계약은 당첨자 발표 후 2주 이내에 체결합니다."),
+    ('유의사항', "신청자격 및 선정기준은 {notice_type} 업무처리지침에 따르며, 허위 서류 제출 시 당첨이 취소됩니다. "
+                 "자세한 내용은 LH 청약플러스 공고문을 확인하시기 바랍니다."),
+]
+
+
+def _synthetic_rows(count: int, seed: int) -> List[Dict[str, Any]]:
+    """가상의 LH 공고 count개를 export와 같은 행 형식(임베딩 제외)으로 생성"""
+    rng = random.Random(seed)
+    rows, chunk_id = [], 0
+    for n in range(count):
+        region, site, block = _SYNTHETIC_SITES[n % len(_SYNTHETIC_SITES)]
+        category = 'sale' if n % 4 == 3 else 'lease'
+        notice_type = _SYNTHETIC_TYPES[category][0] if n == 0 else rng.choice(_SYNTHETIC_TYPES[category])
+        values = {
+            'region': region, 'site': site, 'block': block, 'notice_type': notice_type,
+            'units': rng.randrange(100, 1500, 10), 'area': rng.choice([16, 26, 36, 46, 59]),
+            'year': rng.choice([2025, 2026, 2027]), 'month': rng.randint(1, 12), 'day': rng.randint(1, 25),
+            'income': rng.choice([70, 100, 120, 150]), 'asset': rng.choice([241, 288, 345]),
+            'deposit': rng.randrange(1000, 9000, 100), 'rent': rng.randrange(5, 40),
+            'deposit2': rng.randrange(1000, 9000, 100), 'rent2': rng.randrange(5, 40),
+        }
+        announcement = {
+            'announcement_id': f"bench-{n:04d}",
+            'title': f"{site} {block}블록 {notice_type} 입주자 모집공고",
+            'category': category, 'region': region, 'notice_type': notice_type,
+            'posted_date': f"{values['year'] - 1}-{values['month']:02d}-{values['day']:02d}",
+            'url': f"https://example.com/notice/bench-{n:04d}",
+            'status': rng.choice(['접수중', '공고중', '접수마감']),
+        }
+        for index, (section, template) in enumerate(_SYNTHETIC_SECTIONS):
+            chunk_id += 1
+            text = f"{section}\n" + template.format(**values)
+            rows.append({**announcement, 'chunk_id': chunk_id, 'chunk_text': text, 'chunk_index': index,
+                         'metadata': {'section': section, 'has_table': '|' in text, 'length': len(text)}})
+    return rows
+
+
+class FixtureCorpus:
+    """
+    export로 저장한 document_chunks + announcements 행을 메모리에 올려 검색합니다.
+    gongo의 DB 검색 함수와 같은 결과 형식/점수(similarity, keyword 점수, rrf_score)를 반환합니다.
+    """
+
+    def __init__(self, path: Path):
+        if not path.exists():
+            raise FileNotFoundError(f"픽스처 코퍼스가 없습니다: {path} (export 또는 generate로 먼저 생성하세요)")
+        self.rows: List[Dict[str, Any]] = []
+        embeddings = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                embeddings.append(row.pop('embedding'))
+                self.rows.append(row)
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        self.matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.by_announcement = {r['announcement_id']: r for r in self.rows}
+        self.version = f"fixture|{path.stat().st_mtime_ns}|{len(self.rows)}"
+
+    def _mask(self, filters: Dict = None, filter_ids: List[str] = None) -> np.ndarray:
+        """gongo._build_filter_sql과 같은 조건"""
+        filters = filters or {}
+        mask = np.ones(len(self.rows), dtype=bool)
+        for i, r in enumerate(self.rows):
+            if filters.get('region', '').strip() and filters['region'] not in (r.get('region') or ''):
+                mask[i] = False
+            elif filters.get('category', '').strip() and r.get('category') != filters['category']:
+                mask[i] = False
+            elif filters.get('notice_type', '').strip() and filters['notice_type'] not in (r.get('notice_type') or ''):
+                mask[i] = False
+            elif filters.get('status', '').strip() and r.get('status') != filters['status']:
+                mask[i] = False
+            elif filter_ids and r['announcement_id'] not in filter_ids:
+                mask[i] = False
+        return mask
+
+    def _vector_rank(self, query_embedding, mask: np.ndarray, top_k: int) -> List[tuple]:
+        similarity = self.matrix @ np.asarray(query_embedding, dtype=np.float32)
+        similarity[~mask] = -np.inf
+        order = np.argsort(-similarity)[:top_k]
+        return [(int(i), float(similarity[i])) for i in order if np.isfinite(similarity[i])]
+
+    def _keyword_rank(self, keywords: List[str], mask: np.ndarray, top_k: int) -> List[int]:
+        unique = list(dict.fromkeys(k.strip() for k in keywords if k and k.strip()))
+        scored = []
+        for i, r in enumerate(self.rows):
+            if mask[i]:
+                score = sum(1 for kw in unique if kw in r['chunk_text'])
+                if score:
+                    scored.append((-score, r['chunk_id'], i))
+        return [i for _, _, i in sorted(scored)[:top_k]]
+
+    async def vector_search(self, query: str, top_k: int = 15, filters: dict = None,
+                            filter_ids: List[str] = None, query_embedding=None) -> List[Dict]:
+        if query_embedding is None:
+            query_embedding = await embedding.encode_query(query)
+        with metrics.span('vector_query'):
+            ranked = self._vector_rank(query_embedding, self._mask(filters, filter_ids), top_k)
+        return [{**self.rows[i], 'similarity': s} for i, s in ranked]
+
+    async def multi_query_hybrid_search(self, query_analysis: Dict, multi_queries: List[str],
+                                        vector_top_k: int = 10, keyword_top_k: int = 5) -> List[Dict]:
+        keywords = query_analysis.get('search_keywords', [])
+        if not multi_queries and not keywords:
+            return []
+        filters = {k: query_analysis.get(k, '') for k in ('region', 'notice_type', 'category', 'status')}
+        query_embeddings = await embedding.encode_queries(multi_queries)
+
+        with metrics.span('hybrid_query'):
+            mask = self._mask(filters)
+            fused: Dict[int, Dict[str, float]] = {}
+            for q_emb in query_embeddings:
+                for rnk, (i, sim) in enumerate(self._vector_rank(q_emb, mask, vector_top_k), 1):
+                    entry = fused.setdefault(i, {'rrf_score': 0.0, 'similarity': 0.0})
+                    entry['rrf_score'] += 1.0 / (config.RRF_K + rnk)
+                    entry['similarity'] = max(entry['similarity'], sim)
+            for rnk, i in enumerate(self._keyword_rank(keywords, mask, keyword_top_k), 1):
+                entry = fused.setdefault(i, {'rrf_score': 0.0, 'similarity': 0.0})
+                entry['rrf_score'] += 1.0 / (config.RRF_K + rnk)
+        ordered = sorted(fused.items(), key=lambda x: x[1]['rrf_score'], reverse=True)
+        return [{**self.rows[i], **scores} for i, scores in ordered]
+
+    async def get_announcement_metadata(self, announcement_ids: List[str]) -> List[Dict]:
+        results = []
+        for ann_id in announcement_ids:
+            r = self.by_announcement.get(ann_id)
+            if r:
+                results.append({
+                    'announcement_id': ann_id, 'announcement_title': r['title'],
+                    'announcement_date': r.get('posted_date'), 'announcement_url': r.get('url'),
+                    'announcement_status': r.get('status'), 'region': r['region'],
+                    'notice_type': r['notice_type'], 'category': r['category'],
+                    'merged_content': '', 'rerank_score': 0.0, 'num_chunks': 0,
+                })
+        return results
+
+    async def get_corpus_version(self) -> str:
+        return self.version
+
+    def install(self):
+        """gongo의 DB 검색 함수를 픽스처 검색으로 교체"""
+        gongo.get_corpus_version = self.get_corpus_version
+        gongo.vector_search = self.vector_search
+        gongo.multi_query_hybrid_search = self.multi_query_hybrid_search
+        gongo.get_announcement_metadata = self.get_announcement_metadata
+
+
+# 4. 측정
+def _peak_rss_mb() -> Optional[float]:
+    """프로세스 시작 이후 최대 RSS (MB)"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        try:
+            import psutil
+            info = psutil.Process().memory_info()
+            return getattr(info, 'peak_wset', info.rss) / 1024 / 1024
+        except ImportError:
+            return None
+
+def _percentile(values: List[float], pct: float) -> float:
+    """nearest-rank 백분위수"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+async def _run_level(queries: List[tuple], users: int, repeat: int, samples: Dict[str, List[float]]) -> Dict:
+    """동시 사용자 users명이 질문 목록(repeat회)을 나눠 처리"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(repeat):
+        for item in queries:
+            queue.put_nowait(item)
+    errors = []
+
+    async def user():
+        while not queue.empty():
+            tc, query = queue.get_nowait()
+            try:
+                result = await chatting.chat_service(query, [])
+                for stage, value in (result.get('timings') or {}).items():
+                    samples.setdefault(stage, []).append(value)
+            except Exception as e:
+                errors.append(f"{tc}: {e}")
+
+    total = queue.qsize()
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    wall = time.perf_counter() - started
+    return {'users': users, 'requests': total, 'errors': len(errors), 'wall': wall,
+            'throughput': total / wall if wall else 0.0, 'peak_rss_mb': _peak_rss_mb(),
+            'error_samples': errors[:3]}
+
+def _print_stage_table(title: str, samples: Dict[str, List[float]], baseline: Dict[str, List[float]] = None):
+    print(f"\n[{title}]")
+    print(f"{'stage':<18}{'n':>6}{'p50(s)':>10}{'p95(s)':>10}{'notebook p50':>14}")
+    for stage in sorted(samples, key=lambda s: (s == 'total', s)):
+        values = samples[stage]
+        base = baseline.get(stage) if baseline else None
+        base_str = f"{statistics.median(base):>14.3f}" if base else f"{'-':>14}"
+        print(f"{stage:<18}{len(values):>6}{_percentile(values, 50):>10.4f}{_percentile(values, 95):>10.4f}{base_str}")
+
+
+async def run(args):
+    queries = load_queries()
+    corpus = FixtureCorpus(Path(args.corpus))
+    corpus.install()
+    recordings = json.loads(Path(args.recordings).read_text(encoding='utf-8')) if Path(args.recordings).exists() else {}
+    client = FakeAsyncOpenAI(recordings, latency_scale=args.latency_scale)
+    if not args.answer_cache:
+        # 반복 실행 시 답변 생성 단계가 캐시로 생략되지 않도록 기본은 끔
+        config.ANSWER_CACHE_SIZE = 0
+    dependencies._openai_client = client
+    dependencies.load_models()
+
+    print(f"[Bench] 질문 {len(queries)}개, 코퍼스 청크 {len(corpus.rows)}개, 녹화 응답 {len(recordings)}개, "
+          f"LLM 지연 배율 {args.latency_scale}, reranker {'ON' if config.USE_RERANKER else 'OFF'}")
+
+    # 워밍업 (모델 첫 호출 비용 제외)
+    with contextlib.redirect_stdout(io.StringIO()):
+        await chatting.chat_service(queries[0][1], [])
+
+    levels, all_samples = [], {}
+    for users in [int(u) for u in args.users.split(',')]:
+        samples: Dict[str, List[float]] = {}
+        with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+            levels.append(await _run_level(queries, users, args.repeat, samples))
+        for stage, values in samples.items():
+            all_samples.setdefault(stage, []).extend(values)
+        if users == 1:
+            _print_stage_table("단계별 지연시간 (동시 사용자 1명)", samples, load_csv_baseline())
+
+    _print_stage_table("단계별 지연시간 (전체)", all_samples)
+
+    print(f"\n[동시 사용자별 처리량]")
+    print(f"{'users':>6}{'requests':>10}{'errors':>8}{'wall(s)':>10}{'req/s':>10}{'peak RSS(MB)':>14}")
+    for level in levels:
+        rss = f"{level['peak_rss_mb']:>14.1f}" if level['peak_rss_mb'] is not None else f"{'-':>14}"
+        print(f"{level['users']:>6}{level['requests']:>10}{level['errors']:>8}{level['wall']:>10.2f}{level['throughput']:>10.2f}{rss}")
+        for error in level['error_samples']:
+            print(f"        [Error] {error}")
+
+    print(f"\n[Bench] LLM 녹화 적중 {client.hits}회 / 합성 응답 {client.misses}회 "
+          f"(합성 재구성 원본 유지 비율 {SYNTHETIC_UNCHANGED_RATE:.0%})")
+    speculation = {key.split('outcome=')[1].rstrip('}'): int(value) for key, value in metrics.snapshot().items()
+                   if key.startswith('rag_speculation_total')}
+    print(f"[Bench] 추측 실행 ({'ON' if config.SPECULATIVE_RETRIEVAL and not config.USE_QUERY_PLANNER else 'OFF'}): "
+          + (", ".join(f"{outcome} {count}회" for outcome, count in sorted(speculation.items())) or "실행 없음"))
+    print(f"[Bench] 캐시: {json.dumps(gongo.get_cache_stats(), ensure_ascii=False)}")
+
+
+async def record(args):
+    """실제 OpenAI로 질문 세트를 1회 실행하며 응답을 녹화합니다. (검색은 픽스처 코퍼스 사용)"""
+    corpus = FixtureCorpus(Path(args.corpus))
+    corpus.install()
+    path = Path(args.recordings)
+    recordings = json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
+    dependencies._openai_client = RecordingAsyncOpenAI(dependencies.get_openai_client(), recordings)
+    dependencies.load_models()
+
+    for tc, query in load_queries():
+        print(f"[Record] {tc}: {query}")
+        await chatting.chat_service(query, [])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(recordings, ensure_ascii=False, indent=1), encoding='utf-8')
+    print(f"[Record] {len(recordings)}개 응답 저장: {path}")
+
+
+async def export(args):
+    """라이브 DB에서 벤치마크용 코퍼스를 추출합니다. (제목/지역 매칭 공고 + 최신 공고)"""
+    await dependencies.init_db_pool()
+    try:
+        async with dependencies.acquire_connection() as conn:
+            ann_ids = await conn.fetch("""
+                SELECT a.id FROM announcements a
+                WHERE EXISTS (SELECT 1 FROM document_chunks dc WHERE dc.announcement_id = a.id)
+                ORDER BY (a.title LIKE $1 OR a.region LIKE $1) DESC, a.posted_date DESC NULLS LAST
+                LIMIT $2
+            """, f"%{args.match}%", args.limit)
+            rows = await conn.fetch("""
+                SELECT dc.id as chunk_id, dc.announcement_id, a.title, a.category, a.region, a.notice_type,
+                       a.posted_date, a.url, a.status, dc.chunk_text, dc.chunk_index, dc.metadata,
+                       dc.embedding::text as embedding
+                FROM document_chunks dc
+                JOIN announcements a ON dc.announcement_id = a.id
+                WHERE a.id = ANY($1::text[])
+                ORDER BY dc.announcement_id, dc.chunk_index
+            """, [r['id'] for r in ann_ids])
+    finally:
+        await dependencies.close_db_pool()
+
+    path = Path(args.corpus)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            r = dict(row)
+            r['embedding'] = json.loads(r['embedding'])
+            r['posted_date'] = str(r['posted_date']) if r['posted_date'] else None
+            if isinstance(r['metadata'], str):
+                r['metadata'] = json.loads(r['metadata'])
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    print(f"[Export] 공고 {len(ann_ids)}개, 청크 {len(rows)}개 저장: {path}")
+
+
+async def generate(args):
+    """DB 없이 벤치마크용 합성 코퍼스를 생성합니다. (임베딩은 서비스와 같은 로컬 모델 사용)"""
+    rows = _synthetic_rows(args.limit, args.seed)
+    vectors = dependencies.load_embedding_model().encode(
+        [r['chunk_text'] for r in rows], normalize_embeddings=True,
+        show_progress_bar=False, batch_size=config.EMBEDDING_BATCH_SIZE
+    )
+
+    path = Path(args.corpus)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for row, vector in zip(rows, vectors):
+            f.write(json.dumps({**row, 'embedding': [round(float(v), 6) for v in vector]}, ensure_ascii=False) + "\n")
+    print(f"[Generate] 합성 공고 {args.limit}개, 청크 {len(rows)}개 저장: {path} (seed={args.seed})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG 파이프라인 오프라인 벤치마크")
+    parser.add_argument('command', choices=['run', 'record', 'export', 'generate'], nargs='?', default='run')
+    parser.add_argument('--corpus', default=str(CORPUS_PATH))
+    parser.add_argument('--recordings', default=str(RECORDINGS_PATH))
+    parser.add_argument('--users', default='1,4,16', help="동시 사용자 수 목록 (쉼표 구분)")
+    parser.add_argument('--repeat', type=int, default=2, help="동시성 단계별 질문 세트 반복 횟수")
+    parser.add_argument('--latency-scale', type=float, default=0.0, help="녹화된 LLM 지연시간 재생 배율")
+    parser.add_argument('--match', default='수원', help="export: 우선 추출할 공고 제목/지역")
+    parser.add_argument('--limit', type=int, default=50, help="export/generate: 추출(생성)할 공고 수")
+    parser.add_argument('--seed', type=int, default=0, help="generate: 합성 코퍼스 시드")
+    parser.add_argument('--answer-cache', action='store_true', help="답변 캐시 사용 (기본: 사용 안 함)")
+    parser.add_argument('--rewrite-unchanged-rate', type=float, default=SYNTHETIC_UNCHANGED_RATE,
+                        help="합성 응답에서 재구성 질문이 원본과 같은 비율")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    SYNTHETIC_UNCHANGED_RATE = args.rewrite_unchanged_rate
+
+    asyncio.run({'run': run, 'record': record, 'export': export, 'generate': generate}[args.command](args))
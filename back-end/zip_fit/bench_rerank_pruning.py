@@ -0,0 +1,103 @@
+"""
+Rerank 후보 사전 축소(prune_candidates) 재현율 vs 지연시간 벤치마크
+- 질문/코퍼스/LLM 응답은 bench_pipeline.py의 픽스처를 사용합니다. (export/record 먼저 실행)
+- 기준(정답): 축소 없이 전체 후보를 Cross-Encoder로 재순위화한 상위 k개
+- Cross-Encoder 점수는 (질문, 청크) 쌍마다 독립이므로, 축소 후 순위는 기준 점수로 계산하고
+  지연시간만 축소된 후보로 다시 측정합니다.
+
+실행: python bench_rerank_pruning.py [--repeat 3]
+"""
+import time
+import json
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+from typing import List, Dict
+
+import config
+import dependencies
+import gongo
+import llm_handler
+from bench_pipeline import FixtureCorpus, FakeAsyncOpenAI, load_queries, CORPUS_PATH, RECORDINGS_PATH
+
+# (이름, prune_candidates 인자) - None이면 축소 없음
+VARIANTS = [
+    ("none", None),
+    ("cap=3", dict(max_per_announcement=3, similarity_floor=0, score_gap=0)),
+    ("cap=6", dict(max_per_announcement=6, similarity_floor=0, score_gap=0)),
+    ("floor=0.35", dict(max_per_announcement=0, similarity_floor=0.35, score_gap=0)),
+    ("floor=0.45", dict(max_per_announcement=0, similarity_floor=0.45, score_gap=0)),
+    ("gap=0.2", dict(max_per_announcement=0, similarity_floor=0, score_gap=0.2)),
+    ("gap=0.3", dict(max_per_announcement=0, similarity_floor=0, score_gap=0.3)),
+    ("config", dict()),
+]
+RECALL_AT = (5, 10, 25)
+
+
+def _predict_ms(reranker, query: str, candidates: List[Dict], repeat: int) -> float:
+    pairs = [(query, c['chunk_text']) for c in candidates]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reranker.predict(pairs)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def main(args):
+    corpus = FixtureCorpus(Path(args.corpus))
+    corpus.install()
+    recordings = json.loads(Path(args.recordings).read_text(encoding='utf-8')) if Path(args.recordings).exists() else {}
+    dependencies._openai_client = FakeAsyncOpenAI(recordings)
+    dependencies.load_models()
+    reranker = dependencies.get_reranker()
+    if reranker is None:
+        print("[Bench] Reranker가 꺼져 있습니다. USE_RERANKER=true 로 실행하세요.")
+        return
+
+    results = {name: {'candidates': [], 'latency': [], **{f'recall@{k}': [] for k in RECALL_AT}} for name, _ in VARIANTS}
+    queries = load_queries()
+    for tc, query in queries:
+        plan = await llm_handler.plan_query(query, [], num_queries=1)
+        query_analysis = plan['query_analysis']
+        rewritten = query_analysis.get('rewritten_question', query)
+        candidates = await gongo.multi_query_hybrid_search(query_analysis, plan['multi_queries'])
+        if not candidates:
+            continue
+
+        # 기준: 전체 후보 재순위화
+        scores = reranker.predict([(rewritten, c['chunk_text']) for c in candidates])
+        score_by_id = {c['chunk_id']: float(s) for c, s in zip(candidates, scores)}
+        reference = sorted(score_by_id, key=score_by_id.get, reverse=True)
+
+        for name, kwargs in VARIANTS:
+            pruned = candidates if kwargs is None else gongo.prune_candidates(candidates, **kwargs)
+            ranked = sorted((c['chunk_id'] for c in pruned), key=score_by_id.get, reverse=True)
+            stats = results[name]
+            stats['candidates'].append(len(pruned))
+            stats['latency'].append(_predict_ms(reranker, rewritten, pruned, args.repeat))
+            for k in RECALL_AT:
+                truth = set(reference[:k])
+                stats[f'recall@{k}'].append(len(truth & set(ranked[:k])) / len(truth))
+
+    print(f"[Bench] 질문 {len(queries)}개, reranker backend: {config.RERANKER_BACKEND}, "
+          f"config: cap={config.RERANK_MAX_PER_ANNOUNCEMENT} floor={config.RERANK_SIMILARITY_FLOOR} "
+          f"gap={config.RERANK_SCORE_GAP} min={config.RERANK_MIN_CANDIDATES}\n")
+    header = f"{'variant':<12}{'candidates':>11}{'rerank(ms)':>12}" + "".join(f"{f'recall@{k}':>11}" for k in RECALL_AT)
+    print(header)
+    for name, _ in VARIANTS:
+        stats = results[name]
+        if not stats['candidates']:
+            continue
+        line = f"{name:<12}{statistics.mean(stats['candidates']):>11.1f}{statistics.mean(stats['latency']):>12.1f}"
+        line += "".join(f"{statistics.mean(stats[f'recall@{k}']):>11.3f}" for k in RECALL_AT)
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rerank 후보 축소 재현율/지연시간 벤치마크")
+    parser.add_argument('--corpus', default=str(CORPUS_PATH))
+    parser.add_argument('--recordings', default=str(RECORDINGS_PATH))
+    parser.add_argument('--repeat', type=int, default=3, help="지연시간 측정 반복 횟수 (중앙값 사용)")
+    asyncio.run(main(parser.parse_args()))
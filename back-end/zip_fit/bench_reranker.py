@@ -0,0 +1,92 @@
+"""
+Reranker 백엔드 정합성 검증 및 CPU 처리량 벤치마크
+- torch(CrossEncoder) 점수와 ONNX / ONNX int8 점수를 비교합니다.
+- 백엔드별 pairs/sec 를 측정합니다.
+
+실행: python bench_reranker.py [반복횟수]
+"""
+import os
+import sys
+import time
+import numpy as np
+from sentence_transformers import CrossEncoder
+import config
+from reranker import export_onnx, OnnxCrossEncoder
+
+# docs/06 테스트 케이스(TC-01 ~ TC-04) 기반 샘플
+QUERIES = [
+    "수원시 행복주택 공고 알려줘",
+    "수원매산 A1블록 행복주택 신청자격 알려줘",
+    "수원매산 A1블록 행복주택 우선공급 선정기준 알려줘",
+    "수원매산 A1블록 행복주택 어느 지역 사람이 신청할 수 있어?",
+]
+
+DOCUMENTS = [
+    "수원매산 A1블록 행복주택 입주자 모집공고. 공급위치: 경기도 수원시 팔달구 매산로 일원, 공급호수 총 300호.",
+    "신청자격: 공고일 현재 무주택세대구성원으로서 소득 및 자산 기준을 충족하는 청년, 신혼부부, 고령자.",
+    "| 구분 | 소득기준 | 자산기준 |\n|---|---|---|\n| 청년 | 도시근로자 월평균소득 100% 이하 | 총자산 2억 5,400만원 이하 |",
+    "우선공급 선정기준: 해당 주택건설지역 거주자에게 우선 공급하며, 동일 순위 내 경쟁 시 배점 순으로 선정합니다.",
+    "| 평가항목 | 평가요소 | 배점 |\n|---|---|---|\n| 거주기간 | 수원시 3년 이상 거주 | 3점 |\n| 청약저축 | 24회 이상 납입 | 3점 |",
+    "임대조건: 임대보증금 36,200,000원, 월임대료 145,000원이며 전환보증금 제도를 운영합니다.",
+    "접수기간: 2024.11.18 ~ 2024.11.20, 서류제출대상자 발표 2024.12.06, 당첨자 발표 2025.03.14.",
+    "해당 주택건설지역(수원시) 및 연접 시·군(용인, 화성, 오산 등)에 거주하거나 직장이 있는 분이 신청할 수 있습니다.",
+    "서울특별시 강남구 국민임대주택 예비입주자 모집 공고문으로 수원시와는 무관합니다.",
+    "계약면적: 전용면적 26㎡, 주거공용면적 12.3㎡, 공급면적 38.3㎡ (주택형 26A).",
+]
+
+PAIRS = [(q, d) for q in QUERIES for d in DOCUMENTS]
+
+
+def measure(model, pairs, repeat: int) -> tuple:
+    """예측 점수와 pairs/sec 를 반환합니다. (첫 호출은 워밍업으로 제외)"""
+    scores = np.asarray(model.predict(pairs))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict(pairs)
+    elapsed = time.perf_counter() - start
+    return scores, len(pairs) * repeat / elapsed
+
+
+def rank_agreement(a: np.ndarray, b: np.ndarray, top_k: int = 5) -> float:
+    """질문별 상위 top_k 문서 일치율"""
+    n_docs = len(DOCUMENTS)
+    hits = 0
+    for qi in range(len(QUERIES)):
+        sa = a[qi * n_docs:(qi + 1) * n_docs]
+        sb = b[qi * n_docs:(qi + 1) * n_docs]
+        hits += len(set(np.argsort(-sa)[:top_k]) & set(np.argsort(-sb)[:top_k]))
+    return hits / (len(QUERIES) * top_k)
+
+
+def main(repeat: int = 5):
+    base_path = os.path.abspath(config.MODEL_CACHE_DIR)
+    local_path = os.path.join(base_path, "ko-reranker")
+    model_source = local_path if os.path.exists(local_path) else config.RERANKER_MODEL_NAME
+    onnx_dir = os.path.join(base_path, "ko-reranker-onnx")
+
+    print(f"[Bench] 모델: {model_source}, pairs: {len(PAIRS)}, 반복: {repeat}\n")
+
+    torch_model = CrossEncoder(model_source, device='cpu', max_length=config.RERANKER_MAX_LENGTH)
+    torch_scores, torch_pps = measure(torch_model, PAIRS, repeat)
+    print(f"{'backend':<12}{'pairs/sec':>12}{'max|diff|':>12}{'top5 일치':>12}")
+    print(f"{'torch':<12}{torch_pps:>12.1f}{0.0:>12.4f}{1.0:>12.2f}")
+
+    for quantize in (False, True):
+        export_onnx(model_source, onnx_dir, quantize=quantize)
+        onnx_model = OnnxCrossEncoder(onnx_dir, quantize=quantize)
+        scores, pps = measure(onnx_model, PAIRS, repeat)
+        name = "onnx-int8" if quantize else "onnx"
+        max_diff = float(np.max(np.abs(scores - torch_scores)))
+        print(f"{name:<12}{pps:>12.1f}{max_diff:>12.4f}{rank_agreement(torch_scores, scores):>12.2f}")
+
+        # 정합성 기준: fp32는 수치 오차 수준, int8은 순위가 유지되는 수준
+        if not quantize:
+            assert max_diff < 1e-3, f"ONNX fp32 점수가 torch와 다릅니다 (max diff {max_diff:.5f})"
+        else:
+            assert rank_agreement(torch_scores, scores) >= 0.8, "int8 양자화 후 상위 순위가 크게 달라졌습니다"
+
+    print("\n[Bench] 정합성 검증 통과")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,85 @@
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    크기 제한(LRU) + 만료 시간(TTL)을 가진 메모리 캐시
+    - maxsize를 넘으면 가장 오래 사용하지 않은 항목부터 제거합니다.
+    - ttl(초)이 지난 항목은 조회 시 만료 처리합니다. (ttl <= 0 이면 만료 없음)
+    - hit/miss 횟수를 기록하여 모니터링에 사용합니다.
+    """
+
+    def __init__(self, name: str, maxsize: int = 10000, ttl: float = 3600):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # to_thread 등 다른 스레드에서도 접근할 수 있으므로 잠금 사용
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = item
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_text(text: Optional[str], lowercase: bool = True) -> str:
+    """캐시 키용 텍스트 정규화 (앞뒤 공백 제거, 연속 공백 축소, 소문자화)"""
+    text = _WHITESPACE.sub(' ', (text or '').strip())
+    return text.lower() if lowercase else text
+
+def text_hash(text: Optional[str]) -> str:
+    """정규화된 텍스트의 해시값"""
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
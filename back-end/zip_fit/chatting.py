@@ -1,72 +1,199 @@
-from typing import List, Dict, Any
+from typing import List, Dict, AsyncGenerator, Optional, Tuple
 import asyncio
+import time
+import config
 import llm_handler
 import gongo
+import embedding
+import metrics
+
+
+# 스트리밍 이벤트 형식 (chat_stream_service가 순서대로 생성)
+# 1. {'type': 'sources', 'data': [...]}                          - 컨텍스트 구성 직후 출처 목록 (컨텍스트에 포함된 공고만)
+# 2. {'type': 'answer', 'content': '...'}                        - 답변 토큰 (여러 번)
+# 3. {'type': 'done', 'query_analysis': {...}, 'metadata': {...},
+#     'timings': {단계: 초}}                                      - 완료 및 부가 정보 (단계별 소요 시간 포함)
+
+async def _answer_events(query: str, context: str, history: List[Dict], started_at: float) -> AsyncGenerator[Dict, None]:
+    """답변 토큰 이벤트를 생성하고 첫 토큰까지의 시간(TTFT)을 기록합니다."""
+    first = True
+    with metrics.span('generation'):
+        async for token in llm_handler.generate_answer_stream(query, context, history):
+            if first:
+                ttft = time.perf_counter() - started_at
+                metrics.observe('rag_time_to_first_token_seconds', ttft, "요청 시작부터 첫 답변 토큰까지 걸린 시간")
+                first = False
+            yield {'type': 'answer', 'content': token}
 
 
 # 1. 기본 RAG 프로세스 (Standard RAG)
-async def rag_process(query: str, history: List[Dict], verbose: bool = True) -> Dict:
+async def rag_process_stream(query: str, history: List[Dict], verbose: bool = True,
+                             query_analysis: Dict = None, multi_queries: List[str] = None,
+                             started_at: float = None, search_results: List[Dict] = None) -> AsyncGenerator[Dict, None]:
     """
     맥락과 관계없는 새로운 질문을 처리하는 표준 RAG 파이프라인
     순서: 재구성 -> 멀티쿼리 생성 -> 하이브리드 검색 -> 재순위화 -> 청크 병합 -> 컨텍스트 -> 답변 생성
+    - query_analysis/multi_queries: Query Planner가 이미 만든 결과가 있으면 1~2단계를 건너뜁니다.
+    - search_results: 추측 실행으로 이미 검색한 결과가 있으면 3단계를 건너뜁니다.
     """
+    started_at = started_at or time.perf_counter()
+
     # 1. 질문 재구성
-    query_analysis = await llm_handler.rewrite_query(query, history)
+    if query_analysis is None:
+        with metrics.span('rewrite'):
+            query_analysis = await llm_handler.rewrite_query(query, history)
     if verbose:
         print(f"[Log] 재구성된 질문: {query_analysis.get('rewritten_question')}")
 
     # 2. 멀티쿼리 생성
-    multi_queries = await llm_handler.generate_multi_queries(query, query_analysis, num_queries=1)
+    if multi_queries is None:
+        with metrics.span('multi_query'):
+            multi_queries = await llm_handler.generate_multi_queries(query, query_analysis, num_queries=1)
     if verbose:
         print(f"[Log] 생성된 쿼리들: {multi_queries}")
 
     # 3. 멀티쿼리 하이브리드 검색 (Vector + Keyword)
-    search_results = await gongo.multi_query_hybrid_search(query_analysis, multi_queries)
+    if search_results is None:
+        with metrics.span('retrieval'):
+            search_results = await gongo.multi_query_hybrid_search(query_analysis, multi_queries)
 
     if not search_results:
-        return {
-            'query': query,
-            'answer': "죄송합니다. 요청하신 조건에 맞는 공고를 찾을 수 없습니다.",
-            'sources': []
-        }
+        yield {'type': 'sources', 'data': []}
+        yield {'type': 'answer', 'content': "죄송합니다. 요청하신 조건에 맞는 공고를 찾을 수 없습니다."}
+        yield {'type': 'done', 'query_analysis': None, 'metadata': None}
+        return
 
     # 4. 재순위화 (Reranking)
-    reranked = await gongo.rerank_results(query_analysis.get('rewritten_question', query), search_results)
-    
+    with metrics.span('rerank'):
+        reranked = await gongo.rerank_results(query_analysis.get('rewritten_question', query), search_results)
+
     # 5. 청크 병합
-    merged_results = await gongo.merge_chunks(reranked)
+    with metrics.span('merge'):
+        merged_results = await gongo.merge_chunks(reranked)
+
+    # 6. 컨텍스트 구성 -> 출처 먼저 전송 (토큰 예산 때문에 빠진 공고는 출처에서도 제외)
+    with metrics.span('context_build'):
+        context, sources = gongo.build_context(merged_results)
+    yield {'type': 'sources', 'data': sources}
+
+    # 답변 캐시 (이전 대화가 없을 때만: 대화 기록이 있으면 같은 질문이라도 답변이 달라짐)
+    cache_key = None
+    if not history and config.ANSWER_CACHE_SIZE > 0:
+        corpus_version = await gongo.get_corpus_version()
+        if corpus_version is not None:
+            cache_key = gongo.answer_cache_key(query_analysis, merged_results, corpus_version)
+            cached_answer = gongo.answer_cache.get(cache_key)
+            if cached_answer is not None:
+                yield {'type': 'answer', 'content': cached_answer}
+                yield {'type': 'done', 'query_analysis': query_analysis, 'metadata': {'answer_cache': 'hit'}}
+                return
 
-    # 6. 컨텍스트 구성
-    context = gongo.build_context(merged_results)
+    # 7. 답변 생성 (스트리밍)
+    tokens = []
+    async for event in _answer_events(query_analysis.get('rewritten_question', query), context, history, started_at):
+        tokens.append(event['content'])
+        yield event
 
-    # 7. 답변 생성
-    answer = await llm_handler.generate_answer(query_analysis.get('rewritten_question', query), context, history)
+    # 끝까지 생성된 답변만 저장 (중간에 연결이 끊기면 여기까지 오지 않음)
+    if cache_key is not None and tokens:
+        gongo.answer_cache.set(cache_key, ''.join(tokens))
 
-    # 결과 반환
-    return {
-        'query': query,
-        'answer': answer,
-        'sources': merged_results,
-        'query_analysis': query_analysis
-    }
+    yield {'type': 'done', 'query_analysis': query_analysis, 'metadata': None}
 
 
+# 추측 실행 (Speculative Retrieval, 개별 호출 방식 전용)
+# 맥락 분석 결과를 기다리는 동안 일반 질문 처리(재구성 -> 멀티쿼리 -> 검색)를 미리 시작합니다.
+# - new_question: 미리 만든 재구성/검색 결과를 그대로 사용
+# - announcement_reference: 재구성/멀티쿼리만 사용하고 검색은 취소
+# - meta_conversation: 모두 취소
+# Query Planner 방식은 검색 조건(재구성 질문/키워드/필터)이 계획 응답에 함께 오므로 미리 검색할 수 없습니다.
+async def _prepare_query(query: str, history: List[Dict]) -> Tuple[Dict, List[str]]:
+    with metrics.span('rewrite'):
+        query_analysis = await llm_handler.rewrite_query(query, history)
+    with metrics.span('multi_query'):
+        multi_queries = await llm_handler.generate_multi_queries(query, query_analysis, num_queries=1)
+    return query_analysis, multi_queries
+
+def _start_speculation(query: str, history: List[Dict]) -> Tuple[asyncio.Task, asyncio.Task]:
+    prepare_task = asyncio.create_task(_prepare_query(query, history))
+
+    async def search():
+        # 검색만 취소될 때 재구성 작업까지 취소되지 않도록 shield
+        query_analysis, multi_queries = await asyncio.shield(prepare_task)
+        with metrics.span('retrieval'):
+            return await gongo.multi_query_hybrid_search(query_analysis, multi_queries)
+
+    search_task = asyncio.create_task(search())
+    for task in (prepare_task, search_task):
+        # 결과를 쓰지 않고 버린 작업의 예외가 경고로 남지 않도록 회수
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return prepare_task, search_task
+
+def _discard(*tasks: Optional[asyncio.Task]):
+    for task in tasks:
+        if task is not None and not task.done():
+            task.cancel()
+
+def _record_speculation(outcome: str):
+    metrics.increment('rag_speculation_total', description="추측 실행 결과 (used/partial/discarded)", outcome=outcome)
+
 
 # 2. 통합 채팅 서비스 (Context-Aware Service)
-async def chat_service(query: str, history: List[Dict]) -> Dict:
+async def chat_stream_service(query: str, history: List[Dict]) -> AsyncGenerator[Dict, None]:
     """
-    API에서 호출하는 메인 진입점.
-    질문이 이전 대화와 이어지는지(맥락 질문) 판단하여 처리 방식을 결정합니다.
+    스트리밍 API에서 호출하는 메인 진입점.
+    질문이 이전 대화와 이어지는지(맥락 질문) 판단하여 처리 방식을 결정하고, 이벤트를 순서대로 생성합니다.
+    완료(done) 이벤트에는 이번 요청의 단계별 소요 시간(timings)을 함께 담습니다.
     """
-    
+    timings = metrics.begin_request()
+    started_at = time.perf_counter()
+
+    async for event in _route_events(query, history, started_at):
+        if event['type'] == 'done':
+            total = time.perf_counter() - started_at
+            metrics.observe('rag_request_duration_seconds', total, "요청 시작부터 답변 완료까지 걸린 시간")
+            timings['total'] = round(total, 4)
+            event['timings'] = timings
+        yield event
+
+async def _route_events(query: str, history: List[Dict], started_at: float) -> AsyncGenerator[Dict, None]:
+    """맥락 분석 결과에 따라 대화 맥락 / 공고 참조 / 일반 질문 처리로 분기합니다."""
     # 1. 맥락 분석
-    context_analysis = await llm_handler.analyze_context(query, history)
+    # Query Planner 사용 시 재구성/멀티쿼리까지 한 번에 받아둡니다.
+    query_analysis, multi_queries = None, None
+    prepare_task, search_task = None, None
+    try:
+        if config.USE_QUERY_PLANNER:
+            with metrics.span('plan'):
+                plan = await llm_handler.plan_query(query, history, num_queries=1)
+            context_analysis = plan['context_analysis']
+            query_analysis, multi_queries = plan['query_analysis'], plan['multi_queries']
+        else:
+            # 이전 대화가 없으면 analyze_context는 LLM을 호출하지 않으므로 추측 실행도 하지 않습니다.
+            if history and config.SPECULATIVE_RETRIEVAL:
+                prepare_task, search_task = _start_speculation(query, history)
+            with metrics.span('analyze_context'):
+                context_analysis = await llm_handler.analyze_context(query, history)
+
+        async for event in _context_events(query, history, started_at, context_analysis,
+                                           query_analysis, multi_queries, prepare_task, search_task):
+            yield event
+    finally:
+        # 클라이언트 연결 종료 등으로 중단되면 남은 추측 작업 정리
+        _discard(search_task, prepare_task)
+
+async def _context_events(query: str, history: List[Dict], started_at: float, context_analysis: Dict,
+                          query_analysis: Optional[Dict], multi_queries: Optional[List[str]],
+                          prepare_task: Optional[asyncio.Task], search_task: Optional[asyncio.Task]) -> AsyncGenerator[Dict, None]:
     is_context = context_analysis.get('is_context_question', False)
     context_type = context_analysis.get('context_type', 'new_question')
 
     # 2-1. 순수 대화 맥락 질문 (검색 불필요)
     if context_type == 'meta_conversation' and history:
         print(f"[Log] 대화 맥락 질문 감지: {context_analysis.get('reason')}")
+        if prepare_task is not None:
+            _discard(search_task, prepare_task)
+            _record_speculation('discarded')
 
         # 이전 대화 요약 컨텍스트 구성
         history_context = "\n\n".join([
@@ -74,18 +201,11 @@ async def chat_service(query: str, history: List[Dict]) -> Dict:
             for i, h in enumerate(history[-5:])
         ])
 
-        answer = await llm_handler.generate_answer(
-            query,
-            f"이전 대화 내역:\n{history_context}",
-            history
-        )
-
-        return {
-            'query': query,
-            'answer': answer,
-            'sources': [],
-            'metadata': {'context_type': 'meta_conversation'}
-        }
+        yield {'type': 'sources', 'data': []}
+        async for event in _answer_events(query, f"이전 대화 내역:\n{history_context}", history, started_at):
+            yield event
+        yield {'type': 'done', 'query_analysis': None, 'metadata': {'context_type': 'meta_conversation'}}
+        return
 
     # 2-2. 공고 참조 질문인 경우
     if is_context and context_type == 'announcement_reference' and history:
@@ -94,35 +214,47 @@ async def chat_service(query: str, history: List[Dict]) -> Dict:
         # 이전 대화에서 언급된 공고 ID 추출
         prev_ids = []
         referenced_indices = context_analysis.get('referenced_announcement_indices', [0])
-        
+
         # history 역순 탐색
         for idx in referenced_indices:
             if idx < len(history):
                 # history는 {'query':.., 'answer':.., 'sources': [..]} 형태
                 prev_turn = history[-(idx+1)]
                 prev_sources = prev_turn.get('sources', [])
-                
+
                 # 상위 3개 공고만 참조 대상으로 설정
                 for src in prev_sources[:3]:
                     # src가 딕셔너리인지 객체인지 확인 후 ID 추출
                     ann_id = src.get('announcement_id') if isinstance(src, dict) else getattr(src, 'announcement_id', None)
                     if ann_id and str(ann_id) not in prev_ids:
                         prev_ids.append(str(ann_id))
-        
+
         if prev_ids:
             print(f"[Log] 참조 공고 ID: {prev_ids}")
 
+            # 추측 실행한 재구성/멀티쿼리는 사용하고, 전체 범위 검색은 취소
+            if prepare_task is not None:
+                _discard(search_task)
+                query_analysis, multi_queries = await prepare_task
+                _record_speculation('partial')
+
             # 질문 재구성
-            query_analysis = await llm_handler.rewrite_query(query, history)
+            if query_analysis is None:
+                with metrics.span('rewrite'):
+                    query_analysis = await llm_handler.rewrite_query(query, history)
 
             # 멀티쿼리 생성
-            multi_queries = await llm_handler.generate_multi_queries(query, query_analysis, num_queries=1)
+            if multi_queries is None:
+                with metrics.span('multi_query'):
+                    multi_queries = await llm_handler.generate_multi_queries(query, query_analysis, num_queries=1)
 
             # 우선 검색 (이전 공고 ID 범위 내에서 멀티쿼리 검색)
-            context_tasks = []
-            for q in multi_queries:
-                context_tasks.append(gongo.vector_search(q, top_k=5, filter_ids=prev_ids))
-            context_results_list = await asyncio.gather(*context_tasks)
+            with metrics.span('retrieval'):
+                query_embeddings = await embedding.encode_queries(multi_queries)
+                context_tasks = []
+                for q, q_emb in zip(multi_queries, query_embeddings):
+                    context_tasks.append(gongo.vector_search(q, top_k=5, filter_ids=prev_ids, query_embedding=q_emb))
+                context_results_list = await asyncio.gather(*context_tasks)
 
             # 결과 병합 (중복 제거)
             seen = set()
@@ -138,26 +270,67 @@ async def chat_service(query: str, history: List[Dict]) -> Dict:
             if context_results:
                 # 공고 참조 질문은 이전 공고 ID 범위 내에서만 검색 (일반 검색 제외)
                 # 재순위화
-                reranked = await gongo.rerank_results(query_analysis.get('rewritten_question', query), context_results)
+                with metrics.span('rerank'):
+                    reranked = await gongo.rerank_results(query_analysis.get('rewritten_question', query), context_results)
 
                 # 청크 병합
-                merged_results = await gongo.merge_chunks(reranked)
+                with metrics.span('merge'):
+                    merged_results = await gongo.merge_chunks(reranked)
             else:
                 # 벡터 데이터가 없는 경우 RDB에서 기본 정보 가져오기
                 print(f"[Log] 벡터 데이터 없음. RDB에서 메타데이터 가져옴: {prev_ids}")
-                merged_results = await gongo.get_announcement_metadata(prev_ids)
+                with metrics.span('metadata_lookup'):
+                    merged_results = await gongo.get_announcement_metadata(prev_ids)
 
-            # 컨텍스트 구성 및 답변 생성
-            context = gongo.build_context(merged_results)
-            answer = await llm_handler.generate_answer(query_analysis.get('rewritten_question', query), context, history)
+            # 컨텍스트 구성 및 답변 생성 (출처는 컨텍스트에 포함된 공고만)
+            with metrics.span('context_build'):
+                context, sources = gongo.build_context(merged_results)
+            yield {'type': 'sources', 'data': sources}
+            async for event in _answer_events(query_analysis.get('rewritten_question', query), context, history, started_at):
+                yield event
 
-            return {
-                'query': query,
-                'answer': answer,
-                'sources': merged_results,
-                'query_analysis': query_analysis
-            }
+            yield {'type': 'done', 'query_analysis': query_analysis, 'metadata': None}
+            return
 
     # 3. 일반 질문인 경우
     print("[Log] 일반 질문으로 처리")
-    return await rag_process(query, history)
\ No newline at end of file
+    search_results = None
+    if search_task is not None:
+        query_analysis, multi_queries = await prepare_task
+        search_results = await search_task
+        _record_speculation('used')
+    async for event in rag_process_stream(query, history, query_analysis=query_analysis,
+                                          multi_queries=multi_queries, started_at=started_at,
+                                          search_results=search_results):
+        yield event
+
+
+# 3. 일반 응답용 래퍼 (스트리밍 이벤트를 모아 한 번에 반환)
+async def _collect(query: str, events: AsyncGenerator[Dict, None]) -> Dict:
+    result = {'query': query, 'answer': '', 'sources': []}
+    tokens = []
+    async for event in events:
+        if event['type'] == 'sources':
+            result['sources'] = event['data']
+        elif event['type'] == 'answer':
+            tokens.append(event['content'])
+        elif event['type'] == 'done':
+            if event.get('query_analysis') is not None:
+                result['query_analysis'] = event['query_analysis']
+            if event.get('metadata') is not None:
+                result['metadata'] = event['metadata']
+            result['timings'] = event.get('timings')
+    result['answer'] = ''.join(tokens)
+    return result
+
+async def rag_process(query: str, history: List[Dict], verbose: bool = True,
+                      query_analysis: Dict = None, multi_queries: List[str] = None) -> Dict:
+    """표준 RAG 파이프라인 (일반 응답)"""
+    return await _collect(query, rag_process_stream(query, history, verbose, query_analysis, multi_queries))
+
+async def chat_service(query: str, history: List[Dict]) -> Dict:
+    """
+    API에서 호출하는 메인 진입점 (일반 응답).
+    chat_stream_service와 같은 흐름을 실행하고 결과를 한 번에 반환합니다.
+    """
+    return await _collect(query, chat_stream_service(query, history))
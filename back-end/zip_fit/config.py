@@ -30,6 +30,15 @@ DB_CONFIG = {
     'database': DATABASE
 }
 
+# DB 커넥션 풀 설정 (main.lifespan에서 생성)
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+# 커넥션별 prepared statement 캐시 크기 (0이면 캐시 비활성화, pgbouncer 사용 시 0)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))
+# 유휴 커넥션을 닫기까지의 시간(초)
+DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv('DB_POOL_MAX_INACTIVE_LIFETIME', '300'))
+DB_COMMAND_TIMEOUT = float(os.getenv('DB_COMMAND_TIMEOUT', '30'))
+
 
 # 4. RAG 챗봇 어플리케이션 설정
 # 임베딩 모델
@@ -47,12 +56,30 @@ CHUNK_OVERLAP = 150
 # 검색 설정
 DEFAULT_TOP_K = 5
 SIMILARITY_THRESHOLD = 0.6
+# 답변 생성 컨텍스트 토큰 예산 (0이면 제한 없음)
+# - 공고별 예산은 rerank 점수 비율로 배분, CONTEXT_MIN_DOC_TOKENS 미만으로 배분되는 하위 공고는 제외
+# - 토큰 수는 tiktoken(CONTEXT_TOKEN_ENCODING)으로 계산, 설치되지 않았으면 글자 수 기반 추정
+CONTEXT_MAX_TOKENS = int(os.getenv('CONTEXT_MAX_TOKENS', '6000'))
+CONTEXT_MIN_DOC_TOKENS = int(os.getenv('CONTEXT_MIN_DOC_TOKENS', '300'))
+CONTEXT_TOKEN_ENCODING = os.getenv('CONTEXT_TOKEN_ENCODING', 'o200k_base')  # gpt-4o 토크나이저
+# 키워드 검색 방식
+# like: LIKE '%키워드%' (인덱스 없음, 기본값)
+# trgm: pg_trgm GIN 인덱스 + word_similarity 점수 (migrations/001_chunk_text_trgm.sql 적용 후 사용)
+KEYWORD_SEARCH_MODE = os.getenv('KEYWORD_SEARCH_MODE', 'like').lower()
+# Reciprocal Rank Fusion 상수 (score = Σ 1 / (RRF_K + rank))
+RRF_K = int(os.getenv('RRF_K', '60'))
 
 # OpenAI 모델 설정
 OPENAI_MODEL = 'gpt-4o-mini'
 OPENAI_TEMPERATURE = 0.3
 OPENAI_MAX_TOKENS = 1500
 
+# 대화 세션 저장소 설정 (sessions.py)
+SESSION_MAX_SESSIONS = int(os.getenv('SESSION_MAX_SESSIONS', '10000'))
+SESSION_MAX_TURNS = int(os.getenv('SESSION_MAX_TURNS', '20'))
+SESSION_TTL = float(os.getenv('SESSION_TTL', '3600'))  # 마지막 사용 후 만료(초)
+SESSION_MAX_BYTES = int(os.getenv('SESSION_MAX_BYTES', str(256 * 1024 * 1024)))
+
 # 처리 설정
 BATCH_SIZE = 10
 MAX_WORKERS = 4
@@ -66,4 +93,66 @@ os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
 # .env 파일에서 USE_RERANKER=false 로 설정 가능
 USE_RERANKER = os.getenv('USE_RERANKER', 'true').lower() == 'true'
 
+# [Reranker 백엔드 선택]
+# torch: sentence-transformers CrossEncoder (기본값)
+# onnx: ONNX Runtime (fp32)
+# onnx-int8: ONNX Runtime + 동적 int8 양자화 (CPU 권장)
+RERANKER_BACKEND = os.getenv('RERANKER_BACKEND', 'torch').lower()
+RERANKER_MAX_LENGTH = int(os.getenv('RERANKER_MAX_LENGTH', '512'))
+RERANKER_BATCH_SIZE = int(os.getenv('RERANKER_BATCH_SIZE', '32'))
+# Reranker intra-op 스레드 수 (0이면 기본값)
+# ONNX Runtime은 세션 옵션, torch는 워커 스레드 시작 시 torch.set_num_threads (프로세스 전역)로 적용
+RERANKER_NUM_THREADS = int(os.getenv('RERANKER_NUM_THREADS', '0'))
+# Reranker 마이크로 배치: 동시 요청의 쌍을 최대 RERANK_BATCH_WAIT_MS 동안 모아 한 번에 계산
+RERANK_BATCH_WAIT_MS = float(os.getenv('RERANK_BATCH_WAIT_MS', '5'))
+RERANK_MAX_BATCH_PAIRS = int(os.getenv('RERANK_MAX_BATCH_PAIRS', '128'))
+RERANK_WORKERS = int(os.getenv('RERANK_WORKERS', '1'))
+
+# 질문 임베딩 캐시 / 배치 인코딩 (TTL 0이면 만료 없음)
+EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '10000'))
+EMBEDDING_CACHE_TTL = float(os.getenv('EMBEDDING_CACHE_TTL', '0'))
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '16'))
+EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', '1'))
+# 임베딩 마이크로 배치: 동시 요청의 질문을 최대 EMBEDDING_BATCH_WAIT_MS 동안 모아 한 번에 인코딩
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv('EMBEDDING_BATCH_WAIT_MS', '5'))
+EMBEDDING_MAX_BATCH_TEXTS = int(os.getenv('EMBEDDING_MAX_BATCH_TEXTS', '64'))
+# 공유 임베딩 서버 주소 (embedding_server.py). 비어 있으면 프로세스 안에서 직접 인코딩합니다.
+# 'unix:/tmp/zipfit-embedding.sock' 또는 '127.0.0.1:8765' 형식. uvicorn --workers N 일 때 모델을 한 번만 올립니다.
+EMBEDDING_SERVER = os.getenv('EMBEDDING_SERVER', '').strip()
+EMBEDDING_SERVER_TIMEOUT = float(os.getenv('EMBEDDING_SERVER_TIMEOUT', '10'))
+
+# Rerank 후보 사전 축소 (Cross-Encoder 호출 전)
+# - 공고당 최대 후보 수, 벡터 유사도 하한(키워드로만 찾은 후보는 제외), 점수 급락 지점 이후 제거
+# - 어떤 경우에도 RERANK_MIN_CANDIDATES 개까지는 남깁니다. (bench_rerank_pruning.py로 재현율/지연시간 확인)
+RERANK_PRUNE = os.getenv('RERANK_PRUNE', 'true').lower() == 'true'
+RERANK_MAX_PER_ANNOUNCEMENT = int(os.getenv('RERANK_MAX_PER_ANNOUNCEMENT', '6'))
+RERANK_SIMILARITY_FLOOR = float(os.getenv('RERANK_SIMILARITY_FLOOR', '0.35'))
+RERANK_SCORE_GAP = float(os.getenv('RERANK_SCORE_GAP', '0.3'))  # 최고 점수 대비 인접 후보 간 하락 비율
+RERANK_MIN_CANDIDATES = int(os.getenv('RERANK_MIN_CANDIDATES', '12'))
+# 여러 공고에 반복되는 공통 문구(유의사항, 소득·자산 기준표 등)는 본문이 같으면 점수가 가장 높은 1개만 Rerank
+RERANK_COLLAPSE_DUPLICATES = os.getenv('RERANK_COLLAPSE_DUPLICATES', 'true').lower() == 'true'
+
+# Rerank 점수 캐시 (정규화된 질문 해시 + chunk_id 단위)
+RERANK_CACHE_SIZE = int(os.getenv('RERANK_CACHE_SIZE', '50000'))
+RERANK_CACHE_TTL = float(os.getenv('RERANK_CACHE_TTL', '3600'))
+
+# 답변 캐시 (이전 대화가 없는 질문만 적용, 0이면 사용 안 함)
+# 키: 재구성 질문 + 검색 필터 + 상위 공고 ID + 코퍼스 버전(공고 갱신/벡터화 시각, 최대 청크 ID)
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '1000'))
+ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', '21600'))
+ANSWER_CACHE_TOP_IDS = int(os.getenv('ANSWER_CACHE_TOP_IDS', '5'))
+# 코퍼스 버전 조회 주기(초): 재벡터화/상태 변경이 답변 캐시에 반영되기까지의 최대 지연
+CORPUS_VERSION_TTL = float(os.getenv('CORPUS_VERSION_TTL', '30'))
+
+# [질문 분석 방식]
+# True면 맥락 분석/재구성/멀티쿼리를 단일 LLM 호출(Query Planner)로 처리
+# False면 기존 개별 호출 방식 (A/B 비교용)
+USE_QUERY_PLANNER = os.getenv('USE_QUERY_PLANNER', 'true').lower() == 'true'
+
+# [추측 실행 (Speculative Retrieval)]
+# 개별 호출 방식(USE_QUERY_PLANNER=false)에서만 적용됩니다.
+# 맥락 분석(analyze_context)과 동시에 재구성 -> 멀티쿼리 -> 하이브리드 검색을 미리 시작하고,
+# 맥락 분석 결과가 대화 맥락/공고 참조 질문이면 미리 실행한 검색은 취소합니다.
+SPECULATIVE_RETRIEVAL = os.getenv('SPECULATIVE_RETRIEVAL', 'false').lower() == 'true'
+
 print(f"Reranker 상태: {'ON' if USE_RERANKER else 'OFF'}")
\ No newline at end of file
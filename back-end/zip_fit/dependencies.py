@@ -1,15 +1,29 @@
 import os
-from typing import Optional, Dict
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Union
+import asyncpg
 from sentence_transformers import SentenceTransformer, CrossEncoder
 from openai import AsyncOpenAI
 from huggingface_hub import snapshot_download
 import config
+from reranker import OnnxCrossEncoder, load_onnx_reranker
 
 
 # 전역 변수
 _embedding_model: Optional[SentenceTransformer] = None
-_reranker_model: Optional[CrossEncoder] = None
+_reranker_model: Optional[Union[CrossEncoder, OnnxCrossEncoder]] = None
 _openai_client: Optional[AsyncOpenAI] = None
+_db_pool: Optional[asyncpg.Pool] = None
+_db_pool_lock = asyncio.Lock()  # lifespan 이전 동시 요청이 풀을 여러 개 만들지 않도록
+
+# 커넥션 풀 사용 통계
+_pool_metrics = {
+    'acquire_count': 0,
+    'acquire_wait_total': 0.0,
+    'acquire_wait_max': 0.0,
+}
 
 def get_openai_client() -> AsyncOpenAI:
     global _openai_client
@@ -22,7 +36,7 @@ def load_models():
     앱 시작 시 AI 모델을 로드합니다.
     지정된 폴더에 모델이 없으면 자동으로 다운로드합니다.
     """
-    global _embedding_model, _reranker_model
+    global _reranker_model
     
     # 기본 저장 경로
     base_path = os.path.abspath(config.MODEL_CACHE_DIR)
@@ -32,19 +46,9 @@ def load_models():
     
 
     # 1. 임베딩 모델 로드 (자동 다운로드 포함)
-    if _embedding_model is None:
-        print(f"[System] 임베딩 모델 확인 중... ({config.EMBEDDING_MODEL_NAME})")
-        try:
-            # SentenceTransformer는 cache_folder를 주면 알아서 다운로드하지만,
-            # 명시적으로 경로를 지정합니다.
-            _embedding_model = SentenceTransformer(
-                config.EMBEDDING_MODEL_NAME, 
-                cache_folder=base_path
-            )
-            print("[System] 임베딩 모델 준비 완료")
-        except Exception as e:
-            print(f"[Critical] 임베딩 모델 로딩 실패: {e}")
-            raise e
+    # 임베딩 서버(EMBEDDING_SERVER)를 쓰면 워커 프로세스마다 모델을 올리지 않습니다.
+    if not config.EMBEDDING_SERVER:
+        load_embedding_model()
 
 
     # 2. Reranker 모델 로드
@@ -69,33 +73,133 @@ def load_models():
                 except Exception as e:
                     print(f"[Error] 다운로드 실패: {e}")
             
+            # 로컬 경로가 있으면 경로를, 다운로드 실패했으면 온라인 ID를 사용
+            model_source = local_rerank_path if os.path.exists(local_rerank_path) else rerank_model_name
+
+            # ONNX 백엔드 (설정 시) - 실패하면 torch로 대체
+            if config.RERANKER_BACKEND in ('onnx', 'onnx-int8'):
+                print(f"[System] Reranker 백엔드: {config.RERANKER_BACKEND}")
+                _reranker_model = load_onnx_reranker(model_source, base_path)
+                if _reranker_model is not None:
+                    print("[System] Reranker 모델 로딩 완료 (ONNX Runtime)")
+                else:
+                    print("[System] torch 백엔드로 대체합니다.")
+
             # 이제 파일이 있다고 확신하고 로드
-            try:
-                # 로컬 경로가 있으면 경로를, 다운로드 실패했으면 온라인 ID를 사용
-                model_source = local_rerank_path if os.path.exists(local_rerank_path) else rerank_model_name
-                
-                print(f"[System] 모델을 메모리로 올리는 중... (Source: {model_source})")
-                _reranker_model = CrossEncoder(
-                    model_source, 
-                    device='cpu'
-                )
-                print("[System] Reranker 모델 로딩 완료")
-            except Exception as e:
-                print(f"[Error] Reranker 모델 로딩 실패: {e}")
-                print("[System] Reranker 기능이 비활성화됩니다.")
+            if _reranker_model is None:
+                try:
+                    print(f"[System] 모델을 메모리로 올리는 중... (Source: {model_source})")
+                    _reranker_model = CrossEncoder(
+                        model_source, 
+                        device='cpu'
+                    )
+                    print("[System] Reranker 모델 로딩 완료")
+                except Exception as e:
+                    print(f"[Error] Reranker 모델 로딩 실패: {e}")
+                    print("[System] Reranker 기능이 비활성화됩니다.")
     else:
         print("[System] Reranker 로딩 건너뜀 (설정 OFF)")
 
     print("[System] 모든 시스템 준비 완료\n")
 
+def load_embedding_model() -> SentenceTransformer:
+    """임베딩 모델 로드 (load_models, embedding_server.py에서 사용)"""
+    global _embedding_model
+    if _embedding_model is None:
+        base_path = os.path.abspath(config.MODEL_CACHE_DIR)
+        print(f"[System] 임베딩 모델 확인 중... ({config.EMBEDDING_MODEL_NAME})")
+        try:
+            # SentenceTransformer는 cache_folder를 주면 알아서 다운로드하지만,
+            # 명시적으로 경로를 지정합니다.
+            _embedding_model = SentenceTransformer(
+                config.EMBEDDING_MODEL_NAME, 
+                cache_folder=base_path
+            )
+            print("[System] 임베딩 모델 준비 완료")
+        except Exception as e:
+            print(f"[Critical] 임베딩 모델 로딩 실패: {e}")
+            raise e
+    return _embedding_model
+
 def get_embedding_model() -> SentenceTransformer:
-    if _embedding_model is None: load_models()
+    if _embedding_model is None: load_embedding_model()
     return _embedding_model
 
-def get_reranker() -> Optional[CrossEncoder]:
+def get_reranker() -> Optional[Union[CrossEncoder, OnnxCrossEncoder]]:
     if not config.USE_RERANKER: return None
     if _reranker_model is None: load_models()
     return _reranker_model
 
 def get_db_config() -> Dict:
-    return config.DB_CONFIG
\ No newline at end of file
+    return config.DB_CONFIG
+
+
+# DB 커넥션 풀 관리
+async def init_db_pool() -> asyncpg.Pool:
+    """
+    앱 시작 시 asyncpg 커넥션 풀을 생성합니다.
+    요청마다 connect/close 하지 않고 풀에서 커넥션을 빌려 씁니다.
+    동시에 여러 번 호출되어도 락 안에서 한 번만 생성합니다.
+    """
+    global _db_pool
+    async with _db_pool_lock:
+        if _db_pool is None:
+            print(f"[System] DB 커넥션 풀 생성 중... (min={config.DB_POOL_MIN_SIZE}, max={config.DB_POOL_MAX_SIZE})")
+            _db_pool = await asyncpg.create_pool(
+                **get_db_config(),
+                min_size=config.DB_POOL_MIN_SIZE,
+                max_size=config.DB_POOL_MAX_SIZE,
+                statement_cache_size=config.DB_STATEMENT_CACHE_SIZE,
+                max_inactive_connection_lifetime=config.DB_POOL_MAX_INACTIVE_LIFETIME,
+                command_timeout=config.DB_COMMAND_TIMEOUT
+            )
+            print("[System] DB 커넥션 풀 준비 완료")
+    return _db_pool
+
+async def close_db_pool():
+    """앱 종료 시 커넥션 풀을 닫습니다."""
+    global _db_pool
+    async with _db_pool_lock:
+        if _db_pool is not None:
+            await _db_pool.close()
+            _db_pool = None
+            print("[System] DB 커넥션 풀 종료")
+
+async def get_db_pool() -> asyncpg.Pool:
+    if _db_pool is None: await init_db_pool()
+    return _db_pool
+
+@asynccontextmanager
+async def acquire_connection():
+    """
+    풀에서 커넥션을 빌려오고, 대기 시간을 통계에 기록합니다.
+    사용법: async with acquire_connection() as conn: ...
+    """
+    pool = await get_db_pool()
+    start = time.perf_counter()
+    async with pool.acquire() as conn:
+        waited = time.perf_counter() - start
+        _pool_metrics['acquire_count'] += 1
+        _pool_metrics['acquire_wait_total'] += waited
+        _pool_metrics['acquire_wait_max'] = max(_pool_metrics['acquire_wait_max'], waited)
+        yield conn
+
+def get_db_pool_stats() -> Dict[str, Any]:
+    """커넥션 풀 상태 (헬스 체크/모니터링용)"""
+    if _db_pool is None:
+        return {'status': 'not_initialized'}
+
+    size = _db_pool.get_size()
+    idle = _db_pool.get_idle_size()
+    count = _pool_metrics['acquire_count']
+    return {
+        'status': 'closing' if _db_pool.is_closing() else 'ok',
+        'min_size': _db_pool.get_min_size(),
+        'max_size': _db_pool.get_max_size(),
+        'size': size,
+        'idle': idle,
+        'in_use': size - idle,
+        'acquire_count': count,
+        'acquire_wait_avg_ms': round(_pool_metrics['acquire_wait_total'] / count * 1000, 3) if count else 0.0,
+        'acquire_wait_max_ms': round(_pool_metrics['acquire_wait_max'] * 1000, 3),
+    }
\ No newline at end of file
@@ -0,0 +1,109 @@
+import time
+import asyncio
+from typing import List, Dict, Any
+import numpy as np
+import config
+import metrics
+from dependencies import get_embedding_model
+from cache import TTLCache, normalize_text
+from batching import MicroBatcher
+
+
+# 질문 임베딩 서비스
+# - 요청의 모든 질문(멀티쿼리)을 한 번의 배치로 인코딩합니다.
+# - 인코딩은 전용 스레드에서 실행하여 이벤트 루프를 막지 않습니다.
+# - 동시에 들어온 요청들의 질문을 EMBEDDING_BATCH_WAIT_MS 동안 모아 한 번에 인코딩합니다. (batching.MicroBatcher)
+# - 정규화된 질문 텍스트 기준으로 결과를 캐싱하여 같은 질문은 다시 계산하지 않습니다.
+# - EMBEDDING_SERVER가 설정되면 공유 임베딩 서버(embedding_server.py)에 인코딩을 맡기고,
+#   서버에 연결할 수 없을 때만 이 프로세스에서 직접 인코딩합니다.
+embedding_cache = TTLCache('embedding', maxsize=config.EMBEDDING_CACHE_SIZE, ttl=config.EMBEDDING_CACHE_TTL)
+
+# 공유 서버 주소 (embedding_server.py 자신은 ''로 바꿔 로컬 인코딩만 사용)
+server_address = config.EMBEDDING_SERVER
+_REMOTE_RETRY_INTERVAL = 30.0
+_remote_failed_at = 0.0
+_remote_stats = {'requests': 0, 'texts': 0, 'failures': 0}
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    model = get_embedding_model()
+    return model.encode(
+        texts, normalize_embeddings=True,
+        show_progress_bar=False, batch_size=config.EMBEDDING_BATCH_SIZE
+    )
+
+
+embedding_batcher = MicroBatcher(
+    'embedding', _encode_batch,
+    max_wait_ms=config.EMBEDDING_BATCH_WAIT_MS,
+    max_batch_items=config.EMBEDDING_MAX_BATCH_TEXTS,
+    workers=config.EMBEDDING_WORKERS,
+    sort_key=len
+)
+
+
+async def _encode_missing(texts: List[str]) -> np.ndarray:
+    """캐시에 없는 질문 인코딩: 공유 서버 우선, 실패 시 로컬 마이크로 배치"""
+    global _remote_failed_at
+    if server_address and time.monotonic() - _remote_failed_at >= _REMOTE_RETRY_INTERVAL:
+        from embedding_server import request_embeddings
+        try:
+            vectors = await request_embeddings(server_address, texts, timeout=config.EMBEDDING_SERVER_TIMEOUT)
+            _remote_stats['requests'] += 1
+            _remote_stats['texts'] += len(texts)
+            return vectors
+        except (OSError, asyncio.TimeoutError, RuntimeError) as e:
+            _remote_failed_at = time.monotonic()
+            _remote_stats['failures'] += 1
+            print(f"[Warning] 임베딩 서버({server_address}) 연결 실패, {_REMOTE_RETRY_INTERVAL:.0f}초 동안 로컬 인코딩 사용: {e}")
+    return await embedding_batcher.submit(texts)
+
+
+async def encode_queries(queries: List[str]) -> List[np.ndarray]:
+    """
+    여러 질문의 임베딩을 반환합니다. (입력 순서 유지)
+    캐시에 없는 질문만 모아서 한 번에 인코딩합니다.
+    """
+    # 임베딩 모델은 대소문자를 구분하므로 공백만 정규화합니다.
+    keys = [normalize_text(q, lowercase=False) for q in queries]
+    embeddings = {}
+    missing = []
+    for key in keys:
+        if key in embeddings or key in missing:
+            continue
+        cached = embedding_cache.get(key)
+        if cached is None:
+            missing.append(key)
+        else:
+            embeddings[key] = cached
+
+    if missing:
+        # 원문 대신 정규화된 텍스트로 인코딩해야 캐시 키와 결과가 일치합니다.
+        with metrics.span('embedding'):
+            vectors = await _encode_missing(missing)
+        for key, vector in zip(missing, vectors):
+            embedding_cache.set(key, vector)
+            embeddings[key] = vector
+
+    return [embeddings[key] for key in keys]
+
+
+async def encode_query(query: str) -> np.ndarray:
+    """단일 질문 임베딩"""
+    return (await encode_queries([query]))[0]
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    return {embedding_cache.name: embedding_cache.stats()}
+
+
+def get_batcher_stats() -> Dict[str, Any]:
+    stats = {'local': embedding_batcher.stats()}
+    if server_address:
+        stats['server'] = {'address': server_address, **_remote_stats}
+    return stats
+
+
+def shutdown():
+    """앱 종료 시 임베딩 스레드 정리"""
+    embedding_batcher.shutdown()
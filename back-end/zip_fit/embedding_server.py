@@ -0,0 +1,122 @@
+"""
+공유 임베딩 서버
+- uvicorn --workers N 으로 띄우면 워커마다 bge-m3를 올려 메모리를 N배 쓰고, 배치도 워커 안에서만 묶입니다.
+- 이 프로세스 하나가 모델을 올리고, 모든 워커의 질문을 Unix 소켓(또는 TCP)으로 받아
+  embedding.encode_queries(캐시 + 마이크로 배치)로 한 번에 인코딩합니다.
+- 워커는 .env의 EMBEDDING_SERVER 주소로 접속하며, 서버에 연결할 수 없으면 워커 안에서 직접 인코딩합니다.
+
+프로토콜 (요청 하나당 연결 하나)
+- 요청: [4바이트 길이][UTF-8 JSON 문자열 리스트]
+- 응답: [int32 개수(-1이면 오류)][uint32 차원 또는 메시지 길이][float32 벡터 또는 오류 메시지]
+
+실행: EMBEDDING_SERVER=unix:/tmp/zipfit-embedding.sock python embedding_server.py
+"""
+import os
+import json
+import struct
+import asyncio
+from typing import List, Tuple
+import numpy as np
+import config
+import embedding
+from dependencies import load_embedding_model
+
+_REQUEST_HEADER = struct.Struct('!I')
+_RESPONSE_HEADER = struct.Struct('!iI')
+MAX_REQUEST_BYTES = 4 * 1024 * 1024
+
+
+def parse_address(address: str) -> Tuple[str, object]:
+    """'unix:/path' → ('unix', path), 'host:port' → ('tcp', (host, port))"""
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return 'tcp', (host or '127.0.0.1', int(port))
+
+
+async def _open_connection(address: str):
+    kind, target = parse_address(address)
+    if kind == 'unix':
+        return await asyncio.open_unix_connection(target)
+    return await asyncio.open_connection(*target)
+
+
+async def request_embeddings(address: str, texts: List[str], timeout: float = 10.0) -> np.ndarray:
+    """클라이언트: 서버에 질문 리스트를 보내고 (len(texts), dim) float32 배열을 받습니다."""
+    async def _request():
+        reader, writer = await _open_connection(address)
+        try:
+            payload = json.dumps(texts, ensure_ascii=False).encode('utf-8')
+            writer.write(_REQUEST_HEADER.pack(len(payload)) + payload)
+            await writer.drain()
+
+            count, size = _RESPONSE_HEADER.unpack(await reader.readexactly(_RESPONSE_HEADER.size))
+            if count < 0:
+                message = (await reader.readexactly(size)).decode('utf-8')
+                raise RuntimeError(f"임베딩 서버 오류: {message}")
+            body = await reader.readexactly(count * size * 4)
+            return np.frombuffer(body, dtype=np.float32).reshape(count, size)
+        finally:
+            writer.close()
+
+    try:
+        return await asyncio.wait_for(_request(), timeout=timeout)
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError("임베딩 서버 응답이 중간에 끊겼습니다") from e
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        (length,) = _REQUEST_HEADER.unpack(await reader.readexactly(_REQUEST_HEADER.size))
+        if length > MAX_REQUEST_BYTES:
+            raise ValueError(f"요청이 너무 큽니다 ({length} bytes)")
+        texts = json.loads((await reader.readexactly(length)).decode('utf-8'))
+
+        # 여러 워커의 동시 요청이 이 프로세스의 캐시와 마이크로 배치를 함께 사용합니다.
+        vectors = np.asarray(await embedding.encode_queries(texts), dtype=np.float32)
+        writer.write(_RESPONSE_HEADER.pack(len(texts), vectors.shape[1] if len(texts) else 0) + vectors.tobytes())
+    except asyncio.IncompleteReadError:
+        return
+    except Exception as e:
+        message = str(e).encode('utf-8')
+        writer.write(_RESPONSE_HEADER.pack(-1, len(message)) + message)
+    finally:
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+async def serve(address: str):
+    # 서버 자신은 다시 서버로 요청하지 않고 직접 인코딩합니다.
+    embedding.server_address = ''
+    load_embedding_model()
+
+    kind, target = parse_address(address)
+    if kind == 'unix':
+        if os.path.exists(target):
+            os.remove(target)
+        server = await asyncio.start_unix_server(_handle, path=target)
+    else:
+        server = await asyncio.start_server(_handle, *target)
+
+    print(f"[System] 임베딩 서버 시작: {address} "
+          f"(배치 대기 {config.EMBEDDING_BATCH_WAIT_MS}ms, 최대 {config.EMBEDDING_MAX_BATCH_TEXTS}개)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        embedding.shutdown()
+        print(f"[System] 임베딩 서버 종료: {embedding.get_batcher_stats()['local']}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="공유 임베딩 서버 (uvicorn 워커 간 모델/배치 공유)")
+    parser.add_argument('--address', default=config.EMBEDDING_SERVER or 'unix:/tmp/zipfit-embedding.sock',
+                        help="'unix:/path' 또는 'host:port'")
+    try:
+        asyncio.run(serve(parser.parse_args().address))
+    except KeyboardInterrupt:
+        pass
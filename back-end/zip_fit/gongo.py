@@ -1,124 +1,265 @@
-import asyncpg
-import asyncio
 import json
-from typing import List, Dict, Tuple, Any
+import time
+from typing import List, Dict, Tuple, Any, Optional
 import config
-from dependencies import get_embedding_model, get_reranker, get_db_config
+from dependencies import get_reranker, acquire_connection
+from cache import TTLCache, text_hash, normalize_text
+from reranker import rerank_batcher
+import embedding
+import metrics
+
+
+# 검색 단계 캐시
+# (질문 해시, chunk_id) -> rerank 점수
+rerank_cache = TTLCache('rerank', maxsize=config.RERANK_CACHE_SIZE, ttl=config.RERANK_CACHE_TTL)
+
+# (재구성 질문, 필터, 상위 공고 ID, 코퍼스 버전) -> 답변
+answer_cache = TTLCache('answer', maxsize=config.ANSWER_CACHE_SIZE, ttl=config.ANSWER_CACHE_TTL)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """검색 단계 캐시 상태 (모니터링용)"""
+    return {
+        rerank_cache.name: rerank_cache.stats(),
+        answer_cache.name: {**answer_cache.stats(), 'corpus_version': _corpus_version['value']},
+        **embedding.get_cache_stats()
+    }
+
+
+# 코퍼스 버전 (답변 캐시 무효화용)
+# 공고 상태 변경(announcements.updated_at 트리거), 파일 재벡터화(vectorized_at),
+# 청크 재생성(document_chunks.id 증가) 중 하나라도 바뀌면 값이 달라집니다.
+_corpus_version = {'value': None, 'checked_at': 0.0}
+
+async def get_corpus_version() -> Optional[str]:
+    now = time.monotonic()
+    if _corpus_version['value'] is not None and now - _corpus_version['checked_at'] < config.CORPUS_VERSION_TTL:
+        return _corpus_version['value']
+
+    try:
+        async with acquire_connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT (SELECT max(updated_at) FROM announcements) AS announcements_at,
+                       (SELECT max(vectorized_at) FROM announcement_files) AS files_at,
+                       (SELECT max(id) FROM document_chunks) AS max_chunk_id
+            """)
+    except Exception as e:
+        print(f"[Warning] 코퍼스 버전 조회 실패: {e}")
+        return None
+
+    version = f"{row['announcements_at']}|{row['files_at']}|{row['max_chunk_id']}"
+    if _corpus_version['value'] is not None and version != _corpus_version['value']:
+        # 이전 버전으로 만든 답변은 더 이상 맞지 않으므로 비웁니다.
+        print(f"[Log] 코퍼스 변경 감지 -> 답변 캐시 초기화 ({_corpus_version['value']} -> {version})")
+        answer_cache.clear()
+    _corpus_version.update(value=version, checked_at=now)
+    return version
+
+def answer_cache_key(query_analysis: Dict, merged_results: List[Dict], corpus_version: str) -> Tuple:
+    """답변 캐시 키 (같은 질문이라도 검색된 상위 공고가 다르면 다른 키)"""
+    filters = tuple(normalize_text(query_analysis.get(k)) for k in ('region', 'notice_type', 'category', 'status'))
+    top_ids = tuple(str(r['announcement_id']) for r in merged_results[:config.ANSWER_CACHE_TOP_IDS])
+    return (text_hash(query_analysis.get('rewritten_question')), filters, top_ids, corpus_version)
+
+
+# 검색 필터 SQL 구성 (벡터/키워드/하이브리드 공용)
+def _build_filter_sql(filters: dict, filter_ids: List[str], params: List) -> str:
+    """
+    공고 필터 조건을 WHERE 절 조각(" AND ...")으로 만들고, 바인딩 값을 params에 추가합니다.
+    """
+    where_clauses = []
+    if filters:
+        if filters.get('region') and filters['region'].strip():
+            where_clauses.append(f"a.region LIKE ${len(params)+1}")
+            params.append(f"%{filters['region']}%")
+        if filters.get('category') and filters['category'].strip():
+            where_clauses.append(f"a.category = ${len(params)+1}")
+            params.append(filters['category'])
+        if filters.get('notice_type') and filters['notice_type'].strip():
+            where_clauses.append(f"a.notice_type LIKE ${len(params)+1}")
+            params.append(f"%{filters['notice_type']}%")
+        if filters.get('status') and filters['status'].strip():
+            where_clauses.append(f"a.status = ${len(params)+1}")
+            params.append(filters['status'])
+
+    if filter_ids:
+        where_clauses.append(f"a.id = ANY(${len(params)+1}::text[])")
+        params.append(filter_ids)
+
+    return " AND " + " AND ".join(where_clauses) if where_clauses else ""
+
+def _build_keyword_sql(keywords: List[str], params: List, mode: str = None) -> Tuple[str, str]:
+    """
+    키워드 매칭 조건과 관련도 점수 식을 반환합니다.
+    - like: LIKE '%kw%' 매칭, 점수 = 매칭된 키워드 수 (인덱스 미사용)
+    - trgm: pg_trgm GIN 인덱스(%> 연산자) 매칭, 점수 = 키워드별 word_similarity 합
+      (migrations/001_chunk_text_trgm.sql 적용 필요)
+    """
+    mode = mode or config.KEYWORD_SEARCH_MODE
+
+    # 중복/공백 키워드 제거 (LLM이 동의어를 많이 생성하므로)
+    unique_keywords = list(dict.fromkeys(kw.strip() for kw in keywords if kw and kw.strip()))
+
+    keyword_conditions, score_terms = [], []
+    for kw in unique_keywords:
+        if mode == 'trgm':
+            params.append(kw)
+            keyword_conditions.append(f"dc.chunk_text %> ${len(params)}")
+            score_terms.append(f"word_similarity(${len(params)}, dc.chunk_text)")
+        else:
+            params.append(f"%{kw}%")
+            condition = f"dc.chunk_text LIKE ${len(params)}"
+            keyword_conditions.append(condition)
+            score_terms.append(f"(CASE WHEN {condition} THEN 1 ELSE 0 END)")
+
+    match_sql = " OR ".join(keyword_conditions) if keyword_conditions else "1=1"
+    score_sql = " + ".join(score_terms) or "0"
+    return match_sql, score_sql
 
 
 # 1. 벡터 검색 (Vector Search)
-async def vector_search(query: str, top_k: int = 15, filters: dict = None, filter_ids: List[str] = None) -> List[Dict]:
+async def vector_search(query: str, top_k: int = 15, filters: dict = None, filter_ids: List[str] = None,
+                        query_embedding=None) -> List[Dict]:
     """
     임베딩 모델을 사용해 의미 기반 검색을 수행합니다.
+    - query_embedding: 미리 배치 인코딩한 임베딩이 있으면 전달 (없으면 여기서 생성)
     """
-    # 임베딩 생성
-    model = get_embedding_model()
-    conn = await asyncpg.connect(**get_db_config())
-    try:
-        query_embedding = model.encode(query, normalize_embeddings=True)
-        
-        where_clauses = []
-        params = [str(query_embedding.tolist())]
-
-        if filters:
-            if filters.get('region') and filters['region'].strip():
-                where_clauses.append(f"a.region LIKE ${len(params)+1}")
-                params.append(f"%{filters['region']}%")
-            if filters.get('category') and filters['category'].strip():
-                where_clauses.append(f"a.category = ${len(params)+1}")
-                params.append(filters['category'])
-            if filters.get('notice_type') and filters['notice_type'].strip():
-                where_clauses.append(f"a.notice_type LIKE ${len(params)+1}")
-                params.append(f"%{filters['notice_type']}%")
-            if filters.get('status') and filters['status'].strip():
-                where_clauses.append(f"a.status = ${len(params)+1}")
-                params.append(filters['status'])
-        
-        if filter_ids:
-            where_clauses.append(f"a.id = ANY(${len(params)+1}::text[])")
-            params.append(filter_ids)
-        
-        where_sql = " AND " + " AND ".join(where_clauses) if where_clauses else ""
-        params.append(top_k)
-        
-        sql = f"""
-            SELECT dc.id as chunk_id, dc.announcement_id, a.title, a.category, a.region, a.notice_type,
-                   a.posted_date, a.url, a.status, dc.chunk_text, dc.chunk_index, dc.metadata,
-                   (1 - (dc.embedding <=> $1::vector)) as similarity
-            FROM document_chunks dc
-            JOIN announcements a ON dc.announcement_id = a.id
-            WHERE 1=1 {where_sql}
-            ORDER BY dc.embedding <=> $1::vector
-            LIMIT ${len(params)}
-        """
-        
-        rows = await conn.fetch(sql, *params)
-        return [dict(row) for row in rows]
-    finally:
-        await conn.close()
+    # 임베딩 생성 (캐시 + 이벤트 루프 밖에서 실행)
+    if query_embedding is None:
+        query_embedding = await embedding.encode_query(query)
+
+    params = [str(query_embedding.tolist())]
+    where_sql = _build_filter_sql(filters, filter_ids, params)
+    params.append(top_k)
+    
+    sql = f"""
+        SELECT dc.id as chunk_id, dc.announcement_id, a.title, a.category, a.region, a.notice_type,
+               a.posted_date, a.url, a.status, dc.chunk_text, dc.chunk_index, dc.metadata,
+               (1 - (dc.embedding <=> $1::vector)) as similarity
+        FROM document_chunks dc
+        JOIN announcements a ON dc.announcement_id = a.id
+        WHERE 1=1 {where_sql}
+        ORDER BY dc.embedding <=> $1::vector
+        LIMIT ${len(params)}
+    """
+    
+    with metrics.span('vector_query'):
+        async with acquire_connection() as conn:
+            rows = await conn.fetch(sql, *params)
+    return [dict(row) for row in rows]
 
 
 # 2. 키워드 검색 (Keyword Search)
-async def keyword_search(keywords: List[str], top_k: int = 10, filters: dict = None, filter_ids: List[str] = None) -> List[Dict]:
+async def keyword_search(keywords: List[str], top_k: int = 10, filters: dict = None, filter_ids: List[str] = None,
+                         mode: str = None) -> List[Dict]:
     """
-    정확한 단어 매칭을 위한 LIKE 검색을 수행합니다.
+    키워드 매칭 검색을 수행하고 관련도 점수(keyword_score) 순으로 반환합니다.
+    - mode: 'like' | 'trgm' (기본값 config.KEYWORD_SEARCH_MODE)
     """
     if not keywords:
         return []
 
-    conn = await asyncpg.connect(**get_db_config())
-    try:
-        params, keyword_conditions = [], []
-        for kw in keywords:
-            keyword_conditions.append(f"dc.chunk_text LIKE ${len(params)+1}")
-            params.append(f"%{kw}%")
-        
-        keyword_sql = " OR ".join(keyword_conditions) if keyword_conditions else "1=1"
-        
-        where_clauses = []
-        if filters:
-            if filters.get('region') and filters['region'].strip():
-                where_clauses.append(f"a.region LIKE ${len(params)+1}")
-                params.append(f"%{filters['region']}%")
-            if filters.get('category') and filters['category'].strip():
-                where_clauses.append(f"a.category = ${len(params)+1}")
-                params.append(filters['category'])
-            if filters.get('notice_type') and filters['notice_type'].strip():
-                where_clauses.append(f"a.notice_type LIKE ${len(params)+1}")
-                params.append(f"%{filters['notice_type']}%")
-            if filters.get('status') and filters['status'].strip():
-                where_clauses.append(f"a.status = ${len(params)+1}")
-                params.append(filters['status'])
-
-        if filter_ids:
-            where_clauses.append(f"a.id = ANY(${len(params)+1}::text[])")
-            params.append(filter_ids)
-        
-        where_sql = " AND " + " AND ".join(where_clauses) if where_clauses else ""
-        params.append(top_k)
-        
-        sql = f"""
-            SELECT DISTINCT ON (dc.id) dc.id as chunk_id, dc.announcement_id, a.title, a.category, a.region,
-                   a.notice_type, a.posted_date, a.url, a.status, dc.chunk_text, dc.chunk_index, dc.metadata
-            FROM document_chunks dc
-            JOIN announcements a ON dc.announcement_id = a.id
-            WHERE ({keyword_sql}) {where_sql}
-            LIMIT ${len(params)}
-        """
-        
-        rows = await conn.fetch(sql, *params)
-        return [dict(row) for row in rows]
-    finally:
-        await conn.close()
+    params = []
+    keyword_sql, score_sql = _build_keyword_sql(keywords, params, mode)
+    where_sql = _build_filter_sql(filters, filter_ids, params)
+    params.append(top_k)
+    
+    sql = f"""
+        SELECT dc.id as chunk_id, dc.announcement_id, a.title, a.category, a.region,
+               a.notice_type, a.posted_date, a.url, a.status, dc.chunk_text, dc.chunk_index, dc.metadata,
+               ({score_sql})::float8 as keyword_score
+        FROM document_chunks dc
+        JOIN announcements a ON dc.announcement_id = a.id
+        WHERE ({keyword_sql}) {where_sql}
+        ORDER BY keyword_score DESC, dc.id
+        LIMIT ${len(params)}
+    """
+    
+    with metrics.span('keyword_query'):
+        async with acquire_connection() as conn:
+            rows = await conn.fetch(sql, *params)
+    return [dict(row) for row in rows]
 
 
 # 3. 하이브리드 검색 (Hybrid Search)
+def _build_fused_search_sql(query_embeddings: List, keywords: List[str], filters: dict,
+                            filter_ids: List[str], vector_top_k: int, keyword_top_k: int) -> Tuple[str, List]:
+    """
+    멀티쿼리 벡터 검색(쿼리별 CTE) + 키워드 검색(CTE 1개)을 Reciprocal Rank Fusion으로 합치는
+    단일 SQL과 바인딩 값을 만듭니다.
+    """
+    params = []
+    where_sql = _build_filter_sql(filters, filter_ids, params)
+    ctes, ranked = [], []
+
+    # 쿼리 임베딩별 벡터 검색 CTE (HNSW 인덱스를 타도록 ORDER BY ... LIMIT 유지)
+    params.append(vector_top_k)
+    vector_limit = f"${len(params)}"
+    for i, q_emb in enumerate(query_embeddings):
+        params.append(str(q_emb.tolist()))
+        emb = f"${len(params)}::vector"
+        ctes.append(f"""v{i} AS (
+            SELECT chunk_id, distance, row_number() OVER (ORDER BY distance) AS rnk
+            FROM (
+                SELECT dc.id AS chunk_id, dc.embedding <=> {emb} AS distance
+                FROM document_chunks dc
+                JOIN announcements a ON dc.announcement_id = a.id
+                WHERE 1=1 {where_sql}
+                ORDER BY dc.embedding <=> {emb}
+                LIMIT {vector_limit}
+            ) s
+        )""")
+        ranked.append(f"SELECT chunk_id, rnk, 1 - distance AS similarity FROM v{i}")
+
+    # 키워드 검색 CTE (멀티쿼리 수와 관계없이 한 번만 실행, 관련도 점수로 순위)
+    if keywords:
+        keyword_sql, score_sql = _build_keyword_sql(keywords, params)
+        params.append(keyword_top_k)
+        ctes.append(f"""kw AS (
+            SELECT chunk_id, row_number() OVER (ORDER BY score DESC, chunk_id) AS rnk
+            FROM (
+                SELECT dc.id AS chunk_id, ({score_sql}) AS score
+                FROM document_chunks dc
+                JOIN announcements a ON dc.announcement_id = a.id
+                WHERE ({keyword_sql}) {where_sql}
+                ORDER BY score DESC, dc.id
+                LIMIT ${len(params)}
+            ) s
+        )""")
+        ranked.append("SELECT chunk_id, rnk, NULL::float8 AS similarity FROM kw")
+
+    params.append(config.RRF_K)
+    rrf_k = f"${len(params)}"
+    union_sql = "\n            UNION ALL ".join(ranked)
+
+    sql = f"""
+        WITH {', '.join(ctes)},
+        fused AS (
+            SELECT chunk_id, SUM(1.0 / ({rrf_k} + rnk)) AS rrf_score, MAX(similarity) AS similarity
+            FROM (
+                {union_sql}
+            ) r
+            GROUP BY chunk_id
+        )
+        SELECT dc.id as chunk_id, dc.announcement_id, a.title, a.category, a.region, a.notice_type,
+               a.posted_date, a.url, a.status, dc.chunk_text, dc.chunk_index, dc.metadata,
+               COALESCE(f.similarity, 0) as similarity, f.rrf_score::float8 as rrf_score
+        FROM fused f
+        JOIN document_chunks dc ON dc.id = f.chunk_id
+        JOIN announcements a ON dc.announcement_id = a.id
+        ORDER BY f.rrf_score DESC
+    """
+    return sql, params
+
 async def multi_query_hybrid_search(
     query_analysis: Dict,
     multi_queries: List[str],
     vector_top_k: int = 10,
     keyword_top_k: int = 5
 ) -> List[Dict]:
+    """
+    멀티쿼리 벡터 검색과 키워드 검색을 DB 왕복 1회로 수행하고,
+    RRF 점수로 융합된 후보(rrf_score 내림차순, chunk_id 중복 없음)를 반환합니다.
+    """
     filters = {
         'region': query_analysis.get('region', ''),
         'notice_type': query_analysis.get('notice_type', ''),
@@ -132,27 +273,91 @@ async def multi_query_hybrid_search(
         if context.get('is_followup') and context.get('referenced_announcement_ids'):
             filter_ids = context['referenced_announcement_ids']
     
-    tasks = []
-    for q in multi_queries:
-        tasks.append(vector_search(q, vector_top_k, filters, filter_ids))
-        tasks.append(keyword_search(query_analysis.get('search_keywords', []), keyword_top_k, filters, filter_ids))
-        
-    results_list = await asyncio.gather(*tasks)
-    
-    all_results = {}
-    for results in results_list:
-        for r in results:
-            chunk_id = r['chunk_id']
-            if chunk_id not in all_results:
-                all_results[chunk_id] = r
-                
-    return list(all_results.values())
+    if not multi_queries and not query_analysis.get('search_keywords'):
+        return []
+
+    # 모든 멀티쿼리 임베딩을 한 번에 생성
+    query_embeddings = await embedding.encode_queries(multi_queries)
+
+    sql, params = _build_fused_search_sql(
+        query_embeddings, query_analysis.get('search_keywords', []),
+        filters, filter_ids, vector_top_k, keyword_top_k
+    )
+
+    # 벡터/키워드 검색이 한 SQL로 실행되므로 DB 시간은 hybrid_query 단계 하나로 기록됩니다.
+    with metrics.span('hybrid_query'):
+        async with acquire_connection() as conn:
+            rows = await conn.fetch(sql, *params)
+    return [dict(row) for row in rows]
 
 
 # 4. 재순위화 (Reranking)
-async def rerank_results(query: str, search_results: List[Dict], top_k: int = 25) -> List[Dict]:
+def _candidate_score(result: Dict) -> float:
+    # 융합 점수(RRF)가 있으면 우선 사용
+    return result.get('rrf_score') or result.get('similarity') or 0
+
+def collapse_duplicates(search_results: List[Dict]) -> List[Dict]:
+    """
+    본문이 같은(공백/대소문자 정규화 기준) 후보를 하나로 합칩니다. (점수 내림차순 반환)
+    점수가 가장 높은 후보만 남기고, 합쳐진 공고 ID는 'duplicate_announcement_ids'에 기록합니다.
+    """
+    kept = {}
+    for result in sorted(search_results, key=_candidate_score, reverse=True):
+        key = text_hash(result['chunk_text'])
+        if key not in kept:
+            kept[key] = result
+            continue
+        representative = kept[key]
+        if result['announcement_id'] != representative['announcement_id']:
+            representative.setdefault('duplicate_announcement_ids', []).append(result['announcement_id'])
+    return list(kept.values())
+
+def prune_candidates(search_results: List[Dict],
+                     max_per_announcement: int = None,
+                     similarity_floor: float = None,
+                     score_gap: float = None,
+                     min_candidates: int = None) -> List[Dict]:
+    """
+    Cross-Encoder에 보낼 후보를 줄입니다. (점수 내림차순 반환)
+    1. 공고당 상위 max_per_announcement개만 유지
+    2. 벡터 유사도가 similarity_floor 미만인 후보 제거 (키워드로만 찾은 후보는 유사도가 없으므로 유지)
+    3. 인접 후보 간 점수 하락이 최고 점수의 score_gap 비율 이상인 지점 이후 제거
+    단, 점수 상위 min_candidates개는 항상 남깁니다.
+    """
+    max_per_announcement = config.RERANK_MAX_PER_ANNOUNCEMENT if max_per_announcement is None else max_per_announcement
+    similarity_floor = config.RERANK_SIMILARITY_FLOOR if similarity_floor is None else similarity_floor
+    score_gap = config.RERANK_SCORE_GAP if score_gap is None else score_gap
+    min_candidates = config.RERANK_MIN_CANDIDATES if min_candidates is None else min_candidates
+
+    ranked = sorted(search_results, key=_candidate_score, reverse=True)
+    if len(ranked) <= min_candidates:
+        return ranked
+
+    kept, per_announcement = [], {}
+    for i, result in enumerate(ranked):
+        protected = i < min_candidates
+        count = per_announcement.get(result['announcement_id'], 0)
+        if not protected:
+            if max_per_announcement > 0 and count >= max_per_announcement:
+                continue
+            similarity = result.get('similarity')
+            if similarity_floor > 0 and similarity and similarity < similarity_floor:
+                continue
+        per_announcement[result['announcement_id']] = count + 1
+        kept.append(result)
+
+    if score_gap > 0 and len(kept) > min_candidates:
+        top = _candidate_score(kept[0]) or 1.0
+        for i in range(min_candidates, len(kept)):
+            if (_candidate_score(kept[i - 1]) - _candidate_score(kept[i])) / top >= score_gap:
+                kept = kept[:i]
+                break
+    return kept
+
+async def rerank_results(query: str, search_results: List[Dict], top_k: int = 25, prune: bool = None) -> List[Dict]:
     """
     Cross-Encoder를 사용하여 결과의 순위를 재조정합니다.
+    - prune: 후보 사전 축소 여부 (기본값 config.RERANK_PRUNE)
     """
     if not search_results:
         return []
@@ -160,15 +365,40 @@ async def rerank_results(query: str, search_results: List[Dict], top_k: int = 25
     reranker = get_reranker()
 
     if reranker is None:
-        sorted_results = sorted(search_results, key=lambda x: x.get('similarity', 0), reverse=True)
+        sorted_results = sorted(search_results, key=_candidate_score, reverse=True)
         return sorted_results[:top_k]
 
+    if config.RERANK_COLLAPSE_DUPLICATES:
+        before = len(search_results)
+        search_results = collapse_duplicates(search_results)
+        metrics.increment('rag_rerank_duplicates_total', before - len(search_results), "Rerank 전 합친 중복 청크 수")
+
+    if config.RERANK_PRUNE if prune is None else prune:
+        before = len(search_results)
+        search_results = prune_candidates(search_results)
+        metrics.increment('rag_rerank_candidates_total', before, "Rerank 후보 수", stage='before')
+        metrics.increment('rag_rerank_candidates_total', len(search_results), "Rerank 후보 수", stage='after')
+
     try:
-        pairs = [(query, r['chunk_text']) for r in search_results]
-        scores = await asyncio.to_thread(reranker.predict, pairs)
-        
-        for i, result in enumerate(search_results):
-            result['rerank_score'] = float(scores[i])
+        # 캐시에 없는 (질문, 청크) 쌍만 Cross-Encoder로 계산
+        query_key = text_hash(query)
+        uncached = []
+        for result in search_results:
+            score = rerank_cache.get((query_key, result['chunk_id']))
+            if score is None:
+                uncached.append(result)
+            else:
+                result['rerank_score'] = score
+
+        if uncached:
+            pairs = [(query, r['chunk_text']) for r in uncached]
+            with metrics.span('rerank_predict'):
+                # 다른 요청의 쌍과 함께 마이크로 배치로 계산
+                scores = await rerank_batcher.submit(pairs)
+
+            for i, result in enumerate(uncached):
+                result['rerank_score'] = float(scores[i])
+                rerank_cache.set((query_key, result['chunk_id']), result['rerank_score'])
         
         reranked = sorted(search_results, key=lambda x: x['rerank_score'], reverse=True)
         return reranked[:top_k]
@@ -179,7 +409,22 @@ async def rerank_results(query: str, search_results: List[Dict], top_k: int = 25
 
 
 # 5. 청크 병합 (Merge Chunks)
+def _strip_overlap(previous: str, text: str, min_overlap: int = 20) -> str:
+    """
+    앞 청크 끝과 겹치는 앞부분을 제거합니다. (문서에서 바로 이어지는 청크끼리만 호출)
+    (청킹 시 CHUNK_OVERLAP 만큼 겹치게 자르므로, 구분자 위치에 따라 최대 2배까지 확인)
+    """
+    limit = min(len(previous), len(text), config.CHUNK_OVERLAP * 2)
+    for size in range(limit, min_overlap - 1, -1):
+        if previous.endswith(text[:size]):
+            return text[size:].lstrip()
+    return text
+
 async def merge_chunks(chunks: List[Dict]) -> List[Dict]:
+    """
+    공고별로 청크를 묶어 문서 순서대로 병합합니다.
+    - 겹치는 텍스트와 중복 청크는 제거하고, 청크별 본문/점수는 'chunks'에 남겨 컨텍스트 예산 배분에 사용합니다.
+    """
     if not chunks:
         return []
     
@@ -193,8 +438,26 @@ async def merge_chunks(chunks: List[Dict]) -> List[Dict]:
     merged_results = []
     for ann_id, ann_chunks in announcement_chunks.items():
         ann_chunks.sort(key=lambda x: x.get('chunk_index', 999))
-        
-        merged_text = '\n\n'.join([c['chunk_text'] for c in ann_chunks])
+
+        parts, seen_texts, previous, previous_index = [], set(), '', None
+        for c in ann_chunks:
+            text = c['chunk_text']
+            if text in seen_texts:
+                continue
+            seen_texts.add(text)
+            # 인접하지 않은 청크는 우연히 같은 문장으로 시작해도 잘라내지 않음
+            chunk_index = c.get('chunk_index')
+            if previous and chunk_index is not None and previous_index is not None and chunk_index - previous_index == 1:
+                text = _strip_overlap(previous, text)
+            previous, previous_index = c['chunk_text'], chunk_index
+            if text:
+                parts.append({
+                    'chunk_index': c.get('chunk_index'),
+                    'rerank_score': c.get('rerank_score', c.get('rrf_score') or 0),
+                    'text': text
+                })
+
+        merged_text = '\n\n'.join(p['text'] for p in parts)
         max_score_chunk = max(ann_chunks, key=lambda x: x.get('rerank_score', 0))
         
         posted_date = ann_chunks[0].get('posted_date')
@@ -210,6 +473,7 @@ async def merge_chunks(chunks: List[Dict]) -> List[Dict]:
             'notice_type': ann_chunks[0]['notice_type'],
             'category': ann_chunks[0]['category'],
             'merged_content': merged_text,
+            'chunks': parts,
             'rerank_score': max_score_chunk.get('rerank_score', 0),
             'num_chunks': len(ann_chunks)
         })
@@ -218,16 +482,60 @@ async def merge_chunks(chunks: List[Dict]) -> List[Dict]:
     return merged_results
 
 # 6. 컨텍스트 구성 (Context Builder)
-def build_context(merged_results: List[Dict]) -> str:
-    if not merged_results:
-        return "검색된 관련 정보가 없습니다."
-    
-    context_parts = []
-    for i, result in enumerate(merged_results, 1):
-        category_name = "임대" if result['category'] == 'lease' else "분양"
-        url = result.get('announcement_url', '')
+# 토큰 계산기: tiktoken이 있으면 gpt-4o 토크나이저, 없으면 글자 수 기반 추정
+_token_encoding = {'loaded': False, 'encoding': None}
+
+def _get_encoding():
+    if not _token_encoding['loaded']:
+        _token_encoding['loaded'] = True
+        try:
+            import tiktoken
+            _token_encoding['encoding'] = tiktoken.get_encoding(config.CONTEXT_TOKEN_ENCODING)
+        except Exception as e:
+            print(f"[Warning] tiktoken 사용 불가, 토큰 수를 추정합니다: {e}")
+    return _token_encoding['encoding']
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # 추정: 한글 등 비ASCII는 글자당 약 1토큰, ASCII는 4글자당 1토큰
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+def _truncate_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ''
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens]) + " ..."
+    total = count_tokens(text)
+    return text if total <= max_tokens else text[:int(len(text) * max_tokens / total)] + " ..."
 
-        context_parts.append(f"""━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+def _select_chunks(result: Dict, budget: int) -> Tuple[str, int]:
+    """공고 하나의 본문을 예산 안에서 구성 (점수 높은 청크부터 선택, 출력은 문서 순서)"""
+    parts = result.get('chunks') or [{'chunk_index': 0, 'rerank_score': 0, 'text': result.get('merged_content') or ''}]
+    selected, used = [], 0
+    for part in sorted(parts, key=lambda p: p.get('rerank_score') or 0, reverse=True):
+        tokens = count_tokens(part['text'])
+        if used + tokens <= budget:
+            selected.append((part, part['text']))
+            used += tokens
+        elif not selected:
+            # 가장 관련도 높은 청크가 예산보다 크면 잘라서라도 포함
+            text = _truncate_tokens(part['text'], budget)
+            selected.append((part, text))
+            used += count_tokens(text)
+            break
+    selected.sort(key=lambda x: x[0].get('chunk_index') if x[0].get('chunk_index') is not None else 999)
+    return '\n\n'.join(text for _, text in selected), used
+
+def _format_document(i: int, result: Dict, content: str) -> str:
+    category_name = "임대" if result['category'] == 'lease' else "분양"
+    url = result.get('announcement_url', '')
+
+    return f"""━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 문서 {i}: {result['announcement_title']}
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
@@ -240,9 +548,47 @@ def build_context(merged_results: List[Dict]) -> str:
 - 관련도: {result['rerank_score']:.3f}
 
 [문서 내용]
-{result['merged_content']}""")
-    
-    return '\n\n'.join(context_parts)
+{content}"""
+
+def build_context(merged_results: List[Dict], max_tokens: int = None) -> Tuple[str, List[Dict]]:
+    """
+    답변 생성용 컨텍스트를 토큰 예산(기본 config.CONTEXT_MAX_TOKENS) 안에서 구성합니다.
+    - 공고별 본문 예산은 rerank 점수 비율로 배분하고, 남은 예산은 다음 공고로 넘깁니다.
+    - 최소 예산(CONTEXT_MIN_DOC_TOKENS)도 받지 못하는 하위 공고는 제외합니다.
+    반환값: (컨텍스트, 컨텍스트에 포함된 공고 목록) - 출처는 포함된 공고로만 구성합니다.
+    """
+    if not merged_results:
+        return "검색된 관련 정보가 없습니다.", []
+
+    max_tokens = config.CONTEXT_MAX_TOKENS if max_tokens is None else max_tokens
+    if max_tokens <= 0:
+        return '\n\n'.join(_format_document(i, r, r['merged_content']) for i, r in enumerate(merged_results, 1)), merged_results
+
+    # 문서 머리말(기본 정보) 비용을 먼저 빼고, 본문 예산을 점수 비율로 나눌 공고 선정
+    docs = sorted(merged_results, key=lambda r: r.get('rerank_score') or 0, reverse=True)
+    headers = [count_tokens(_format_document(i, r, '')) for i, r in enumerate(docs, 1)]
+    while len(docs) > 1:
+        weights = [max(r.get('rerank_score') or 0, 0) + 1e-6 for r in docs]
+        body_budget = max_tokens - sum(headers[:len(docs)])
+        if body_budget * weights[-1] / sum(weights) >= config.CONTEXT_MIN_DOC_TOKENS:
+            break
+        docs.pop()
+
+    remaining = max_tokens - sum(headers[:len(docs)])
+    remaining_weight = sum(max(r.get('rerank_score') or 0, 0) + 1e-6 for r in docs)
+    context_parts, used_total = [], 0
+    for i, result in enumerate(docs, 1):
+        weight = max(result.get('rerank_score') or 0, 0) + 1e-6
+        budget = int(remaining * weight / remaining_weight)
+        content, used = _select_chunks(result, budget)
+        # 예산을 다 쓰지 않은 공고의 남은 몫은 다음 공고들이 나눠 씀
+        remaining -= used
+        remaining_weight -= weight
+        used_total += used + headers[i - 1]
+        context_parts.append(_format_document(i, result, content))
+
+    print(f"[Log] 컨텍스트: 약 {used_total}토큰 (예산 {max_tokens}), 공고 {len(docs)}/{len(merged_results)}개")
+    return '\n\n'.join(context_parts), docs
 
 
 # 7. DB 로그 관리 함수 (info.py에서 호출)
@@ -250,30 +596,28 @@ async def save_chat_log(user_id: str, query: str, answer: str, sources: List[Dic
     """
     대화 내용을 DB에 저장합니다.
     """
-    conn = await asyncpg.connect(**get_db_config())
     try:
-        # sources는 JSONB 형태로 저장
-        await conn.execute("""
-            INSERT INTO chat_logs (user_id, query, answer, sources)
-            VALUES ($1, $2, $3, $4)
-        """, user_id, query, answer, json.dumps(sources, ensure_ascii=False))
+        async with acquire_connection() as conn:
+            # sources는 JSONB 형태로 저장
+            await conn.execute("""
+                INSERT INTO chat_logs (user_id, query, answer, sources)
+                VALUES ($1, $2, $3, $4)
+            """, user_id, query, answer, json.dumps(sources, ensure_ascii=False))
     except Exception as e:
         print(f"[Warning] 로그 저장 실패 (테이블 없음 등): {e}")
-    finally:
-        await conn.close()
 
 async def get_chat_logs(limit: int = 50):
     """
     저장된 대화 로그를 조회합니다.
     """
-    conn = await asyncpg.connect(**get_db_config())
     try:
-        rows = await conn.fetch("""
-            SELECT id, user_id, query, answer, sources, created_at
-            FROM chat_logs
-            ORDER BY created_at DESC
-            LIMIT $1
-        """, limit)
+        async with acquire_connection() as conn:
+            rows = await conn.fetch("""
+                SELECT id, user_id, query, answer, sources, created_at
+                FROM chat_logs
+                ORDER BY created_at DESC
+                LIMIT $1
+            """, limit)
         results = []
         for row in rows:
             r = dict(row)
@@ -287,8 +631,6 @@ async def get_chat_logs(limit: int = 50):
     except Exception as e:
         print(f"[Warning] 로그 조회 실패: {e}")
         return []
-    finally:
-        await conn.close()
 
 
 async def get_announcement_metadata(announcement_ids: List[str]) -> List[Dict]:
@@ -298,35 +640,32 @@ async def get_announcement_metadata(announcement_ids: List[str]) -> List[Dict]:
     if not announcement_ids:
         return []
 
-    conn = await asyncpg.connect(**get_db_config())
-    try:
-        sql = """
-            SELECT id, title, category, region, notice_type,
-                   posted_date, url, status
-            FROM announcements
-            WHERE id = ANY($1::text[])
-        """
+    sql = """
+        SELECT id, title, category, region, notice_type,
+               posted_date, url, status
+        FROM announcements
+        WHERE id = ANY($1::text[])
+    """
+    async with acquire_connection() as conn:
         rows = await conn.fetch(sql, announcement_ids)
 
-        results = []
-        for row in rows:
-            posted_date = row.get('posted_date')
-            announcement_date = str(posted_date) if posted_date else None
-
-            results.append({
-                'announcement_id': row['id'],
-                'announcement_title': row['title'],
-                'announcement_date': announcement_date,
-                'announcement_url': row.get('url'),
-                'announcement_status': row.get('status'),
-                'region': row['region'],
-                'notice_type': row['notice_type'],
-                'category': row['category'],
-                'merged_content': '(상세 내용이 아직 처리되지 않았습니다. 공고 링크를 참고해주세요.)',
-                'rerank_score': 0.0,
-                'num_chunks': 0
-            })
+    results = []
+    for row in rows:
+        posted_date = row.get('posted_date')
+        announcement_date = str(posted_date) if posted_date else None
 
-        return results
-    finally:
-        await conn.close()
\ No newline at end of file
+        results.append({
+            'announcement_id': row['id'],
+            'announcement_title': row['title'],
+            'announcement_date': announcement_date,
+            'announcement_url': row.get('url'),
+            'announcement_status': row.get('status'),
+            'region': row['region'],
+            'notice_type': row['notice_type'],
+            'category': row['category'],
+            'merged_content': '(상세 내용이 아직 처리되지 않았습니다. 공고 링크를 참고해주세요.)',
+            'rerank_score': 0.0,
+            'num_chunks': 0
+        })
+
+    return results
@@ -1,16 +1,13 @@
 from fastapi import APIRouter, HTTPException
-import asyncpg
 from typing import Dict, List, Any
-from dependencies import get_db_config
+from dependencies import acquire_connection
 from models import StatsResponse
 import gongo
+from sessions import session_store
 
 # 라우터 객체 생성
 router = APIRouter()
 
-# 공유 세션 저장소
-# router.py에서 'from info import user_sessions'로 가져가서 사용합니다.
-user_sessions: Dict[str, List[Dict]] = {}
 
 # 1. 통계 정보 조회 API
 @router.get("/stats", response_model=StatsResponse)
@@ -18,8 +15,6 @@ async def get_dashboard_stats():
     """
     공고 상태별 통계 정보를 반환합니다.
     """
-    db_config = get_db_config()
-    conn = await asyncpg.connect(**db_config)
     try:
         sql = """
             SELECT
@@ -30,7 +25,8 @@ async def get_dashboard_stats():
             FROM public.announcements
         """
         
-        row = await conn.fetchrow(sql)
+        async with acquire_connection() as conn:
+            row = await conn.fetchrow(sql)
         
         if not row:
             return {
@@ -42,9 +38,6 @@ async def get_dashboard_stats():
     except Exception as e:
         print(f"[Error] 통계 정보 조회 실패: {e}")
         raise HTTPException(status_code=500, detail=f"Database Error: {str(e)}")
-        
-    finally:
-        await conn.close()
 
 # 2. 메모리 세션 상태 확인 API (프론트엔드 연결 테스트용)
 @router.get("/sessions")
@@ -53,10 +46,12 @@ async def get_active_sessions():
     현재 메모리에 저장된 모든 유저의 대화 세션을 확인합니다.
     URL: /api/v1/sessions
     """
+    user_ids = session_store.session_ids()
     return {
-        "active_user_count": len(user_sessions),
-        "user_ids": list(user_sessions.keys()),
-        "full_data": user_sessions
+        "active_user_count": len(user_ids),
+        "user_ids": user_ids,
+        "store_stats": session_store.stats(),
+        "full_data": session_store.snapshot()
     }
 
 # 3. DB 대화 로그 조회 API (백엔드 로직 검증용)
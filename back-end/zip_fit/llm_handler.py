@@ -1,9 +1,92 @@
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncGenerator
 import config
 from dependencies import get_openai_client
 
 
+# 공통 프롬프트 규칙 (개별 호출 / 통합 Query Planner 호출에서 함께 사용)
+_EXTRACTION_RULES = """추출 규칙:
+1. region: "경기도", "서울특별시", "서울특별시 외" 중 하나만 (수원시→검색키워드로)
+2. notice_type: 국민임대/행복주택/영구임대 등 (명시되지 않으면 빈 문자열)
+3. category: "lease"(임대) 또는 "sale"(분양) 또는 빈 문자열 (명시되지 않으면 빈 문자열)
+4. status: "접수중" 또는 "공고중" 또는 "접수마감" 또는 빈 문자열 (명시되지 않으면 빈 문자열)
+5. rewritten_question: 검색용 자연어 질문
+6. search_keywords: 핵심 검색어 (도시명, 지역명, 주요 용어 포함)
+
+중요:
+- category는 반드시 "lease", "sale", "" 중 하나만 사용
+- status는 반드시 "접수중", "공고중", "접수마감", "" 중 하나만 사용
+- "접수중인", "진행중인" → "접수중"
+- "마감된", "끝난" → "접수마감"
+- search_keywords에는 질문의 핵심 용어와 **가능한 모든 동의어/유사어**를 포함:
+  * 사용자가 사용한 키워드
+  * 공고문에서 사용될 가능성이 있는 공식 용어
+  * 동의어, 유사어, 약어, 관련 키워드 모두 포함
+  * **중요**: 아래 질문 유형은 반드시 관련 키워드를 모두 포함해야 함
+    - "신청자격" 질문 → ["신청자격", "자격요건", "입주자격", "소득", "자산", "무주택", "세대구성원"]
+    - "일정" 질문 → ["접수기간", "일정", "신청일", "기간", "발표", "당첨", "서류제출", "계약"]
+    - "위치" 질문 → ["위치", "주소", "소재지", "단지위치", "지번", "도로명"]
+    - "가격/임대료" 질문 → ["임대료", "보증금", "금액", "임대보증금", "월임대료", "전환보증금"]
+    - "면적/평수" 질문 → ["계약면적", "전용면적", "공급면적", "주거공용", "㎡", "평", "주택형", "타입"]
+    - "배점/선정" 질문 → ["배점", "점수", "선정", "순위", "평가", "경쟁", "추첨", "우선"]"""
+
+_CONTEXT_RULES = """# 질문 유형
+1. **announcement_reference**: 이전에 언급된 특정 공고를 참조하는 경우
+   명확한 지표:
+   - "첫번째", "두번째", "그", "이", "그거", "거기", "해당" 등의 지시어
+   - "그 공고", "그 주택", "위에서 말한", "방금 알려준" 등의 참조 표현
+   - 이전 답변에 나온 공고의 세부사항 질문 (단, 새로운 지역 명시 없이)
+
+   예시:
+   - "첫번째 공고 자세히 알려줘" ✅ announcement_reference
+   - "그 공고 자격조건은?" ✅ announcement_reference
+   - "거기 위치가 어디야?" ✅ announcement_reference
+
+2. **meta_conversation**: 대화 자체에 대한 질문 (검색 불필요)
+   예: "아까 뭐라 했어?", "이전 질문 요약해줘", "내가 방금 뭐 물었지?"
+
+3. **new_question**: 완전히 새로운 질문
+   다음 중 하나라도 해당되면 무조건 new_question:
+   - 새로운 지역명이 명시됨 (예: "서울시 공고", "경기도 공고")
+   - 새로운 주택 유형 언급 (예: "행복주택 찾아줘", "국민임대 알려줘")
+   - 특정 공고 참조 없이 일반적인 검색 요청
+   - "~알려줘", "~찾아줘", "~있어?" 같은 새로운 검색 의도
+
+   예시:
+   - "수원시 공고 알려줘" ✅ new_question (이전: 수원, 현재: 수원 - 새로운 검색)
+   - "서울시 관련 공고 보여줘" ✅ new_question (이전: 수원, 현재: 서울 - 완전히 새로운 지역)
+   - "행복주택 찾아줘" ✅ new_question (새로운 유형 검색)
+
+# 중요 원칙 (우선순위 순)
+1. **새로운 지역/유형이 명시되면 무조건 new_question** (가장 우선)
+2. "첫번째", "두번째", "그", "해당" 등의 명시적 참조가 있으면 announcement_reference
+3. 애매하면 new_question으로 판단 (새로운 검색이 더 안전)"""
+
+
+def _normalize_filters(result: Dict) -> Dict:
+    """추출된 필터 값 검증 및 정규화"""
+    # category 값 검증 및 정규화
+    if result.get('category') and result['category'] not in ['lease', 'sale']:
+        result['category'] = ''
+
+    # status 값 검증 및 정규화
+    if result.get('status') and result['status'] not in ['접수중', '공고중', '접수마감']:
+        result['status'] = ''
+
+    return result
+
+def fallback_query_analysis(query: str) -> Dict:
+    """LLM 응답을 해석하지 못했을 때 사용하는 기본 분석 결과"""
+    return {
+        "region": "",
+        "notice_type": "",
+        "category": "",
+        "status": "",
+        "rewritten_question": query,
+        "search_keywords": query.split()
+    }
+
+
 # 1. 질문 재구성 (Query Rewriting)
 async def rewrite_query(query: str, conversation_history: List[Dict] = None) -> Dict:
     """
@@ -47,30 +130,7 @@ JSON 형식으로만 답변:
 질문: "{query}"
 {context_info}
 
-추출 규칙:
-1. region: "경기도", "서울특별시", "서울특별시 외" 중 하나만 (수원시→검색키워드로)
-2. notice_type: 국민임대/행복주택/영구임대 등 (명시되지 않으면 빈 문자열)
-3. category: "lease"(임대) 또는 "sale"(분양) 또는 빈 문자열 (명시되지 않으면 빈 문자열)
-4. status: "접수중" 또는 "공고중" 또는 "접수마감" 또는 빈 문자열 (명시되지 않으면 빈 문자열)
-5. rewritten_question: 검색용 자연어 질문
-6. search_keywords: 핵심 검색어 (도시명, 지역명, 주요 용어 포함)
-
-중요:
-- category는 반드시 "lease", "sale", "" 중 하나만 사용
-- status는 반드시 "접수중", "공고중", "접수마감", "" 중 하나만 사용
-- "접수중인", "진행중인" → "접수중"
-- "마감된", "끝난" → "접수마감"
-- search_keywords에는 질문의 핵심 용어와 **가능한 모든 동의어/유사어**를 포함:
-  * 사용자가 사용한 키워드
-  * 공고문에서 사용될 가능성이 있는 공식 용어
-  * 동의어, 유사어, 약어, 관련 키워드 모두 포함
-  * **중요**: 아래 질문 유형은 반드시 관련 키워드를 모두 포함해야 함
-    - "신청자격" 질문 → ["신청자격", "자격요건", "입주자격", "소득", "자산", "무주택", "세대구성원"]
-    - "일정" 질문 → ["접수기간", "일정", "신청일", "기간", "발표", "당첨", "서류제출", "계약"]
-    - "위치" 질문 → ["위치", "주소", "소재지", "단지위치", "지번", "도로명"]
-    - "가격/임대료" 질문 → ["임대료", "보증금", "금액", "임대보증금", "월임대료", "전환보증금"]
-    - "면적/평수" 질문 → ["계약면적", "전용면적", "공급면적", "주거공용", "㎡", "평", "주택형", "타입"]
-    - "배점/선정" 질문 → ["배점", "점수", "선정", "순위", "평가", "경쟁", "추첨", "우선"]
+{_EXTRACTION_RULES}
 
 JSON 형식으로만 답변:
 {{
@@ -89,25 +149,9 @@ JSON 형식으로만 답변:
     )
     
     try:
-        result = json.loads(response.choices[0].message.content)
-
-        # category 값 검증 및 정규화
-        if result.get('category') and result['category'] not in ['lease', 'sale']:
-            result['category'] = ''
-
-        # status 값 검증 및 정규화
-        if result.get('status') and result['status'] not in ['접수중', '공고중', '접수마감']:
-            result['status'] = ''
-
+        result = _normalize_filters(json.loads(response.choices[0].message.content))
     except json.JSONDecodeError:
-        result = {
-            "region": "",
-            "notice_type": "",
-            "category": "",
-            "status": "",
-            "rewritten_question": query,
-            "search_keywords": query.split()
-        }
+        result = fallback_query_analysis(query)
     
     if context_analysis:
         result['context_analysis'] = context_analysis
@@ -160,37 +204,7 @@ async def analyze_context(query: str, history: List[Dict]) -> Dict:
     system_prompt = """당신은 대화 흐름 분석가입니다.
 현재 질문이 이전 대화와 어떤 관계인지 판단하세요.
 
-# 질문 유형
-1. **announcement_reference**: 이전에 언급된 특정 공고를 참조하는 경우
-   명확한 지표:
-   - "첫번째", "두번째", "그", "이", "그거", "거기", "해당" 등의 지시어
-   - "그 공고", "그 주택", "위에서 말한", "방금 알려준" 등의 참조 표현
-   - 이전 답변에 나온 공고의 세부사항 질문 (단, 새로운 지역 명시 없이)
-
-   예시:
-   - "첫번째 공고 자세히 알려줘" ✅ announcement_reference
-   - "그 공고 자격조건은?" ✅ announcement_reference
-   - "거기 위치가 어디야?" ✅ announcement_reference
-
-2. **meta_conversation**: 대화 자체에 대한 질문 (검색 불필요)
-   예: "아까 뭐라 했어?", "이전 질문 요약해줘", "내가 방금 뭐 물었지?"
-
-3. **new_question**: 완전히 새로운 질문
-   다음 중 하나라도 해당되면 무조건 new_question:
-   - 새로운 지역명이 명시됨 (예: "서울시 공고", "경기도 공고")
-   - 새로운 주택 유형 언급 (예: "행복주택 찾아줘", "국민임대 알려줘")
-   - 특정 공고 참조 없이 일반적인 검색 요청
-   - "~알려줘", "~찾아줘", "~있어?" 같은 새로운 검색 의도
-
-   예시:
-   - "수원시 공고 알려줘" ✅ new_question (이전: 수원, 현재: 수원 - 새로운 검색)
-   - "서울시 관련 공고 보여줘" ✅ new_question (이전: 수원, 현재: 서울 - 완전히 새로운 지역)
-   - "행복주택 찾아줘" ✅ new_question (새로운 유형 검색)
-
-# 중요 원칙 (우선순위 순)
-1. **새로운 지역/유형이 명시되면 무조건 new_question** (가장 우선)
-2. "첫번째", "두번째", "그", "해당" 등의 명시적 참조가 있으면 announcement_reference
-3. 애매하면 new_question으로 판단 (새로운 검색이 더 안전)
+""" + _CONTEXT_RULES + """
 
 # 출력 형식 (JSON)
 {
@@ -217,9 +231,116 @@ async def analyze_context(query: str, history: List[Dict]) -> Dict:
         return {'is_context_question': False}
 
 
-# 3. 답변 생성 (Answer Generation)
-async def generate_answer(query: str, context: str, conversation_history: List[Dict] = None) -> str:
+# 2-1. 통합 질문 분석 (Query Planner)
+# analyze_context + rewrite_query + generate_multi_queries 를 한 번의 호출로 처리합니다.
+_QUERY_PLAN_SCHEMA = {
+    "name": "query_plan",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "context_type": {"type": "string", "enum": ["announcement_reference", "meta_conversation", "new_question"]},
+            "reason": {"type": "string"},
+            "referenced_announcement_indices": {"type": "array", "items": {"type": "integer"}},
+            "region": {"type": "string"},
+            "notice_type": {"type": "string"},
+            "category": {"type": "string", "enum": ["lease", "sale", ""]},
+            "status": {"type": "string", "enum": ["접수중", "공고중", "접수마감", ""]},
+            "rewritten_question": {"type": "string"},
+            "search_keywords": {"type": "array", "items": {"type": "string"}},
+            "paraphrases": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": [
+            "context_type", "reason", "referenced_announcement_indices",
+            "region", "notice_type", "category", "status",
+            "rewritten_question", "search_keywords", "paraphrases"
+        ],
+        "additionalProperties": False
+    }
+}
+
+async def plan_query(query: str, history: List[Dict] = None, num_queries: int = 1) -> Dict:
+    """
+    질문 맥락 분석, 재구성, 멀티쿼리 생성을 JSON Schema 기반 단일 LLM 호출로 수행합니다.
+    반환값: {'context_analysis': {...}, 'query_analysis': {...}, 'multi_queries': [...]}
+    """
     client = get_openai_client()
+
+    # 최근 대화 요약 (참조 공고 판단을 위해 턴별 상위 공고 제목 포함)
+    history_str = "없음"
+    if history:
+        turns = []
+        for i, h in enumerate(reversed(history[-2:])):
+            titles = [
+                (src.get('announcement_title') if isinstance(src, dict) else getattr(src, 'announcement_title', '')) or ''
+                for src in (h.get('sources') or [])[:3]
+            ]
+            turns.append(
+                f"[index {i}] Q: {h.get('query', '')}\nA: {str(h.get('answer', ''))[:200]}...\n"
+                f"언급된 공고: {', '.join(t for t in titles if t) or '없음'}"
+            )
+        history_str = "\n\n".join(turns)
+
+    system_prompt = """당신은 LH 주택 공고 검색을 위한 질문 분석가입니다.
+현재 질문을 분석하여 (1) 이전 대화와의 관계, (2) 검색 필터와 재구성 질문, (3) 검색용 다른 표현을 한 번에 추출하세요.
+
+[1] 대화 관계 판단
+""" + _CONTEXT_RULES + """
+- referenced_announcement_indices: announcement_reference일 때 참조하는 이전 턴의 index (0이 가장 최근), 그 외에는 []
+- 이전 대화가 없으면 항상 new_question
+
+[2] 검색 정보 추출
+""" + _EXTRACTION_RULES + f"""
+
+[3] paraphrases
+- rewritten_question을 동의어/유사 표현 또는 더 구체적인 표현으로 바꾼 질문 {num_queries}개
+- 원본 질문의 의도를 유지하고 LH, 임대주택, 분양주택 관련 용어 활용"""
+
+    try:
+        response = await client.chat.completions.create(
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"이전 대화:\n{history_str}\n\n현재 질문: {query}"}
+            ],
+            temperature=0,
+            response_format={"type": "json_schema", "json_schema": _QUERY_PLAN_SCHEMA}
+        )
+        plan = json.loads(response.choices[0].message.content)
+    except Exception as e:
+        print(f"[Error] 통합 질문 분석 실패: {e}")
+        plan = {'context_type': 'new_question', 'paraphrases': [], **fallback_query_analysis(query)}
+
+    context_type = plan.get('context_type', 'new_question') if history else 'new_question'
+    context_analysis = {
+        'is_context_question': context_type != 'new_question',
+        'context_type': context_type,
+        'reason': plan.get('reason', ''),
+        'referenced_announcement_indices': plan.get('referenced_announcement_indices') or [0]
+    }
+
+    query_analysis = _normalize_filters({
+        'region': plan.get('region', ''),
+        'notice_type': plan.get('notice_type', ''),
+        'category': plan.get('category', ''),
+        'status': plan.get('status', ''),
+        'rewritten_question': plan.get('rewritten_question') or query,
+        'search_keywords': plan.get('search_keywords') or query.split()
+    })
+
+    paraphrases = [q.strip() for q in plan.get('paraphrases', []) if q and q.strip()]
+    multi_queries = [query_analysis['rewritten_question']] + paraphrases[:num_queries]
+
+    return {
+        'context_analysis': context_analysis,
+        'query_analysis': query_analysis,
+        'multi_queries': multi_queries
+    }
+
+
+# 3. 답변 생성 (Answer Generation)
+def _build_answer_messages(query: str, context: str, conversation_history: List[Dict] = None) -> List[Dict]:
+    """답변 생성 프롬프트 구성 (일반/스트리밍 공용)"""
     history_text = ""
     if conversation_history:
         history_items = [
@@ -321,14 +442,35 @@ async def generate_answer(query: str, context: str, conversation_history: List[D
    - "평수/면적" 질문 → 전용면적 + 공급면적 + 주거공용면적 **모두** 찾아서 답변
 5. 문서에 없는 내용은 추측하지 마세요."""
     
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+async def generate_answer(query: str, context: str, conversation_history: List[Dict] = None) -> str:
+    client = get_openai_client()
     response = await client.chat.completions.create(
         model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
+        messages=_build_answer_messages(query, context, conversation_history),
         temperature=0.1,
         max_tokens=2000
     )
     
-    return response.choices[0].message.content
\ No newline at end of file
+    return response.choices[0].message.content
+
+async def generate_answer_stream(query: str, context: str, conversation_history: List[Dict] = None) -> AsyncGenerator[str, None]:
+    """
+    답변을 토큰 단위로 스트리밍합니다. (generate_answer와 동일한 프롬프트/모델)
+    """
+    client = get_openai_client()
+    stream = await client.chat.completions.create(
+        model="gpt-4o",
+        messages=_build_answer_messages(query, context, conversation_history),
+        temperature=0.1,
+        max_tokens=2000,
+        stream=True
+    )
+
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
\ No newline at end of file
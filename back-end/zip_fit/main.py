@@ -1,5 +1,6 @@
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
@@ -9,8 +10,13 @@ from router import router as chat_router
 # info.py: 통계/대시보드 기능 (/stats)
 from info import router as info_router
 
-from dependencies import load_models
+from dependencies import load_models, init_db_pool, close_db_pool, get_db_pool_stats
 import config
+import gongo
+import embedding
+import metrics
+from sessions import session_store
+from reranker import rerank_batcher
 
 # 앱 생명주기 관리 (시작과 종료 시점 정의)
 @asynccontextmanager
@@ -26,11 +32,20 @@ async def lifespan(app: FastAPI):
         load_models()
     except Exception as e:
         print(f"[Critical] 모델 로딩 중 오류 발생: {e}")
+
+    try:
+        # DB 커넥션 풀 생성 (dependencies.py)
+        await init_db_pool()
+    except Exception as e:
+        print(f"[Critical] DB 커넥션 풀 생성 중 오류 발생: {e}")
     
     yield  # 앱 실행 중...
     
     # [종료] 앱 종료 시 실행
     print("\n[System] 서버 종료 및 리소스 해제")
+    await close_db_pool()
+    embedding.shutdown()
+    rerank_batcher.shutdown()
 
 # FastAPI 앱 인스턴스 생성
 app = FastAPI(
@@ -70,10 +85,43 @@ def health_check():
         "service": "LH RAG Chatbot",
         "config": {
             "use_reranker": config.USE_RERANKER,
+            "reranker_backend": config.RERANKER_BACKEND,
             "embedding_model": config.EMBEDDING_MODEL_NAME
-        }
+        },
+        "db_pool": get_db_pool_stats(),
+        "caches": gongo.get_cache_stats(),
+        "rerank_batcher": rerank_batcher.stats(),
+        "embedding_batcher": embedding.get_batcher_stats(),
+        "sessions": session_store.stats(),
+        "latency": metrics.snapshot()
     }
 
+# Prometheus 수집용 지표 엔드포인트 (text/plain exposition 형식)
+@app.get("/api/v1/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    단계별 지연시간 히스토그램(rag_stage_duration_seconds{stage=...}),
+    요청/TTFT 히스토그램, DB 풀/캐시/세션 게이지를 반환합니다.
+    """
+    gauges = []
+    for key, value in get_db_pool_stats().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            gauges.append(("rag_db_pool", {"stat": key}, value, "DB 커넥션 풀 상태"))
+    for cache_name, stats in gongo.get_cache_stats().items():
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges.append(("rag_cache", {"cache": cache_name, "stat": key}, value, "검색 캐시 상태"))
+    for key, value in rerank_batcher.stats().items():
+        gauges.append(("rag_rerank_batcher", {"stat": key}, value, "Reranker 마이크로 배치 상태"))
+    for source, stats in embedding.get_batcher_stats().items():
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges.append(("rag_embedding_batcher", {"source": source, "stat": key}, value, "임베딩 마이크로 배치 상태"))
+    for key, value in session_store.stats().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            gauges.append(("rag_sessions", {"stat": key}, value, "세션 저장소 상태"))
+    return metrics.render_prometheus(gauges)
+
 if __name__ == "__main__":
     # uvicorn.run 명령어 없이 파이썬 파일 직접 실행 가능
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,168 @@
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+# 지연시간(초) 히스토그램 기본 버킷
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class Histogram:
+    """누적 버킷 히스토그램 (Prometheus histogram과 같은 구조)"""
+
+    def __init__(self, name: str, description: str = "", labels: Dict[str, str] = None,
+                 buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.buckets = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'count': self.count,
+                'sum': round(self.sum, 6),
+                'avg': round(self.sum / self.count, 6) if self.count else 0.0,
+                'buckets': dict(zip(self.buckets, self.counts)),
+            }
+
+
+# 전역 히스토그램/카운터 저장소 { (이름, 라벨): 값 }
+_histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_descriptions: Dict[str, str] = {}
+_registry_lock = threading.Lock()
+
+def histogram(name: str, description: str = "", **labels) -> Histogram:
+    """이름/라벨로 히스토그램을 가져오거나 생성합니다."""
+    key = (name, tuple(sorted(labels.items())))
+    with _registry_lock:
+        if key not in _histograms:
+            _histograms[key] = Histogram(name, description, labels)
+        if description:
+            _descriptions.setdefault(name, description)
+        return _histograms[key]
+
+def observe(name: str, value: float, description: str = "", **labels):
+    histogram(name, description, **labels).observe(value)
+
+def increment(name: str, value: float = 1, description: str = "", **labels):
+    """누적 카운터 증가"""
+    key = (name, tuple(sorted(labels.items())))
+    with _registry_lock:
+        _counters[key] = _counters.get(key, 0) + value
+        if description:
+            _descriptions.setdefault(name, description)
+
+def _key_str(name: str, labels: Tuple) -> str:
+    return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+def snapshot() -> Dict[str, Any]:
+    """히스토그램/카운터 요약 (JSON용). 라벨이 있으면 'name{k=v}' 형태의 키를 사용합니다."""
+    result = {}
+    for (name, labels), h in list(_histograms.items()):
+        result[_key_str(name, labels)] = h.snapshot()
+    for (name, labels), value in list(_counters.items()):
+        result[_key_str(name, labels)] = value
+    return result
+
+
+# 요청 단위 단계별 시간 측정 (Timing Span)
+# chatting.chat_stream_service 시작 시 begin_request()로 기록용 dict를 만들고,
+# 하위 함수는 span('단계명')으로 감싸기만 하면 같은 요청의 기록에 합산됩니다.
+STAGE_METRIC = 'rag_stage_duration_seconds'
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('request_timings', default=None)
+
+def begin_request() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+@contextmanager
+def span(stage: str):
+    """
+    블록 실행 시간을 단계별 히스토그램과 현재 요청의 timings에 기록합니다.
+    사용법: with metrics.span('rerank'): reranked = await ...
+    취소된 작업(버려진 추측 실행 등)의 시간은 기록하지 않습니다.
+    """
+    start = time.perf_counter()
+    cancelled = False
+    try:
+        yield
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        if not cancelled:
+            elapsed = time.perf_counter() - start
+            observe(STAGE_METRIC, elapsed, "RAG 파이프라인 단계별 소요 시간", stage=stage)
+            timings = _request_timings.get()
+            if timings is not None:
+                # 같은 단계가 여러 번(멀티쿼리 등) 실행되면 합산
+                timings[stage] = round(timings.get(stage, 0.0) + elapsed, 4)
+
+
+# Prometheus 텍스트 형식 출력
+def _escape_label_value(value: Any) -> str:
+    """라벨 값 이스케이프 (exposition 형식: 역슬래시, 큰따옴표, 줄바꿈)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    escaped = [f'{k}="{_escape_label_value(v)}"' for k, v in labels.items()]
+    return "{" + ",".join(escaped) + "}"
+
+def render_prometheus(gauges: List[Tuple[str, Dict[str, Any], float, str]] = None) -> str:
+    """
+    히스토그램 + 카운터 + 게이지를 Prometheus exposition 형식으로 변환합니다.
+    - gauges: [(이름, 라벨, 값, 설명), ...]
+    """
+    lines = []
+    by_name: Dict[str, List[Histogram]] = {}
+    for (name, _), h in sorted(_histograms.items()):
+        by_name.setdefault(name, []).append(h)
+
+    for name, hists in by_name.items():
+        lines.append(f"# HELP {name} {_descriptions.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for h in hists:
+            snap = h.snapshot()
+            for bound, count in snap['buckets'].items():
+                lines.append(f"{name}_bucket{_format_labels({**h.labels, 'le': bound})} {count}")
+            lines.append(f"{name}_bucket{_format_labels({**h.labels, 'le': '+Inf'})} {snap['count']}")
+            lines.append(f"{name}_sum{_format_labels(h.labels)} {snap['sum']}")
+            lines.append(f"{name}_count{_format_labels(h.labels)} {snap['count']}")
+
+    counters: Dict[str, List[Tuple[Tuple, float]]] = {}
+    for (name, labels), value in sorted(_counters.items()):
+        counters.setdefault(name, []).append((labels, value))
+    for name, items in counters.items():
+        lines.append(f"# HELP {name} {_descriptions.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in items:
+            lines.append(f"{name}{_format_labels(dict(labels))} {value}")
+
+    seen = set()
+    for name, labels, value, description in gauges or []:
+        if name not in seen:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,21 @@
+-- ====================================================================
+-- 001. 키워드 검색용 pg_trgm GIN 인덱스
+-- KEYWORD_SEARCH_MODE=trgm 에서 사용 (gongo.keyword_search / 하이브리드 검색)
+-- ====================================================================
+-- 주의
+-- - CONCURRENTLY 는 트랜잭션 안에서 실행할 수 없으므로 psql 로 파일을 그대로 실행합니다.
+--   psql -d <DB> -f migrations/001_chunk_text_trgm.sql
+-- - 한글 trigram 추출은 DB의 LC_CTYPE 이 UTF-8 로케일(ko_KR.UTF-8, en_US.UTF-8 등)이어야 합니다.
+--   LC_CTYPE=C 이면 한글이 단어 문자로 인식되지 않아 인덱스가 동작하지 않습니다.
+--   SELECT show_trgm('행복주택'); 결과가 비어있지 않은지 먼저 확인하세요.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- LIKE '%kw%' 와 word_similarity(%>) 연산 모두 이 인덱스를 사용합니다.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_text_trgm
+    ON document_chunks USING gin (chunk_text gin_trgm_ops);
+
+-- %> 매칭 기준 (기본값 0.6). 필요 시 DB 단위로 조정합니다.
+-- ALTER DATABASE <DB> SET pg_trgm.word_similarity_threshold = 0.6;
+
+ANALYZE document_chunks;
@@ -8,6 +8,8 @@ class Message(BaseModel):
 class ChatRequest(BaseModel):
     user_id: str = Field(..., description="사용자 식별 ID (예: 'user123')")
     query: str = Field(..., description="사용자 질문")
+    include_history: bool = Field(False, description="디버깅용: 응답에 세션 전체 대화 기록 포함 여부")
+    include_timing: bool = Field(False, description="응답 metadata.timing에 단계별 소요 시간(초) 포함 여부")
 
 class ResetRequest(BaseModel):
     user_id: str
@@ -30,9 +32,18 @@ class ChatResponse(BaseModel):
     answer: str
     sources: List[SourceInfo]
     metadata: Optional[Dict[str, Any]] = None
-    session_history: Optional[List[Dict[str, Any]]] = Field(None, description="현재 세션의 전체 대화 기록")
+    turn_id: Optional[int] = Field(None, description="이번 대화 턴 ID (/sessions/{id}/history 조회용)")
+    history_length: Optional[int] = Field(None, description="현재 세션에 저장된 대화 턴 수")
+    session_history: Optional[List[Dict[str, Any]]] = Field(None, description="현재 세션의 전체 대화 기록 (include_history=true일 때만)")
     process_info: Optional[Dict[str, Any]] = Field(None, description="질문 재구성 및 분석 정보")
 
+class SessionHistoryResponse(BaseModel):
+    session_id: str
+    total: int = Field(..., description="저장된 전체 턴 수")
+    offset: int
+    limit: int
+    turns: List[Dict[str, Any]]
+
 class StatsResponse(BaseModel):
     CNT_ALL: int = Field(..., description="전체 공고 수")
     CNT_NOTE_ING: int = Field(..., description="공고중인 건수")
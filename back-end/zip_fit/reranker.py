@@ -0,0 +1,151 @@
+import os
+from typing import List, Tuple, Optional
+import numpy as np
+import config
+from batching import MicroBatcher
+
+
+# ONNX Runtime 기반 Cross-Encoder
+# gongo.rerank_results에서 CrossEncoder와 동일하게 reranker.predict(pairs)로 호출합니다.
+class OnnxCrossEncoder:
+    """
+    CrossEncoder를 ONNX로 변환한 모델을 ONNX Runtime으로 실행합니다.
+    - quantize=True면 동적 int8 양자화 모델(model.int8.onnx)을 사용합니다.
+    """
+
+    def __init__(self, model_dir: str, quantize: bool = True,
+                 max_length: int = None, num_threads: int = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        onnx_path = os.path.join(model_dir, "model.int8.onnx" if quantize else "model.onnx")
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(f"ONNX 모델 파일이 없습니다: {onnx_path}")
+
+        self.model_dir = model_dir
+        self.quantize = quantize
+        self.max_length = max_length or config.RERANKER_MAX_LENGTH
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = config.RERANKER_NUM_THREADS if num_threads is None else num_threads
+        if threads > 0:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def predict(self, pairs: List[Tuple[str, str]], batch_size: int = None, **kwargs) -> np.ndarray:
+        """(질문, 문서) 쌍의 관련도 점수를 반환합니다. (CrossEncoder.predict와 동일한 sigmoid 점수)"""
+        if not pairs:
+            return np.array([], dtype=np.float32)
+
+        batch_size = batch_size or config.RERANKER_BATCH_SIZE
+        scores = []
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            features = self.tokenizer(
+                [p[0] for p in batch],
+                [p[1] for p in batch],
+                padding=True,
+                truncation="longest_first",
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            inputs = {k: v.astype(np.int64) for k, v in features.items() if k in self.input_names}
+            logits = self.session.run(None, inputs)[0]
+            scores.append(1 / (1 + np.exp(-logits[:, 0])))
+
+        return np.concatenate(scores).astype(np.float32)
+
+
+def export_onnx(model_source: str, output_dir: str, quantize: bool = True) -> str:
+    """
+    HuggingFace Cross-Encoder 모델을 ONNX로 변환하고, 필요하면 동적 int8 양자화를 적용합니다.
+    이미 변환된 파일이 있으면 그대로 사용합니다.
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model.int8.onnx")
+
+    if not os.path.exists(fp32_path):
+        print(f"[System] Reranker ONNX 변환 중... ({model_source} -> {fp32_path})")
+        tokenizer = AutoTokenizer.from_pretrained(model_source)
+        model = AutoModelForSequenceClassification.from_pretrained(model_source)
+        model.eval()
+
+        dummy = tokenizer(["질문"], ["문서"], return_tensors="pt")
+        input_names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in dummy]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17
+            )
+        tokenizer.save_pretrained(output_dir)
+        print("[System] ONNX 변환 완료")
+
+    if quantize and not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        print(f"[System] int8 동적 양자화 중... ({int8_path})")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print("[System] 양자화 완료")
+
+    return int8_path if quantize else fp32_path
+
+
+def load_onnx_reranker(model_source: str, base_path: str) -> Optional[OnnxCrossEncoder]:
+    """
+    config.RERANKER_BACKEND에 맞는 ONNX Reranker를 준비합니다.
+    onnxruntime이 설치되지 않았거나 변환에 실패하면 None을 반환합니다. (호출 측에서 torch로 대체)
+    """
+    quantize = config.RERANKER_BACKEND == "onnx-int8"
+    onnx_dir = os.path.join(base_path, "ko-reranker-onnx")
+    try:
+        export_onnx(model_source, onnx_dir, quantize=quantize)
+        return OnnxCrossEncoder(onnx_dir, quantize=quantize)
+    except ImportError as e:
+        print(f"[Warning] ONNX Runtime을 사용할 수 없습니다 (pip install onnxruntime onnx): {e}")
+    except Exception as e:
+        print(f"[Warning] ONNX Reranker 준비 실패: {e}")
+    return None
+
+
+# Reranker 마이크로 배치 워커
+# 동시에 들어온 여러 요청의 (질문, 문서) 쌍을 몇 ms 동안 모아 한 번의 predict로 계산합니다. (batching.MicroBatcher)
+def _init_worker_thread(num_threads: int):
+    """워커 스레드 시작 시 torch intra-op 스레드 수 설정 (torch 백엔드만, 프로세스 전역 설정)"""
+    if num_threads > 0 and config.RERANKER_BACKEND == 'torch':
+        try:
+            import torch
+            torch.set_num_threads(num_threads)
+        except ImportError:
+            pass
+
+def _predict_pairs(pairs: List[Tuple[str, str]]) -> np.ndarray:
+    from dependencies import get_reranker
+    return np.asarray(get_reranker().predict(pairs, batch_size=config.RERANKER_BATCH_SIZE), dtype=np.float32)
+
+
+# 전역 인스턴스 (gongo.rerank_results에서 사용)
+rerank_batcher = MicroBatcher(
+    'reranker', _predict_pairs,
+    max_wait_ms=config.RERANK_BATCH_WAIT_MS,
+    max_batch_items=config.RERANK_MAX_BATCH_PAIRS,
+    workers=config.RERANK_WORKERS,
+    initializer=_init_worker_thread,
+    initargs=(config.RERANKER_NUM_THREADS,),
+    sort_key=lambda pair: len(pair[0]) + len(pair[1])
+)
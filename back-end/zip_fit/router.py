@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException
-from models import ChatRequest, ChatResponse, ResetRequest
-from chatting import chat_service
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from models import ChatRequest, ChatResponse, ResetRequest, SessionHistoryResponse, SourceInfo
+from chatting import chat_service, chat_stream_service
 import traceback
-from info import user_sessions
+import json
+from sessions import session_store
 
 router = APIRouter()
 
@@ -27,14 +30,12 @@ async def chat_endpoint(request: ChatRequest):
         print(f"\n[Debug] 요청 수신 User_ID: {user_id}")
         print(f"[Debug] 질문 내용: {request.query}")
 
-        # 1. 세션 생성 또는 로드 (info.py의 user_sessions 사용)
-        if user_id not in user_sessions:
+        # 1. 세션 생성 또는 로드 (sessions.py의 session_store 사용)
+        if not session_store.exists(user_id):
             print(f"[Debug] 새로운 유저입니다. 세션을 생성합니다.")
-            user_sessions[user_id] = []
-        else:
-            print(f"[Debug] 기존 유저입니다. 현재 대화 턴 수: {len(user_sessions[user_id])}개")
-
-        current_history = user_sessions[user_id]
+        current_history = session_store.get_history(user_id)
+        if current_history:
+            print(f"[Debug] 기존 유저입니다. 현재 대화 턴 수: {len(current_history)}개")
 
         # 2. 서비스 호출
         result = await chat_service(request.query, current_history)
@@ -45,19 +46,29 @@ async def chat_endpoint(request: ChatRequest):
             'answer': result.get('answer'),
             'sources': result.get('sources', [])
         }
-        user_sessions[user_id].append(new_turn)
+        turn_id = session_store.add_turn(user_id, new_turn)
+        history_length = len(session_store.get_history(user_id))
         
-        print(f"[Debug] 저장 완료. 현재 {user_id}의 누적 대화 개수: {len(user_sessions[user_id])}")
+        print(f"[Debug] 저장 완료. 현재 {user_id}의 누적 대화 개수: {history_length}")
         
-        # 4. 응답 반환 (프론트엔드 확인용 필드 포함)
+        # 단계별 소요 시간은 요청한 경우에만 metadata.timing으로 전달
+        metadata = result.get('metadata')
+        if request.include_timing and result.get('timings'):
+            metadata = {**(metadata or {}), 'timing': result['timings']}
+
+        # 4. 응답 반환
+        # 기본은 턴 ID/개수만 전달하여 응답 크기를 일정하게 유지합니다.
+        # 전체 기록은 /sessions/{id}/history 로 페이지 단위 조회 (include_history=true면 디버깅용으로 포함)
         return ChatResponse(
             query=request.query,
             answer=result.get('answer', "응답을 생성할 수 없습니다."),
             sources=result.get('sources', []),
-            metadata=result.get('metadata'),
+            metadata=metadata,
+            turn_id=turn_id,
+            history_length=history_length,
             
             # 프론트엔드 디버깅 정보 주입
-            session_history=user_sessions[user_id],
+            session_history=session_store.get_history(user_id) if request.include_history else None,
             process_info=result.get('query_analysis')
         )
         
@@ -66,19 +77,94 @@ async def chat_endpoint(request: ChatRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
+# 스트리밍 채팅 엔드포인트
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    RAG 챗봇 스트리밍 엔드포인트 (application/x-ndjson, 한 줄에 JSON 이벤트 하나)
+    - {"type": "sources", "data": [...]}   : 검색/병합이 끝나는 즉시 출처 전송
+    - {"type": "answer", "content": "..."} : 답변 토큰
+    - {"type": "done", ...}                : 완료 (turn_id, history_length, metadata, process_info)
+    - {"type": "error", "content": "..."}  : 오류
+    """
+    user_id = request.user_id
+    print(f"\n[Debug] 스트리밍 요청 수신 User_ID: {user_id}")
+    print(f"[Debug] 질문 내용: {request.query}")
+
+    def to_line(event: dict) -> str:
+        return json.dumps(jsonable_encoder(event), ensure_ascii=False) + "\n"
+
+    async def generator():
+        # 빈 입력 검증
+        if not request.query or not request.query.strip():
+            yield to_line({"type": "answer", "content": "질문을 입력해주세요."})
+            yield to_line({"type": "done"})
+            return
+
+        history = session_store.get_history(user_id)
+        sources, tokens = [], []
+        try:
+            async for event in chat_stream_service(request.query, history):
+                if event['type'] == 'sources':
+                    sources = event['data']
+                    yield to_line({"type": "sources", "data": [SourceInfo(**src) for src in sources]})
+                elif event['type'] == 'answer':
+                    tokens.append(event['content'])
+                    yield to_line(event)
+                elif event['type'] == 'done':
+                    # 스트리밍 완료 후 세션 저장
+                    turn_id = session_store.add_turn(user_id, {
+                        'query': request.query,
+                        'answer': ''.join(tokens),
+                        'sources': sources
+                    })
+                    metadata = event.get('metadata')
+                    if request.include_timing and event.get('timings'):
+                        metadata = {**(metadata or {}), 'timing': event['timings']}
+                    yield to_line({
+                        "type": "done",
+                        "turn_id": turn_id,
+                        "history_length": len(session_store.get_history(user_id)),
+                        "metadata": metadata,
+                        "process_info": event.get('query_analysis')
+                    })
+        except Exception as e:
+            print("[Server Error Log]")
+            traceback.print_exc()
+            yield to_line({"type": "error", "content": f"Internal Server Error: {str(e)}"})
+
+    return StreamingResponse(generator(), media_type="application/x-ndjson")
+
 # 세션 초기화 엔드포인트
 @router.post("/session/reset")
 async def reset_session(request: ResetRequest):
-    # info.py의 user_sessions를 직접 조작
     user_id = request.user_id
     
     print(f"\n[Debug] 세션 초기화 요청: {user_id}")
     
-    if user_id in user_sessions:
-        user_sessions[user_id] = [] # 해당 유저만 초기화
+    if session_store.reset(user_id): # 해당 유저만 초기화
         msg = f"User '{user_id}'의 대화 내역이 초기화되었습니다."
     else:
         msg = f"User '{user_id}'의 세션을 찾을 수 없습니다."
         
     print(f"[System] {msg}")
-    return {"status": "success", "message": msg}
\ No newline at end of file
+    return {"status": "success", "message": msg}
+
+# 세션 대화 기록 조회 (페이지네이션)
+@router.get("/sessions/{session_id}/history", response_model=SessionHistoryResponse)
+async def get_session_history(
+    session_id: str,
+    offset: int = Query(0, ge=0, description="시작 위치 (오래된 턴부터)"),
+    limit: int = Query(10, ge=1, le=100, description="조회할 턴 수")
+):
+    page = session_store.get_page(session_id, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"User '{session_id}'의 세션을 찾을 수 없습니다.")
+
+    return SessionHistoryResponse(
+        session_id=session_id,
+        total=page['total'],
+        offset=offset,
+        limit=limit,
+        turns=page['turns']
+    )
@@ -0,0 +1,173 @@
+import json
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+import config
+
+
+class SessionStore:
+    """
+    메모리 기반 대화 세션 저장소
+    - 세션별 최대 턴 수 제한 (오래된 턴부터 삭제)
+    - 전체 세션 수 / 전체 메모리(바이트) 상한 초과 시 가장 오래 사용하지 않은 세션부터 삭제 (LRU)
+    - 마지막 사용 후 TTL(초)이 지난 세션 삭제
+    - 턴 저장 시 대략적인 크기(JSON 직렬화 바이트)를 계산하여 메모리 사용량을 추적
+    """
+
+    def __init__(self, max_sessions: int, max_turns: int, ttl: float, max_bytes: int):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # { session_id: {'turns': [...], 'sizes': [...], 'bytes': int, 'next_turn_id': int, 'last_access': float} }
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self.evicted_sessions = 0
+        self.trimmed_turns = 0
+
+    # 내부 유틸
+    def _touch(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if self.ttl > 0 and time.time() - session['last_access'] > self.ttl:
+            self._drop(session_id)
+            return None
+        session['last_access'] = time.time()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._total_bytes -= session['bytes']
+            self.evicted_sessions += 1
+
+    def _evict(self, keep: Optional[str] = None):
+        """
+        만료 세션 삭제 후, 상한을 넘으면 LRU 순서로 삭제
+        - keep: 지금 쓰고 있는 세션 (상한을 넘어도 삭제하지 않음)
+        """
+        if self.ttl > 0:
+            deadline = time.time() - self.ttl
+            # OrderedDict 앞쪽이 가장 오래 사용하지 않은 세션
+            while self._sessions:
+                oldest_id, oldest = next(iter(self._sessions.items()))
+                if oldest['last_access'] >= deadline or oldest_id == keep:
+                    break
+                self._drop(oldest_id)
+
+        while len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes:
+            victim = next((sid for sid in self._sessions if sid != keep), None)
+            if victim is None:
+                break
+            self._drop(victim)
+
+    def _trim_oldest(self, session: Dict[str, Any]):
+        session['turns'].pop(0)
+        removed = session['sizes'].pop(0)
+        session['bytes'] -= removed
+        self._total_bytes -= removed
+        self.trimmed_turns += 1
+
+    @staticmethod
+    def _compact_turn(turn: Dict[str, Any]) -> Dict[str, Any]:
+        """저장용 턴: 출처의 병합 본문(merged_content, chunks)은 보관하지 않습니다."""
+        sources = [
+            {k: v for k, v in src.items() if k not in ('merged_content', 'chunks')} if isinstance(src, dict) else src
+            for src in turn.get('sources') or []
+        ]
+        return {**turn, 'sources': sources}
+
+    @staticmethod
+    def _size_of(turn: Dict[str, Any]) -> int:
+        return len(json.dumps(turn, ensure_ascii=False, default=str).encode('utf-8'))
+
+    # 공개 API
+    def exists(self, session_id: str) -> bool:
+        return self._touch(session_id) is not None
+
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """세션의 대화 내역 (없으면 빈 세션 생성)"""
+        session = self._touch(session_id)
+        if session is None:
+            session = {'turns': [], 'sizes': [], 'bytes': 0, 'next_turn_id': 0, 'last_access': time.time()}
+            self._sessions[session_id] = session
+            self._evict(keep=session_id)
+        return session['turns']
+
+    def add_turn(self, session_id: str, turn: Dict[str, Any]) -> int:
+        """턴을 저장하고 턴 ID(세션 내 일련번호, 턴이 잘려도 유지)를 반환합니다."""
+        session = self._touch(session_id)
+        if session is None:
+            self.get_history(session_id)
+            session = self._sessions[session_id]
+
+        turn_id = session['next_turn_id']
+        session['next_turn_id'] += 1
+        turn = {'turn_id': turn_id, **self._compact_turn(turn)}
+        size = self._size_of(turn)
+        session['turns'].append(turn)
+        session['sizes'].append(size)
+        session['bytes'] += size
+        self._total_bytes += size
+
+        # 세션별 턴 수 제한
+        while len(session['turns']) > self.max_turns:
+            self._trim_oldest(session)
+        # 세션 하나가 메모리 상한을 넘으면 이 세션의 오래된 턴부터 삭제 (방금 저장한 턴은 유지)
+        while session['bytes'] > self.max_bytes and len(session['turns']) > 1:
+            self._trim_oldest(session)
+
+        self._evict(keep=session_id)
+        return turn_id
+
+    def get_page(self, session_id: str, offset: int = 0, limit: int = 10) -> Optional[Dict[str, Any]]:
+        """대화 내역 페이지 조회 (오래된 턴부터, 세션이 없으면 None)"""
+        session = self._touch(session_id)
+        if session is None:
+            return None
+        turns = session['turns']
+        return {'total': len(turns), 'turns': turns[offset:offset + limit]}
+
+    def reset(self, session_id: str) -> bool:
+        """세션 대화 내역 초기화 (세션이 없으면 False)"""
+        session = self._touch(session_id)
+        if session is None:
+            return False
+        self._total_bytes -= session['bytes']
+        session.update({'turns': [], 'sizes': [], 'bytes': 0})
+        return True
+
+    def session_ids(self) -> List[str]:
+        self._evict()
+        return list(self._sessions.keys())
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """전체 세션 내용 (디버깅용)"""
+        self._evict()
+        return {sid: s['turns'] for sid, s in self._sessions.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        """모니터링용 지표"""
+        self._evict()
+        return {
+            'resident_sessions': len(self._sessions),
+            'resident_turns': sum(len(s['turns']) for s in self._sessions.values()),
+            'resident_bytes': self._total_bytes,
+            'max_sessions': self.max_sessions,
+            'max_turns': self.max_turns,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'evicted_sessions': self.evicted_sessions,
+            'trimmed_turns': self.trimmed_turns,
+        }
+
+
+# 전역 인스턴스 (router.py, info.py 공용)
+session_store = SessionStore(
+    max_sessions=config.SESSION_MAX_SESSIONS,
+    max_turns=config.SESSION_MAX_TURNS,
+    ttl=config.SESSION_TTL,
+    max_bytes=config.SESSION_MAX_BYTES
+)
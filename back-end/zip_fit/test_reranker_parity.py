@@ -0,0 +1,79 @@
+"""
+Reranker 백엔드 정합성 테스트
+- 같은 (질문, 문서) 쌍을 CrossEncoder.predict 와 OnnxCrossEncoder(fp32 / int8)로 채점해
+  점수가 허용 오차 안에서 일치하는지, 질문별 상위 top-k 순서가 유지되는지 확인합니다.
+- onnxruntime / 모델이 없는 환경에서는 건너뜁니다.
+
+실행: python -m pytest test_reranker_parity.py -q
+"""
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from sentence_transformers import CrossEncoder
+import config
+from reranker import export_onnx, OnnxCrossEncoder
+from bench_reranker import QUERIES, DOCUMENTS, PAIRS
+
+# 허용 오차 (sigmoid 점수 기준, 0~1)
+# - fp32: 그래프 변환에 따른 수치 오차 수준
+# - int8: 동적 양자화 오차. 점수는 조금 달라져도 순위는 유지되어야 합니다.
+FP32_ATOL = 1e-3
+INT8_ATOL = 5e-2
+TOP_K = 3
+
+
+@pytest.fixture(scope="module")
+def model_paths():
+    base_path = os.path.abspath(config.MODEL_CACHE_DIR)
+    local_path = os.path.join(base_path, "ko-reranker")
+    model_source = local_path if os.path.exists(local_path) else config.RERANKER_MODEL_NAME
+    return model_source, os.path.join(base_path, "ko-reranker-onnx")
+
+
+@pytest.fixture(scope="module")
+def torch_scores(model_paths):
+    model_source, _ = model_paths
+    try:
+        model = CrossEncoder(model_source, device='cpu', max_length=config.RERANKER_MAX_LENGTH)
+    except Exception as e:
+        pytest.skip(f"Reranker 모델을 불러올 수 없습니다: {e}")
+    return np.asarray(model.predict(PAIRS), dtype=np.float32)
+
+
+def _onnx_scores(model_paths, quantize: bool) -> np.ndarray:
+    model_source, onnx_dir = model_paths
+    export_onnx(model_source, onnx_dir, quantize=quantize)
+    model = OnnxCrossEncoder(onnx_dir, quantize=quantize, max_length=config.RERANKER_MAX_LENGTH)
+    return model.predict(PAIRS)
+
+
+def _assert_top_k_order(expected: np.ndarray, actual: np.ndarray, atol: float):
+    """
+    질문별 상위 TOP_K 문서 순서가 같은지 확인합니다.
+    기준 점수 차이가 atol 이하인 문서끼리(사실상 동점) 자리가 바뀐 것은 허용합니다.
+    """
+    n_docs = len(DOCUMENTS)
+    for qi, query in enumerate(QUERIES):
+        ref = expected[qi * n_docs:(qi + 1) * n_docs]
+        got = actual[qi * n_docs:(qi + 1) * n_docs]
+        ref_top = np.argsort(-ref, kind='stable')[:TOP_K]
+        got_top = np.argsort(-got, kind='stable')[:TOP_K]
+        for rank, (r, g) in enumerate(zip(ref_top, got_top), start=1):
+            assert r == g or abs(ref[r] - ref[g]) <= atol, (
+                f"'{query}' 상위 {rank}위가 다릅니다: torch={list(ref_top)}, onnx={list(got_top)}"
+            )
+
+
+@pytest.mark.parametrize("quantize, atol", [(False, FP32_ATOL), (True, INT8_ATOL)], ids=["fp32", "int8"])
+def test_onnx_matches_cross_encoder(model_paths, torch_scores, quantize, atol):
+    scores = _onnx_scores(model_paths, quantize)
+
+    assert scores.shape == torch_scores.shape
+    max_diff = float(np.max(np.abs(scores - torch_scores)))
+    assert max_diff <= atol, f"ONNX 점수가 torch와 다릅니다 (max diff {max_diff:.5f} > {atol})"
+    _assert_top_k_order(torch_scores, scores, atol)
@@ -0,0 +1,215 @@
+# 청킹 마이크로 벤치마크 (기존 chunk_markdown vs 스트리밍 iter_chunks)
+# - 실제 공고문 PDF(또는 .md)를 pymupdf4llm로 한 번 변환해 둔 뒤 청킹만 반복 측정합니다.
+# - 처리량(MB/s, chunks/s)과 tracemalloc 최대 메모리를 비교하고, 두 방식의 결과가 같은지 확인합니다.
+#
+# 실행: python bench_chunking.py [PDF/MD 파일 또는 폴더 ...] [--limit 20] [--repeat 5]
+#       경로를 주지 않으면 PDF_BASE_PATH 아래 LH_*_서울.경기 폴더의 공고문 PDF를 사용합니다.
+import re
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+from pathlib import Path
+from typing import List, Dict, Any
+
+from config import PDF_BASE_PATH, OPTIMAL_CHUNK_SIZE, MAX_CHUNK_SIZE, MAX_TABLE_SIZE, MIN_CHUNK_SIZE
+from chunking import SmartChunker
+from pdf_extract import extract_markdown
+
+
+class LegacySmartChunker(SmartChunker):
+    """비교 기준: 스트리밍 전환 이전의 청킹 (전체 문서 분할, 블록마다 정규식/테이블 판별 반복)"""
+
+    def chunk_markdown(self, md_text: str) -> List[Dict[str, Any]]:
+        blocks = re.split(r'\n\n+', md_text)
+        chunks = []
+        current_chunk = []
+        current_length = 0
+        current_section = None
+        previous_context = ""
+
+        for block in blocks:
+            block = block.strip()
+            if not block:
+                continue
+            section = self._legacy_section_name(block)
+            if section:
+                current_section = section
+
+            if self._legacy_is_table(block):
+                if current_chunk:
+                    chunk_info = self._legacy_chunk('\n\n'.join(current_chunk), current_section, False, previous_context)
+                    if chunk_info:
+                        chunks.append(chunk_info)
+                        previous_context = self._get_context(chunk_info['text'])
+                    current_chunk = []
+                    current_length = 0
+                pieces = self._split_table(block) if len(block) > MAX_TABLE_SIZE else [block]
+                for piece in pieces:
+                    chunk_info = self._legacy_chunk(piece, current_section, True, previous_context)
+                    if chunk_info:
+                        chunks.append(chunk_info)
+                        previous_context = self._get_context(piece)
+            else:
+                block_length = len(block)
+                if current_length + block_length > OPTIMAL_CHUNK_SIZE and current_chunk:
+                    chunk_text = '\n\n'.join(current_chunk)
+                    chunk_info = self._legacy_chunk(chunk_text, current_section, False, previous_context)
+                    if chunk_info:
+                        chunks.append(chunk_info)
+                        previous_context = self._get_context(chunk_text)
+                    current_chunk = [block]
+                    current_length = block_length
+                elif current_length + block_length > MAX_CHUNK_SIZE:
+                    if current_chunk:
+                        chunk_text = '\n\n'.join(current_chunk)
+                        chunk_info = self._legacy_chunk(chunk_text, current_section, False, previous_context)
+                        if chunk_info:
+                            chunks.append(chunk_info)
+                            previous_context = self._get_context(chunk_text)
+                    if block_length > MAX_CHUNK_SIZE:
+                        for sc in self.text_splitter.split_text(block):
+                            chunk_info = self._legacy_chunk(sc, current_section, False, previous_context)
+                            if chunk_info:
+                                chunks.append(chunk_info)
+                                previous_context = self._get_context(sc)
+                    else:
+                        current_chunk = [block]
+                        current_length = block_length
+                else:
+                    current_chunk.append(block)
+                    current_length += block_length
+
+        if current_chunk:
+            chunk_info = self._legacy_chunk('\n\n'.join(current_chunk), current_section, False, previous_context)
+            if chunk_info:
+                chunks.append(chunk_info)
+        return chunks
+
+    def _legacy_chunk(self, text, section, has_table, context):
+        if not self._legacy_is_meaningful(text):
+            return None
+        enriched_text = f"[{section}]\n{text}" if context and section else text
+        return {'text': text, 'enriched_text': enriched_text, 'section': section,
+                'has_table': has_table, 'length': len(text)}
+
+    def _legacy_section_name(self, text_chunk):
+        patterns = [r'^\s*#+\s*(.+)', r'^\s*【(.+?)】', r'^\s*\*\*(.+?)\*\*', r'^\s*■\s*(.+)', r'^\s*[0-9]+\.\s*(.+)']
+        for line in text_chunk.split('\n')[:3]:
+            for pattern in patterns:
+                match = re.match(pattern, line)
+                if match and len(match.group(1).strip()) > 5:
+                    return match.group(1).strip()
+        return None
+
+    def _legacy_is_table(self, text_chunk):
+        lines = text_chunk.split('\n')
+        pipe_lines = [line for line in lines if '|' in line]
+        return len(pipe_lines) >= 3 and len(pipe_lines) / len(lines) > 0.5
+
+    def _legacy_is_meaningful(self, text_chunk):
+        content = text_chunk.strip()
+        if len(content) < MIN_CHUNK_SIZE:
+            return False
+        if re.match(r'^[-\s\|\d\.]+$', content):
+            return False
+        if self._legacy_is_table(content):
+            if len([line for line in content.split('\n') if line.strip()]) <= 3:
+                return False
+        return len(re.findall(r'[가-힣a-zA-Z]{2,}', content)) >= 5
+
+
+def _is_notice(file_name: str) -> bool:
+    """Vectorizer.is_target_file과 같은 기준 (공고/공고문, 팸플릿 제외)"""
+    if '팸플릿' in file_name or '팜플렛' in file_name:
+        return False
+    return '공고문' in file_name or '공고' in file_name
+
+
+def load_documents(paths: List[str], limit: int) -> List[Dict[str, Any]]:
+    """PDF/MD → 페이지별 마크다운 (측정 전에 한 번만 변환)"""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.rglob('*.pdf')) + sorted(path.rglob('*.md')))
+        else:
+            files.append(path)
+    if not paths:
+        for folder in ('LH_lease_서울.경기', 'LH_sale_서울.경기'):
+            files.extend(path for path in sorted((PDF_BASE_PATH / folder).rglob('*.pdf')) if _is_notice(path.name))
+
+    documents = []
+    for path in files[:limit]:
+        if path.suffix.lower() == '.pdf':
+            pages = extract_markdown(str(path))['page_texts']
+        else:
+            pages = [path.read_text(encoding='utf-8')]
+        documents.append({'name': path.name, 'pages': pages, 'bytes': sum(len(p.encode('utf-8')) for p in pages)})
+    return documents
+
+
+def measure(fn, documents: List[Dict[str, Any]], repeat: int) -> Dict[str, float]:
+    """문서 전체를 repeat번 청킹한 시간(중앙값)과 문서별 최대 메모리"""
+    timings = []
+    chunks = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = sum(fn(doc['pages']) for doc in documents)
+        timings.append(time.perf_counter() - start)
+
+    peak = 0
+    for doc in documents:
+        tracemalloc.start()
+        fn(doc['pages'])
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    elapsed = statistics.median(timings)
+    total_bytes = sum(doc['bytes'] for doc in documents)
+    return {
+        'seconds': elapsed,
+        'mb_per_sec': total_bytes / 1e6 / elapsed,
+        'chunks_per_sec': chunks / elapsed,
+        'peak_kb': peak / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="청킹 마이크로 벤치마크")
+    parser.add_argument('paths', nargs='*', help="PDF/MD 파일 또는 폴더 (기본: PDF_BASE_PATH의 공고문)")
+    parser.add_argument('--limit', type=int, default=20, help="사용할 문서 수")
+    parser.add_argument('--repeat', type=int, default=5, help="반복 횟수 (중앙값 사용)")
+    args = parser.parse_args()
+
+    documents = load_documents(args.paths, args.limit)
+    if not documents:
+        print("측정할 문서가 없습니다 (PDF/MD 경로를 지정하세요)")
+        sys.exit(1)
+
+    legacy = LegacySmartChunker()
+    streaming = SmartChunker()
+
+    # 결과 일치 확인
+    mismatched = [doc['name'] for doc in documents
+                  if legacy.chunk_markdown(''.join(doc['pages'])) != list(streaming.iter_chunks(doc['pages']))]
+
+    results = {
+        'legacy (chunk_markdown)': measure(lambda pages: len(legacy.chunk_markdown(''.join(pages))), documents, args.repeat),
+        # 청크를 모으지 않고 바로 소비 (파이프라인에서 다음 단계로 넘기는 경우)
+        'streaming (iter_chunks)': measure(lambda pages: sum(1 for _ in streaming.iter_chunks(pages)), documents, args.repeat),
+    }
+
+    total_mb = sum(doc['bytes'] for doc in documents) / 1e6
+    total_pages = sum(len(doc['pages']) for doc in documents)
+    print(f"문서 {len(documents)}개, {total_pages}페이지, 마크다운 {total_mb:.2f}MB, 반복 {args.repeat}회")
+    print(f"결과 일치: {'예' if not mismatched else '아니오 - ' + ', '.join(mismatched)}\n")
+    print(f"{'방식':<26}{'시간(s)':>10}{'MB/s':>10}{'chunks/s':>12}{'최대 메모리(KB)':>18}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['seconds']:>10.3f}{r['mb_per_sec']:>10.2f}{r['chunks_per_sec']:>12.0f}{r['peak_kb']:>18.0f}")
+    base, new = results['legacy (chunk_markdown)'], results['streaming (iter_chunks)']
+    print(f"\n속도 {base['seconds'] / new['seconds']:.2f}배, 최대 메모리 {new['peak_kb'] / base['peak_kb'] * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,42 @@
 # 텍스트 청킹 (문맥 보존)
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from config import MIN_CHUNK_SIZE, OPTIMAL_CHUNK_SIZE, MAX_CHUNK_SIZE, MAX_TABLE_SIZE, CHUNK_OVERLAP
 
 
+# 정규식은 모듈 로드 시 한 번만 컴파일
+_BLOCK_SEPARATOR = re.compile(r'\n\n+')
+_SECTION_PATTERNS = [
+    re.compile(r'^\s*#+\s*(.+)'),
+    re.compile(r'^\s*【(.+?)】'),
+    re.compile(r'^\s*\*\*(.+?)\*\*'),
+    re.compile(r'^\s*■\s*(.+)'),
+    re.compile(r'^\s*[0-9]+\.\s*(.+)'),
+]
+_SYMBOLS_ONLY = re.compile(r'^[-\s\|\d\.]+$')
+_WORD = re.compile(r'[가-힣a-zA-Z]{2,}')
+
+# 줄 통계 (전체 줄 수, '|' 포함 줄 수, 비어있지 않은 줄 수)
+LineStats = Tuple[int, int, int]
+
+def _line_stats(text: str) -> LineStats:
+    lines = text.split('\n')
+    pipe_lines = sum(1 for line in lines if '|' in line)
+    non_empty = sum(1 for line in lines if line.strip())
+    return len(lines), pipe_lines, non_empty
+
+def _is_table_stats(stats: LineStats) -> bool:
+    lines, pipe_lines, _ = stats
+    return pipe_lines >= 3 and pipe_lines / lines > 0.5
+
+
 class SmartChunker:
-    """문맥 보존 텍스트 청킹"""
+    """
+    문맥 보존 텍스트 청킹
+    - iter_chunks: 페이지 단위 마크다운을 받아 블록을 나누는 즉시 청크를 하나씩 반환 (전체 문서를 한 문자열로 합치지 않음)
+    - 블록마다 줄 통계를 한 번만 계산하고, 블록을 이어 붙인 청크의 통계는 합산으로 구합니다.
+    """
     
     def __init__(self):
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -17,45 +47,65 @@ class SmartChunker:
     
     def chunk_markdown(self, md_text: str) -> List[Dict[str, Any]]:
         """마크다운 텍스트 청킹"""
-        blocks = re.split(r'\n\n+', md_text)
-        chunks = []
+        return list(self.iter_chunks([md_text]))
+    
+    def chunk_pages(self, pages: Iterable[str]) -> List[Dict[str, Any]]:
+        """페이지별 마크다운 청킹 (pymupdf4llm page_chunks 출력)"""
+        return list(self.iter_chunks(pages))
+    
+    def iter_blocks(self, pages: Iterable[str]) -> Iterator[str]:
+        """페이지를 차례로 받아 빈 줄 기준 블록으로 분할 (페이지 경계에 걸친 블록은 다음 페이지와 이어 붙임)"""
+        remainder = ''
+        for page in pages:
+            parts = _BLOCK_SEPARATOR.split(remainder + page)
+            remainder = parts.pop()
+            for block in parts:
+                block = block.strip()
+                if block:
+                    yield block
+        remainder = remainder.strip()
+        if remainder:
+            yield remainder
+    
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """페이지별 마크다운 → 청크 (제너레이터)"""
         current_chunk = []
         current_length = 0
+        current_stats = [0, 0, 0]
         current_section = None
         previous_context = ""
         
-        for block in blocks:
-            block = block.strip()
-            if not block:
-                continue
-            
+        for block in self.iter_blocks(pages):
             # 섹션 헤더 감지
             section = self._extract_section_name(block)
             if section:
                 current_section = section
             
+            stats = _line_stats(block)
+            
             # 테이블 처리
-            if self._is_table(block):
+            if _is_table_stats(stats):
                 if current_chunk:
-                    chunk_info = self._create_chunk('\n\n'.join(current_chunk), current_section, False, previous_context)
+                    chunk_info = self._create_chunk('\n\n'.join(current_chunk), current_section, False, previous_context,
+                                                    self._joined_stats(current_stats, len(current_chunk)))
                     if chunk_info:
-                        chunks.append(chunk_info)
+                        yield chunk_info
                         previous_context = self._get_context(chunk_info['text'])
                     current_chunk = []
                     current_length = 0
+                    current_stats = [0, 0, 0]
                 
                 # 큰 테이블 분할
                 if len(block) > MAX_TABLE_SIZE:
-                    table_chunks = self._split_table(block)
-                    for tc in table_chunks:
+                    for tc in self._split_table(block):
                         chunk_info = self._create_chunk(tc, current_section, True, previous_context)
                         if chunk_info:
-                            chunks.append(chunk_info)
+                            yield chunk_info
                             previous_context = self._get_context(tc)
                 else:
-                    chunk_info = self._create_chunk(block, current_section, True, previous_context)
+                    chunk_info = self._create_chunk(block, current_section, True, previous_context, stats)
                     if chunk_info:
-                        chunks.append(chunk_info)
+                        yield chunk_info
                         previous_context = self._get_context(block)
             
             # 일반 텍스트 처리
@@ -64,47 +114,58 @@ class SmartChunker:
                 
                 if current_length + block_length > OPTIMAL_CHUNK_SIZE and current_chunk:
                     chunk_text = '\n\n'.join(current_chunk)
-                    chunk_info = self._create_chunk(chunk_text, current_section, False, previous_context)
+                    chunk_info = self._create_chunk(chunk_text, current_section, False, previous_context,
+                                                    self._joined_stats(current_stats, len(current_chunk)))
                     if chunk_info:
-                        chunks.append(chunk_info)
+                        yield chunk_info
                         previous_context = self._get_context(chunk_text)
                     current_chunk = [block]
                     current_length = block_length
+                    current_stats = list(stats)
                 
                 elif current_length + block_length > MAX_CHUNK_SIZE:
                     if current_chunk:
                         chunk_text = '\n\n'.join(current_chunk)
-                        chunk_info = self._create_chunk(chunk_text, current_section, False, previous_context)
+                        chunk_info = self._create_chunk(chunk_text, current_section, False, previous_context,
+                                                        self._joined_stats(current_stats, len(current_chunk)))
                         if chunk_info:
-                            chunks.append(chunk_info)
+                            yield chunk_info
                             previous_context = self._get_context(chunk_text)
                     
                     if block_length > MAX_CHUNK_SIZE:
-                        split_chunks = self.text_splitter.split_text(block)
-                        for sc in split_chunks:
+                        for sc in self.text_splitter.split_text(block):
                             chunk_info = self._create_chunk(sc, current_section, False, previous_context)
                             if chunk_info:
-                                chunks.append(chunk_info)
+                                yield chunk_info
                                 previous_context = self._get_context(sc)
                     else:
                         current_chunk = [block]
                         current_length = block_length
+                        current_stats = list(stats)
                 
                 else:
                     current_chunk.append(block)
                     current_length += block_length
+                    for i in range(3):
+                        current_stats[i] += stats[i]
         
         if current_chunk:
             chunk_text = '\n\n'.join(current_chunk)
-            chunk_info = self._create_chunk(chunk_text, current_section, False, previous_context)
+            chunk_info = self._create_chunk(chunk_text, current_section, False, previous_context,
+                                            self._joined_stats(current_stats, len(current_chunk)))
             if chunk_info:
-                chunks.append(chunk_info)
-        
-        return chunks
+                yield chunk_info
     
-    def _create_chunk(self, text: str, section: str, has_table: bool, context: str) -> Dict[str, Any]:
-        """청크 생성"""
-        if not self._is_meaningful(text):
+    @staticmethod
+    def _joined_stats(stats: List[int], block_count: int) -> LineStats:
+        """블록을 빈 줄로 이어 붙인 텍스트의 줄 통계 (구분자마다 빈 줄 1개 추가)"""
+        lines, pipe_lines, non_empty = stats
+        return lines + block_count - 1, pipe_lines, non_empty
+    
+    def _create_chunk(self, text: str, section: str, has_table: bool, context: str,
+                      stats: Optional[LineStats] = None) -> Dict[str, Any]:
+        """청크 생성 (stats: 이미 계산한 줄 통계가 있으면 재사용)"""
+        if not self._is_meaningful(text, stats):
             return None
         
         enriched_text = f"[{section}]\n{text}" if context and section else text
@@ -123,16 +184,10 @@ class SmartChunker:
     
     def _extract_section_name(self, text_chunk: str) -> str:
         """섹션 이름 추출"""
-        patterns = [
-            r'^\s*#+\s*(.+)',
-            r'^\s*【(.+?)】',
-            r'^\s*\*\*(.+?)\*\*',
-            r'^\s*■\s*(.+)',
-            r'^\s*[0-9]+\.\s*(.+)',
-        ]
-        for line in text_chunk.split('\n')[:3]:
-            for pattern in patterns:
-                match = re.match(pattern, line)
+        # 앞 3줄만 필요하므로 블록 전체를 나누지 않음
+        for line in text_chunk.split('\n', 3)[:3]:
+            for pattern in _SECTION_PATTERNS:
+                match = pattern.match(line)
                 if match:
                     section_title = match.group(1).strip()
                     if len(section_title) > 5:
@@ -141,30 +196,30 @@ class SmartChunker:
     
     def _is_table(self, text_chunk: str) -> bool:
         """테이블 여부 확인"""
-        lines = text_chunk.split('\n')
-        pipe_lines = [line for line in lines if '|' in line]
-        return len(pipe_lines) >= 3 and len(pipe_lines) / len(lines) > 0.5
+        return _is_table_stats(_line_stats(text_chunk))
     
-    def _is_meaningful(self, text_chunk: str) -> bool:
+    def _is_meaningful(self, text_chunk: str, stats: Optional[LineStats] = None) -> bool:
         """의미 있는 청크인지 확인"""
         content = text_chunk.strip()
         
         if len(content) < MIN_CHUNK_SIZE:
             return False
         
-        if re.match(r'^[-\s\|\d\.]+$', content):
+        if _SYMBOLS_ONLY.match(content):
             return False
         
-        if self._is_table(content):
-            lines = [line for line in content.split('\n') if line.strip()]
-            if len(lines) <= 3:
-                return False
-        
-        words = re.findall(r'[가-힣a-zA-Z]{2,}', content)
-        if len(words) < 5:
+        if stats is None or len(content) != len(text_chunk):
+            stats = _line_stats(content)
+        if _is_table_stats(stats) and stats[2] <= 3:
             return False
         
-        return True
+        # 단어 5개를 찾으면 바로 종료
+        words = 0
+        for _ in _WORD.finditer(content):
+            words += 1
+            if words >= 5:
+                return True
+        return False
     
     def _split_table(self, table_text: str, max_size: int = MAX_TABLE_SIZE) -> List[str]:
         """큰 테이블 분할 (헤더 유지)"""
@@ -17,6 +17,7 @@ DB_CONFIG = {
 # 경로 설정 (수정됨)
 BASE_DIR = Path(__file__).parent.parent.parent
 PDF_BASE_PATH = BASE_DIR
+PDF_INDEX_PATH = Path(__file__).parent / 'pdf_index.json'  # 파일명 → 경로 인덱스 (디렉터리 변경 시 자동 재생성)
 
 # 임베딩 모델
 EMBEDDING_MODEL = 'BAAI/bge-m3'
@@ -42,3 +43,14 @@ OPENAI_MAX_TOKENS = 1500
 # 처리 설정
 BATCH_SIZE = 10
 MAX_WORKERS = 4
+
+# 파이프라인 설정 (PDF 추출 → 청킹 → 임베딩 → DB 저장)
+PDF_WORKERS = os.cpu_count() or 4  # PDF → 마크다운 변환 프로세스 수
+PIPELINE_QUEUE_SIZE = 8  # 단계 사이 큐 크기 (파일 단위, 메모리 상한)
+EMBED_BATCH_CHUNKS = 64  # 여러 파일의 청크를 모아 한 번에 임베딩할 최소 개수
+DB_WRITERS = 4  # 동시 DB 저장 작업 수
+EMBEDDING_STORE_SIZE = 20000  # 텍스트 해시 → 임베딩 메모리 저장소 크기 (공고문 간 공통 문구 재사용)
+
+# 작업 원장 설정 (migrations/002_vectorization_jobs.sql)
+JOB_MAX_ATTEMPTS = 3  # 파일당 최대 시도 횟수 (초과 시 failed로 남김)
+JOB_LEASE_SECONDS = 1800  # running 상태가 이 시간을 넘으면 중단된 작업으로 보고 다시 가져감
@@ -1,10 +1,44 @@
 # 데이터베이스 관리
 import asyncpg
 import json
-from typing import List, Dict, Any, Optional
+import struct
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from config import DB_CONFIG
 
 
+# pgvector 바이너리 형식: int16 차원, int16 예약(0), float32(big-endian) x 차원
+_VECTOR_HEADER = struct.Struct('!hh')
+
+def _encode_vector(embedding: Sequence[float]) -> bytes:
+    values = np.asarray(embedding, dtype='>f4')
+    return _VECTOR_HEADER.pack(values.shape[0], 0) + values.tobytes()
+
+def _decode_vector(data: bytes) -> np.ndarray:
+    dim, _ = _VECTOR_HEADER.unpack_from(data)
+    return np.frombuffer(data, dtype='>f4', count=dim, offset=_VECTOR_HEADER.size).astype(np.float32)
+
+async def _register_vector_codec(conn):
+    """이 연결에서만 vector 타입을 바이너리로 주고받도록 설정 (검색 쿼리의 문자열 파라미터에는 영향 없음)"""
+    await conn.set_type_codec(
+        'vector', schema='public', format='binary',
+        encoder=_encode_vector, decoder=_decode_vector
+    )
+
+# COPY로 저장하는 document_chunks 컬럼 순서
+CHUNK_COPY_COLUMNS = ['announcement_id', 'file_id', 'chunk_text', 'chunk_index', 'embedding', 'metadata', 'text_hash']
+
+# 작업 결과 기록: 작업을 가져간 워커가 아직 처리 중(running)일 때만 갱신
+# (lease가 지나 다른 워커가 다시 가져간 작업은 0행 → 늦게 끝난 워커의 결과를 버림)
+FINISH_JOB_QUERY = """
+    UPDATE vectorization_jobs
+    SET state = $3, last_error = $4, chunks_count = $5, finished_at = NOW(),
+        duration_ms = (EXTRACT(EPOCH FROM NOW() - claimed_at) * 1000)::int
+    WHERE file_id = $1 AND worker = $2 AND state = 'running'
+    RETURNING file_id
+"""
+
+
 class DatabaseManager:
     """DB 연결 및 쿼리 관리"""
     
@@ -66,7 +100,7 @@ class DatabaseManager:
     async def get_announcement_files(self, announcement_id: str) -> List[Dict[str, Any]]:
         """공고의 파일 목록 조회"""
         query = """
-            SELECT id, announcement_id, file_name
+            SELECT id, announcement_id, file_name, file_path, content_hash
             FROM announcement_files
             WHERE announcement_id = $1 AND is_vectorized = FALSE
         """
@@ -82,6 +116,18 @@ class DatabaseManager:
         """
         await self.execute_command(query, file_id)
     
+    async def update_file_paths(self, paths: List[Tuple[int, str]]):
+        """찾은 PDF 경로 저장 (다음 실행부터 파일 탐색 생략)"""
+        if not paths:
+            return
+        conn = await self.get_connection()
+        try:
+            await conn.executemany(
+                "UPDATE announcement_files SET file_path = $2 WHERE id = $1", paths
+            )
+        finally:
+            await conn.close()
+    
     async def mark_announcement_vectorized(self, announcement_id: str):
         """공고 벡터화 완료 표시"""
         query = """
@@ -106,6 +152,230 @@ class DatabaseManager:
             str(embedding), json.dumps(metadata)
         )
     
+    async def save_file_chunks(self, announcement_id: str, file_id: int,
+                               chunks: List[Dict[str, Any]], content_hash: Optional[str] = None,
+                               worker: Optional[str] = None) -> Optional[int]:
+        """
+        파일의 청크를 한 번에 저장 (COPY, 단일 트랜잭션)
+        - chunks: [{'chunk_text', 'chunk_index', 'embedding', 'metadata', 'text_hash'}, ...]
+        - content_hash: PDF 원본 해시 (다음 실행에서 변경 여부 판단)
+        - worker: 작업 원장의 작업을 done으로 기록할 워커. 이 워커가 더 이상 작업을 갖고 있지 않으면
+          (lease 만료 후 다른 워커가 가져감) 아무것도 쓰지 않고 None을 반환합니다.
+        - 임베딩은 문자열 변환 없이 pgvector 바이너리 형식으로 전송합니다.
+        - 재처리 시 COPY는 ON CONFLICT를 쓸 수 없으므로 파일의 기존 청크를 먼저 지우고,
+          작업 완료 기록, 청크 저장, mark_file_vectorized를 같은 트랜잭션에서 처리합니다. (중간 실패 시 전체 롤백)
+        """
+        conn = await self.get_connection()
+        try:
+            await _register_vector_codec(conn)
+            records = [
+                (announcement_id, file_id, chunk['chunk_text'], chunk['chunk_index'],
+                 chunk['embedding'], json.dumps(chunk['metadata'], ensure_ascii=False),
+                 chunk.get('text_hash'))
+                for chunk in chunks
+            ]
+            async with conn.transaction():
+                if worker is not None:
+                    owned = await conn.fetchval(FINISH_JOB_QUERY, file_id, worker, 'done', None, len(records))
+                    if owned is None:
+                        return None
+                await conn.execute("DELETE FROM document_chunks WHERE file_id = $1", file_id)
+                if records:
+                    await conn.copy_records_to_table(
+                        'document_chunks', records=records, columns=CHUNK_COPY_COLUMNS
+                    )
+                await conn.execute("""
+                    UPDATE announcement_files
+                    SET is_vectorized = TRUE, vectorized_at = NOW(),
+                        content_hash = COALESCE($2, content_hash)
+                    WHERE id = $1
+                """, file_id, content_hash)
+            return len(records)
+        finally:
+            await conn.close()
+    
+    async def get_chunk_embeddings(self, file_id: int) -> Dict[str, np.ndarray]:
+        """파일의 기존 청크 임베딩 {text_hash: embedding} (바뀌지 않은 청크의 임베딩 재사용)"""
+        conn = await self.get_connection()
+        try:
+            await _register_vector_codec(conn)
+            rows = await conn.fetch("""
+                SELECT text_hash, embedding FROM document_chunks
+                WHERE file_id = $1 AND text_hash IS NOT NULL
+            """, file_id)
+            return {row['text_hash']: row['embedding'] for row in rows}
+        finally:
+            await conn.close()
+    
+    async def get_embeddings_by_hash(self, text_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """전체 청크에서 text_hash가 같은 기존 임베딩 조회 (다른 공고문의 동일 문구 재사용)"""
+        if not text_hashes:
+            return {}
+        conn = await self.get_connection()
+        try:
+            await _register_vector_codec(conn)
+            rows = await conn.fetch("""
+                SELECT DISTINCT ON (text_hash) text_hash, embedding
+                FROM document_chunks
+                WHERE text_hash = ANY($1::text[])
+            """, text_hashes)
+            return {row['text_hash']: row['embedding'] for row in rows}
+        finally:
+            await conn.close()
+    
+    async def get_vectorized_files(self) -> List[Dict[str, Any]]:
+        """벡터화 완료 + 경로가 저장된 파일 (원본 변경 확인용)"""
+        query = """
+            SELECT id, announcement_id, file_path, content_hash
+            FROM announcement_files
+            WHERE is_vectorized = TRUE AND file_path IS NOT NULL
+        """
+        results = await self.execute_query(query)
+        return [dict(row) for row in results]
+    
+    async def update_content_hashes(self, hashes: List[Tuple[int, str]]):
+        """content_hash 기록 (해시 컬럼 추가 이전에 벡터화된 파일)"""
+        if not hashes:
+            return
+        conn = await self.get_connection()
+        try:
+            await conn.executemany(
+                "UPDATE announcement_files SET content_hash = $2 WHERE id = $1", hashes
+            )
+        finally:
+            await conn.close()
+    
+    async def reset_files_vectorized(self, file_ids: List[int]):
+        """원본이 바뀐 파일과 그 공고를 다시 벡터화 대상으로 표시 (기존 청크는 재처리 시 교체)"""
+        if not file_ids:
+            return
+        conn = await self.get_connection()
+        try:
+            async with conn.transaction():
+                await conn.execute("""
+                    UPDATE announcement_files SET is_vectorized = FALSE
+                    WHERE id = ANY($1::int[])
+                """, file_ids)
+                await conn.execute("""
+                    UPDATE announcements SET is_vectorized = FALSE
+                    WHERE id IN (SELECT announcement_id FROM announcement_files WHERE id = ANY($1::int[]))
+                """, file_ids)
+        finally:
+            await conn.close()
+    
+    async def enqueue_jobs(self, announcement_id: Optional[str] = None) -> int:
+        """
+        미벡터화 파일을 작업 원장에 등록 (이미 있으면 유지, announcement_id를 주면 해당 공고만)
+        완료(done)된 작업의 파일이 다시 미벡터화 상태가 되면(--refresh 등) 대기 상태로 되돌립니다.
+        skipped(팸플릿 등)는 is_vectorized가 계속 FALSE이므로 되돌리지 않습니다. (매 실행마다 다시 대기열에 오르지 않도록)
+        """
+        query = """
+            WITH upserted AS (
+                INSERT INTO vectorization_jobs (file_id, announcement_id)
+                SELECT id, announcement_id FROM announcement_files
+                WHERE is_vectorized = FALSE
+                  AND ($1::varchar IS NULL OR announcement_id = $1)
+                ON CONFLICT (file_id) DO UPDATE
+                    SET state = 'pending', attempts = 0, last_error = NULL
+                    WHERE vectorization_jobs.state = 'done'
+                RETURNING 1
+            )
+            SELECT count(*) FROM upserted
+        """
+        return await self.execute_single(query, announcement_id)
+    
+    async def claim_jobs(self, limit: int, worker: str, max_attempts: int,
+                         lease_seconds: int, announcement_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        처리할 파일 작업을 가져옵니다. (여러 워커가 동시에 실행해도 겹치지 않음, announcement_id를 주면 해당 공고만)
+        대기 작업, 재시도 가능한 실패 작업, lease가 지난 처리 중 작업(중단된 워커)이 대상입니다.
+        lease가 지난 작업도 시도 횟수 안에서만 다시 가져가고, 횟수를 다 쓴 작업은 실패로 기록합니다.
+        (워커를 죽이는 파일(OOM 등)을 무한히 다시 가져가지 않도록)
+        """
+        expire_query = """
+            UPDATE vectorization_jobs
+            SET state = 'failed', last_error = 'lease expired', finished_at = NOW()
+            WHERE state = 'running' AND attempts >= $1
+              AND claimed_at < NOW() - make_interval(secs => $2)
+        """
+        query = """
+            WITH claimed AS (
+                UPDATE vectorization_jobs j
+                SET state = 'running', attempts = j.attempts + 1, worker = $2,
+                    claimed_at = NOW(), finished_at = NULL, duration_ms = NULL
+                WHERE j.file_id IN (
+                    SELECT file_id FROM vectorization_jobs
+                    WHERE (state = 'pending'
+                           OR (state = 'failed' AND attempts < $3)
+                           OR (state = 'running' AND attempts < $3
+                               AND claimed_at < NOW() - make_interval(secs => $4)))
+                      AND ($5::varchar IS NULL OR announcement_id = $5)
+                    ORDER BY announcement_id, file_id
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING j.file_id, j.announcement_id, j.attempts
+            )
+            SELECT c.file_id AS id, c.announcement_id, c.attempts,
+                   af.file_name, af.file_path, af.content_hash, a.title, a.category
+            FROM claimed c
+            JOIN announcement_files af ON af.id = c.file_id
+            JOIN announcements a ON a.id = c.announcement_id
+            ORDER BY c.announcement_id, c.file_id
+        """
+        conn = await self.get_connection()
+        try:
+            await conn.execute(expire_query, max_attempts, float(lease_seconds))
+            results = await conn.fetch(query, limit, worker, max_attempts, float(lease_seconds), announcement_id)
+            return [dict(row) for row in results]
+        finally:
+            await conn.close()
+    
+    async def finish_job(self, file_id: int, worker: str, state: str, error: Optional[str] = None,
+                         chunks_count: Optional[int] = None) -> bool:
+        """
+        작업 결과 기록 (done / failed / skipped)
+        이 워커가 작업을 갖고 있지 않으면(lease 만료 후 다른 워커가 가져감) 기록하지 않고 False를 반환합니다.
+        """
+        return await self.execute_single(FINISH_JOB_QUERY, file_id, worker, state, error, chunks_count) is not None
+    
+    async def complete_announcements(self, announcement_ids: List[str]) -> List[str]:
+        """
+        모든 파일 작업이 done/skipped인 공고만 벡터화 완료 표시 (실패 파일이 있으면 미완료로 유지)
+        작업 원장에 작업이 하나도 없는 공고(원장을 거치지 않고 처리한 경우)는 완료로 표시하지 않습니다.
+        """
+        query = """
+            UPDATE announcements a
+            SET is_vectorized = TRUE, vectorized_at = NOW()
+            WHERE a.id = ANY($1::varchar[])
+              AND EXISTS (SELECT 1 FROM vectorization_jobs j WHERE j.announcement_id = a.id)
+              AND NOT EXISTS (
+                  SELECT 1 FROM vectorization_jobs j
+                  WHERE j.announcement_id = a.id AND j.state NOT IN ('done', 'skipped')
+              )
+            RETURNING a.id
+        """
+        results = await self.execute_query(query, announcement_ids)
+        return [row['id'] for row in results]
+    
+    async def get_job_progress(self, max_attempts: int, window_seconds: int = 300) -> Dict[str, Any]:
+        """작업 상태별 개수와 최근 처리 속도 (모든 워커 합산)"""
+        query = """
+            SELECT
+                count(*) FILTER (WHERE state IN ('done', 'skipped')) AS finished,
+                count(*) FILTER (WHERE state = 'pending' OR (state = 'failed' AND attempts < $1)) AS remaining,
+                count(*) FILTER (WHERE state = 'running') AS running,
+                count(*) FILTER (WHERE state = 'failed' AND attempts >= $1) AS failed,
+                count(*) AS total,
+                count(*) FILTER (WHERE state = 'done' AND finished_at > NOW() - make_interval(secs => $2)) AS recent,
+                count(DISTINCT worker) FILTER (WHERE state = 'running') AS workers
+            FROM vectorization_jobs
+        """
+        results = await self.execute_query(query, max_attempts, float(window_seconds))
+        progress = dict(results[0])
+        progress['files_per_sec'] = progress['recent'] / window_seconds
+        return progress
+    
     async def search_chunks(self, query_embedding: List[float], top_k: int = 5,
                            announcement_id: Optional[str] = None,
                            category: Optional[str] = None,
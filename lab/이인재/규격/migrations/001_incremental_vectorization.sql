@@ -0,0 +1,11 @@
+-- ====================================================================
+-- 001. 증분 재벡터화용 해시 컬럼
+-- - announcement_files.content_hash : PDF 원본 SHA-256 (바뀐 공고문만 다시 처리)
+-- - document_chunks.text_hash       : 임베딩한 텍스트(enriched_text) SHA-256 (바뀌지 않은 청크의 임베딩 재사용)
+-- 실행: psql -d <DB> -f migrations/001_incremental_vectorization.sql
+-- ====================================================================
+
+ALTER TABLE announcement_files ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS text_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_chunks_text_hash ON document_chunks(text_hash);
@@ -0,0 +1,33 @@
+-- ====================================================================
+-- 002. 벡터화 작업 원장 (파일 단위)
+-- - state: pending(대기) / running(처리 중) / done(완료) / failed(실패) / skipped(대상 아님: 팸플릿 등)
+-- - running 상태로 lease(JOB_LEASE_SECONDS)가 지난 작업은 중단된(kill -9 등) 작업으로 보고 다시 가져갑니다.
+--   (attempts < JOB_MAX_ATTEMPTS 일 때만, 횟수를 다 쓴 작업은 'lease expired'로 failed 처리)
+-- - 결과는 작업을 가져간 워커(worker)가 아직 running일 때만 기록합니다. (lease를 잃은 워커의 결과는 버림)
+-- - failed 작업은 attempts < JOB_MAX_ATTEMPTS 일 때만 재시도합니다.
+-- - 여러 수집 워커가 SELECT ... FOR UPDATE SKIP LOCKED 로 겹치지 않게 작업을 가져갑니다.
+-- 실행: psql -d <DB> -f migrations/002_vectorization_jobs.sql
+-- ====================================================================
+
+CREATE TABLE IF NOT EXISTS vectorization_jobs (
+    file_id INTEGER PRIMARY KEY REFERENCES announcement_files(id) ON DELETE CASCADE,
+    announcement_id VARCHAR(50) NOT NULL REFERENCES announcements(id) ON DELETE CASCADE,
+
+    state TEXT NOT NULL DEFAULT 'pending'
+        CHECK (state IN ('pending', 'running', 'done', 'failed', 'skipped')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    worker TEXT,  -- 처리 중인 워커 (호스트명:PID)
+
+    -- 시간 기록
+    claimed_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    duration_ms INTEGER,
+    chunks_count INTEGER,
+
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON vectorization_jobs(state);
+CREATE INDEX IF NOT EXISTS idx_jobs_announcement ON vectorization_jobs(announcement_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON vectorization_jobs(finished_at) WHERE state = 'done';
@@ -0,0 +1,31 @@
+# PDF → 마크다운 추출 (프로세스 풀 워커)
+# 워커 프로세스는 spawn으로 시작하므로 torch/sentence-transformers를 임포트하지 않도록 별도 모듈로 둡니다.
+import hashlib
+from typing import Dict, Any, Optional
+import pymupdf4llm
+
+
+def file_sha256(pdf_path: str) -> str:
+    """PDF 원본 해시 (재게시된 공고문 감지용)"""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_markdown(pdf_path: str, known_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    PDF 한 개를 페이지 단위로 마크다운 변환 (페이지별 텍스트, 페이지 수, 원본 해시 포함)
+    known_hash와 원본 해시가 같으면 변환을 생략하고 unchanged=True를 반환합니다.
+    """
+    content_hash = file_sha256(pdf_path)
+    if known_hash and content_hash == known_hash:
+        return {'content_hash': content_hash, 'unchanged': True}
+
+    pages = pymupdf4llm.to_markdown(pdf_path, page_chunks=True)
+    return {
+        'content_hash': content_hash,
+        'page_texts': [page['text'] for page in pages],  # 청커가 페이지 순서대로 이어서 처리 (SmartChunker.iter_chunks)
+        'pages': len(pages)
+    }
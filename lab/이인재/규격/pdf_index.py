@@ -0,0 +1,71 @@
+# PDF 파일 인덱스 (파일명 → 경로)
+import os
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class PdfIndex:
+    """
+    폴더별 파일명 → 경로 인덱스 (JSON 파일로 저장)
+    - 파일마다 rglob으로 트리 전체를 훑는 대신, 폴더당 한 번만 훑어 인덱스를 만듭니다.
+    - 인덱스에는 하위 디렉터리별 mtime을 같이 저장하고, 로드할 때 디렉터리만 stat하여
+      하나라도 바뀌었으면(파일 추가/삭제/이름 변경) 해당 폴더를 다시 훑습니다.
+    - 같은 이름의 파일이 여러 개면 처음 찾은 경로를 사용합니다.
+    """
+
+    def __init__(self, base_path: Path, index_path: Path):
+        self.base_path = Path(base_path)
+        self.index_path = Path(index_path)
+        self._folders: Dict[str, Dict] = {}
+        self._validated = set()
+        self._load()
+
+    def _load(self):
+        if self.index_path.exists():
+            try:
+                self._folders = json.loads(self.index_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                print(f"[PdfIndex] 인덱스 로드 실패, 다시 생성합니다: {e}")
+                self._folders = {}
+
+    def _save(self):
+        tmp_path = self.index_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self._folders, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, self.index_path)
+
+    def _is_fresh(self, folder: str) -> bool:
+        entry = self._folders.get(folder)
+        if not entry:
+            return False
+        root = self.base_path / folder
+        for rel_dir, mtime in entry['dirs'].items():
+            try:
+                if os.stat(root / rel_dir).st_mtime != mtime:
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+    def _build(self, folder: str):
+        root = self.base_path / folder
+        dirs, files = {}, {}
+        for dir_path, _, file_names in os.walk(root):
+            rel_dir = os.path.relpath(dir_path, root)
+            dirs[rel_dir] = os.stat(dir_path).st_mtime
+            for name in file_names:
+                if name.lower().endswith('.pdf'):
+                    files.setdefault(name, os.path.join(rel_dir, name))
+        self._folders[folder] = {'dirs': dirs, 'files': files}
+        self._save()
+        print(f"[PdfIndex] {folder}: PDF {len(files)}개 인덱싱")
+
+    def lookup(self, folder: str, file_name: str) -> Optional[Path]:
+        """파일명으로 경로 조회 (폴더당 실행 중 한 번만 최신 여부 확인)"""
+        if folder not in self._validated:
+            if not self._is_fresh(folder):
+                self._build(folder)
+            self._validated.add(folder)
+
+        rel_path = self._folders[folder]['files'].get(file_name)
+        return self.base_path / folder / rel_path if rel_path else None
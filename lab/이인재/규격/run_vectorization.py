@@ -6,13 +6,16 @@ from vectorizer import Vectorizer
 
 async def main():
     """벡터화 실행"""
-    batch_size = 10
+    batch_size = 32  # 한 번에 가져올 파일 작업 수
+    # --refresh: 벡터화된 파일의 원본 해시를 확인해 바뀐 공고문만 다시 처리
+    refresh = '--refresh' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--refresh']
     
-    if len(sys.argv) > 1:
+    if args:
         try:
-            batch_size = int(sys.argv[1])
+            batch_size = int(args[0])
         except ValueError:
-            print("사용법: python run_vectorization.py [배치크기]")
+            print("사용법: python run_vectorization.py [배치크기(파일 수)] [--refresh]")
             sys.exit(1)
     
     print(f"벡터화 시작 (배치 크기: {batch_size})")
@@ -21,6 +24,11 @@ async def main():
     vectorizer = Vectorizer()
     
     try:
+        if refresh:
+            changed = await vectorizer.detect_changed_files()
+            print(f"원본 변경 확인: {changed['checked']}개 중 변경 {changed['changed']}개, "
+                  f"해시 기록 {changed['backfilled']}개, 파일 없음 {changed['missing']}개")
+        
         progress = await vectorizer.vectorize_all(batch_size)
         
         print("\n" + "="*80)
@@ -30,10 +38,17 @@ async def main():
             print(f"{category}: {stats['vectorized']}/{stats['total']} "
                   f"({stats['percentage']:.2f}%)")
         
+        throughput = vectorizer.get_throughput()
+        print(f"\n처리량: 파일 {throughput['files']}개, {throughput['pages']}페이지, {throughput['chunks']}청크 "
+              f"({throughput['pages_per_sec']:.1f} pages/s, {throughput['chunks_per_sec']:.1f} chunks/s)")
+        print(f"임베딩: 계산 {throughput['embeddings_computed']}개, 재사용 {throughput['embeddings_reused']}개, "
+              f"공통 문구 공유 {throughput['embeddings_dedup']}개 (절약한 임베딩 호출), "
+              f"원본 동일 파일 {throughput['files_unchanged']}개")
+        
         print("\n벡터화 완료")
     
     except KeyboardInterrupt:
-        print("\n사용자가 중단했습니다")
+        print("\n사용자가 중단했습니다 (다시 실행하면 남은 작업부터 이어서 처리합니다)")
     except Exception as e:
         print(f"\n오류 발생: {e}")
     finally:
@@ -1,158 +1,456 @@
 # PDF 벡터화 엔진
+import os
+import re
+import time
+import socket
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from datetime import timedelta
 import asyncio
+import multiprocessing
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from concurrent.futures import ThreadPoolExecutor
-import pymupdf4llm
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
-from config import PDF_BASE_PATH, EMBEDDING_MODEL, BATCH_SIZE, MAX_WORKERS
+from config import (
+    PDF_BASE_PATH, PDF_INDEX_PATH, EMBEDDING_MODEL, BATCH_SIZE, MAX_WORKERS,
+    PDF_WORKERS, PIPELINE_QUEUE_SIZE, EMBED_BATCH_CHUNKS, DB_WRITERS, EMBEDDING_STORE_SIZE,
+    JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS
+)
 from chunking import SmartChunker
 from database import DatabaseManager
+from pdf_extract import extract_markdown, file_sha256
+from pdf_index import PdfIndex
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+def text_hash(text: str) -> str:
+    """
+    임베딩 대상 텍스트 해시 (document_chunks.text_hash)
+    유니코드(NFKC)/공백만 다른 텍스트는 같은 해시로 보고 임베딩을 공유합니다.
+    """
+    normalized = _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def _new_stats() -> Dict[str, Any]:
+    return {
+        'files': 0, 'files_unchanged': 0, 'pages': 0, 'chunks': 0,
+        'embeddings_computed': 0, 'embeddings_reused': 0, 'embeddings_dedup': 0, 'chunks_stale': 0
+    }
 
 
 class Vectorizer:
-    """PDF 처리 및 벡터화 (병렬 처리)"""
+    """
+    PDF 처리 및 벡터화 (파이프라인)
+    PDF 추출(프로세스 풀) → 청킹 → 임베딩(여러 파일 묶음) → DB 저장(COPY)
+    각 단계는 크기가 정해진 큐로 연결되어, 모든 코어와 임베딩 모델이 동시에 일하도록 합니다.
+    """
     
     def __init__(self, model_name: str = EMBEDDING_MODEL):
         self.model = SentenceTransformer(model_name)
         self.chunker = SmartChunker()
         self.db = DatabaseManager()
         self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        # GIL 영향을 받지 않도록 PDF 변환은 별도 프로세스에서 실행 (torch를 물려받지 않도록 spawn)
+        self.pdf_pool = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context('spawn')
+        )
+        self.pdf_index = PdfIndex(PDF_BASE_PATH, PDF_INDEX_PATH)
+        # 텍스트 해시 → 임베딩 (LRU). 유의사항/소득·자산 기준표 등 공고문 간 공통 문구는 한 번만 임베딩합니다.
+        self.embedding_store: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.stats = {**_new_stats(), 'elapsed': 0.0}
+        # 작업 원장에 기록하는 워커 ID (여러 수집 워커 동시 실행 시 구분)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
     
-    def find_pdf_file(self, file_name: str, category: str) -> Optional[Path]:
-        """PDF 파일 찾기 (공고 or 공고문만, 팸플릿 제외)"""
+    @staticmethod
+    def is_target_file(file_name: str) -> bool:
+        """벡터화 대상 파일 여부 (공고 or 공고문만, 팸플릿 제외)"""
         # 팸플릿 제외
         if '팸플릿' in file_name or '팜플렛' in file_name:
-            return None
+            return False
 
         # 공고 또는 공고문만 처리
-        if '공고문' not in file_name and '공고' not in file_name:
+        return '공고문' in file_name or '공고' in file_name
+    
+    def find_pdf_file(self, file_name: str, category: str, file_path: Optional[str] = None) -> Optional[Path]:
+        """PDF 파일 찾기 (공고 or 공고문만, 팸플릿 제외)"""
+        if not self.is_target_file(file_name):
             return None
         
-        folder = 'LH_sale_서울.경기' if category == 'sale' else 'LH_lease_서울.경기'
-        search_path = PDF_BASE_PATH / folder
+        # DB에 저장된 경로가 유효하면 그대로 사용
+        if file_path and Path(file_path).exists():
+            return Path(file_path)
         
-        for pdf_path in search_path.rglob('*.pdf'):
-            if pdf_path.name == file_name:
-                return pdf_path
-        return None
+        folder = 'LH_sale_서울.경기' if category == 'sale' else 'LH_lease_서울.경기'
+        return self.pdf_index.lookup(folder, file_name)
     
     def extract_text_from_pdf(self, pdf_path: Path) -> str:
         """PDF에서 마크다운 추출"""
-        return pymupdf4llm.to_markdown(str(pdf_path))
+        return ''.join(extract_markdown(str(pdf_path))['page_texts'])
     
-    def create_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
-        """배치 임베딩 생성"""
-        embeddings = self.model.encode(
+    def create_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """배치 임베딩 생성 (float32 배열 그대로 반환, DB 저장 시 바이너리로 전송)"""
+        return self.model.encode(
             texts, normalize_embeddings=True,
             show_progress_bar=False, batch_size=BATCH_SIZE
         )
-        return [emb.tolist() for emb in embeddings]
     
-    async def process_pdf(self, file_record: Dict[str, Any], announcement_category: str) -> Dict[str, Any]:
-        """PDF 파일 처리"""
-        file_id = file_record['id']
-        file_name = file_record['file_name']
-        announcement_id = file_record['announcement_id']
+    # ------------------------------------------------------------------
+    # 파이프라인 단계
+    # job: 파일 하나의 처리 상태 {'announcement_id', 'file_id', 'file_name', 'pdf_path', 'page_texts', 'chunks', ...}
+    # 각 단계는 큐에서 job을 꺼내 처리 후 다음 큐에 넣고, 종료 시 None을 다음 단계로 전달합니다.
+    # 파일 하나의 오류는 실패 결과로 기록하고 넘어가며, 종료 신호(None)는 finally에서 항상 보냅니다.
+    # (한 단계가 신호 없이 끝나면 다음 단계가 큐를 계속 기다려 실행 전체가 멈추므로)
+    # ------------------------------------------------------------------
+    async def _extract_stage(self, jobs: List[Dict[str, Any]], out_queue: asyncio.Queue):
+        """PDF → 마크다운 (프로세스 풀, 동시 PDF_WORKERS개)"""
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(PDF_WORKERS)
         
-        pdf_path = self.find_pdf_file(file_name, announcement_category)
-        
-        if not pdf_path or not pdf_path.exists():
-            return {'success': False, 'file_name': file_name, 'error': 'PDF not found'}
+        async def extract(job):
+            try:
+                extracted = await loop.run_in_executor(
+                    self.pdf_pool, extract_markdown, str(job['pdf_path']), job['stored_hash']
+                )
+                job.update(extracted)
+                if job.get('unchanged'):
+                    # 원본이 같으면 기존 청크를 그대로 두고 완료 표시만
+                    await self.db.mark_file_vectorized(job['file_id'])
+                    await self._finish_file(job)
+                else:
+                    await out_queue.put(job)
+            except Exception as e:
+                await self._finish_file(job, error=f"PDF 추출 실패: {e}")
+            finally:
+                slots.release()
         
+        tasks = []
         try:
-            loop = asyncio.get_event_loop()
-            
-            # PDF 텍스트 추출 (병렬 처리)
-            md_text = await loop.run_in_executor(self.executor, self.extract_text_from_pdf, pdf_path)
-            
-            # 텍스트 청킹
-            chunk_infos = self.chunker.chunk_markdown(md_text)
-            
-            if not chunk_infos:
-                return {'success': False, 'file_name': file_name, 'error': 'No meaningful chunks'}
-            
-            # 배치 임베딩 생성
-            enriched_texts = [chunk['enriched_text'] for chunk in chunk_infos]
-            embeddings = await loop.run_in_executor(self.executor, self.create_embeddings_batch, enriched_texts)
+            for job in jobs:
+                # 다음 단계 큐가 차 있으면 여기서 대기 (메모리 상한)
+                await slots.acquire()
+                tasks.append(asyncio.create_task(extract(job)))
+            await asyncio.gather(*tasks)
+        finally:
+            await out_queue.put(None)
+    
+    async def _chunk_stage(self, in_queue: asyncio.Queue, out_queue: asyncio.Queue):
+        """페이지별 마크다운 → 청크"""
+        loop = asyncio.get_running_loop()
+        try:
+            while (job := await in_queue.get()) is not None:
+                try:
+                    job['chunks'] = await loop.run_in_executor(self.executor, self.chunker.chunk_pages, job.pop('page_texts'))
+                except Exception as e:
+                    await self._finish_file(job, error=f"청킹 실패: {e}")
+                    continue
+                if not job['chunks']:
+                    await self._finish_file(job, error='No meaningful chunks')
+                    continue
+                await out_queue.put(job)
+        finally:
+            await out_queue.put(None)
+    
+    async def _embed_stage(self, in_queue: asyncio.Queue, out_queue: asyncio.Queue):
+        """청크 → 임베딩 (대기 중인 여러 파일의 청크를 EMBED_BATCH_CHUNKS개 이상 모아 한 번에 인코딩)"""
+        loop = asyncio.get_running_loop()
+        try:
+            finished = False
+            while not finished:
+                job = await in_queue.get()
+                if job is None:
+                    break
+                batch = [job]
+                total = len(job['chunks'])
+                while total < EMBED_BATCH_CHUNKS and not in_queue.empty():
+                    job = in_queue.get_nowait()
+                    if job is None:
+                        finished = True
+                        break
+                    batch.append(job)
+                    total += len(job['chunks'])
             
-            # DB 저장
-            for idx, (chunk_info, embedding) in enumerate(zip(chunk_infos, embeddings)):
-                metadata = {
-                    'file_name': file_name,
-                    'section': chunk_info['section'],
-                    'has_table': chunk_info['has_table'],
-                    'chunk_length': chunk_info['length']
-                }
+                try:
+                    # 다시 처리하는 파일은 텍스트가 같은 청크의 기존 임베딩을 재사용하고, 바뀐 청크만 인코딩
+                    existing = {}
+                    for job in batch:
+                        for chunk in job['chunks']:
+                            chunk['text_hash'] = text_hash(chunk['enriched_text'])
+                        if job['stored_hash']:
+                            job_existing = await self.db.get_chunk_embeddings(job['file_id'])
+                            new_hashes = {chunk['text_hash'] for chunk in job['chunks']}
+                            self._run_stats['chunks_stale'] += len(job_existing.keys() - new_hashes)
+                            existing.update(job_existing)
                 
-                await self.db.insert_chunk(
-                    announcement_id=announcement_id,
-                    file_id=file_id,
-                    chunk_text=chunk_info['text'],
-                    chunk_index=idx,
-                    embedding=embedding,
-                    metadata=metadata
-                )
-            
-            await self.db.mark_file_vectorized(file_id)
+                    # 다른 공고문에 같은 문구가 있으면 그 임베딩을 사용 (메모리 저장소 → DB 순서로 조회)
+                    shared = {}
+                    for job in batch:
+                        for chunk in job['chunks']:
+                            key = chunk['text_hash']
+                            if key not in existing and key not in shared and key in self.embedding_store:
+                                shared[key] = self.embedding_store[key]
+                                self.embedding_store.move_to_end(key)
+                    lookup = list({
+                        chunk['text_hash'] for job in batch for chunk in job['chunks']
+                        if chunk['text_hash'] not in existing and chunk['text_hash'] not in shared
+                    })
+                    shared.update(await self.db.get_embeddings_by_hash(lookup))
+                
+                    missing = {}
+                    for job in batch:
+                        for chunk in job['chunks']:
+                            if chunk['text_hash'] in existing:
+                                self._run_stats['embeddings_reused'] += 1
+                            elif chunk['text_hash'] in shared:
+                                self._run_stats['embeddings_dedup'] += 1
+                            else:
+                                missing.setdefault(chunk['text_hash'], chunk['enriched_text'])
+                
+                    computed = {}
+                    if missing:
+                        embeddings = await loop.run_in_executor(self.executor, self.create_embeddings_batch, list(missing.values()))
+                        computed = dict(zip(missing.keys(), embeddings))
+                        self._run_stats['embeddings_computed'] += len(missing)
+                    existing.update(shared)
+                    self._remember_embeddings(computed)
+                    self._remember_embeddings(shared)
+                except Exception as e:
+                    for job in batch:
+                        await self._finish_file(job, error=f"임베딩 실패: {e}")
+                    continue
             
-            return {'success': True, 'file_name': file_name, 'chunks_count': len(chunk_infos)}
-        
-        except Exception as e:
-            return {'success': False, 'file_name': file_name, 'error': str(e)}
+                for job in batch:
+                    try:
+                        job['embeddings'] = [
+                            computed[chunk['text_hash']] if chunk['text_hash'] in computed else existing[chunk['text_hash']]
+                            for chunk in job['chunks']
+                        ]
+                    except Exception as e:
+                        await self._finish_file(job, error=f"임베딩 실패: {e}")
+                        continue
+                    await out_queue.put(job)
+        finally:
+            for _ in range(DB_WRITERS):
+                await out_queue.put(None)
     
-    async def process_announcement(self, announcement: Dict[str, Any]) -> Dict[str, Any]:
-        """공고의 모든 파일 처리"""
-        announcement_id = announcement['id']
-        category = announcement['category']
+    def _remember_embeddings(self, embeddings: Dict[str, np.ndarray]):
+        for key, embedding in embeddings.items():
+            self.embedding_store[key] = embedding
+            self.embedding_store.move_to_end(key)
+        while len(self.embedding_store) > EMBEDDING_STORE_SIZE:
+            self.embedding_store.popitem(last=False)
+    
+    async def _write_stage(self, in_queue: asyncio.Queue):
+        """청크 + 임베딩 → DB (COPY, 파일 단위 트랜잭션)"""
+        while (job := await in_queue.get()) is not None:
+            try:
+                chunks = [
+                    {
+                        'chunk_text': chunk_info['text'],
+                        'chunk_index': idx,
+                        'embedding': embedding,
+                        'text_hash': chunk_info['text_hash'],
+                        'metadata': {
+                            'file_name': job['file_name'],
+                            'section': chunk_info['section'],
+                            'has_table': chunk_info['has_table'],
+                            'chunk_length': chunk_info['length']
+                        }
+                    }
+                    for idx, (chunk_info, embedding) in enumerate(zip(job['chunks'], job['embeddings']))
+                ]
+                # 작업 완료 기록과 청크 저장을 한 트랜잭션으로 (lease를 잃었으면 저장하지 않음)
+                saved = await self.db.save_file_chunks(
+                    job['announcement_id'], job['file_id'], chunks, job.get('content_hash'), worker=self.worker_id
+                )
+            except Exception as e:
+                await self._finish_file(job, error=f"DB 저장 실패: {e}")
+                continue
+            if saved is None:
+                self._lease_lost(job)
+                continue
+            await self._finish_file(job, recorded=True)
+    
+    def _lease_lost(self, job: Dict[str, Any]):
+        """lease가 지나 다른 워커가 가져간 작업: 이 워커의 결과는 버림"""
+        print(f"[Warning] 작업 lease 만료로 결과를 버립니다: {job['file_name']} (file_id={job['file_id']})")
+        job['summary']['results'].append({'success': False, 'file_name': job['file_name'], 'error': 'lease expired'})
+    
+    async def _finish_file(self, job: Dict[str, Any], error: Optional[str] = None, skipped: bool = False,
+                           recorded: bool = False):
+        """
+        파일 처리 결과를 작업 원장과 요약에 기록
+        - recorded: 작업 원장에 이미 기록된 경우 (save_file_chunks 트랜잭션에서 done 처리)
+        """
+        if skipped:
+            state, chunks_count = 'skipped', None
+        elif error is None:
+            state, chunks_count = 'done', 0 if job.get('unchanged') else len(job['chunks'])
+        else:
+            state, chunks_count = 'failed', None
+        if not recorded:
+            try:
+                finished = await self.db.finish_job(
+                    job['file_id'], self.worker_id, state, error=error, chunks_count=chunks_count
+                )
+            except Exception as e:
+                # 원장 기록 실패: 작업은 running으로 남고 lease가 지나면 다시 처리됩니다
+                print(f"[Error] 작업 결과 기록 실패: {job['file_name']} (file_id={job['file_id']}): {e}")
+                job['summary']['results'].append({'success': False, 'file_name': job['file_name'], 'error': f"작업 기록 실패: {e}"})
+                return
+            if not finished:
+                self._lease_lost(job)
+                return
         
-        files = await self.db.get_announcement_files(announcement_id)
+        summary = job['summary']
+        if skipped:
+            summary['results'].append({'success': True, 'file_name': job['file_name'], 'chunks_count': 0, 'skipped': True})
+            summary['files_processed'] += 1
+        elif error is None and job.get('unchanged'):
+            summary['results'].append({'success': True, 'file_name': job['file_name'], 'chunks_count': 0, 'unchanged': True})
+            summary['files_processed'] += 1
+            self._run_stats['files_unchanged'] += 1
+        elif error is None:
+            summary['results'].append({'success': True, 'file_name': job['file_name'], 'chunks_count': chunks_count})
+            summary['files_processed'] += 1
+            summary['total_chunks'] += chunks_count
+            self._run_stats['files'] += 1
+            self._run_stats['pages'] += job.get('pages', 0)
+            self._run_stats['chunks'] += chunks_count
+        else:
+            summary['results'].append({'success': False, 'file_name': job['file_name'], 'error': error})
+    
+    async def run_pipeline(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        파일 목록을 파이프라인으로 처리 (공고별 결과 반환)
+        - files: [{'id', 'announcement_id', 'title', 'category', 'file_name', 'file_path', 'content_hash'}, ...]
+        - 공고의 모든 파일 작업이 done/skipped가 되면 공고를 벡터화 완료로 표시합니다.
+        """
+        start = time.perf_counter()
+        self._run_stats = _new_stats()
+        summaries, jobs, found_paths = {}, [], []
         
-        if not files:
-            return {
-                'success': True, 'announcement_id': announcement_id,
-                'files_processed': 0, 'total_chunks': 0
+        for file_record in files:
+            announcement_id = file_record['announcement_id']
+            if announcement_id not in summaries:
+                summaries[announcement_id] = {
+                    'success': True,
+                    'announcement_id': announcement_id,
+                    'title': file_record['title'],
+                    'files_processed': 0,
+                    'total_files': 0,
+                    'total_chunks': 0,
+                    'results': []
+                }
+            summary = summaries[announcement_id]
+            summary['total_files'] += 1
+            
+            job = {
+                'announcement_id': announcement_id,
+                'file_id': file_record['id'],
+                'file_name': file_record['file_name'],
+                'stored_hash': file_record.get('content_hash'),
+                'summary': summary
             }
+            if not self.is_target_file(file_record['file_name']):
+                await self._finish_file(job, skipped=True)
+                continue
+            job['pdf_path'] = self.find_pdf_file(
+                file_record['file_name'], file_record['category'], file_record.get('file_path')
+            )
+            if not job['pdf_path'] or not job['pdf_path'].exists():
+                await self._finish_file(job, error='PDF not found')
+                continue
+            if str(job['pdf_path']) != file_record.get('file_path'):
+                found_paths.append((file_record['id'], str(job['pdf_path'])))
+            jobs.append(job)
         
-        results = []
-        for file_record in files:
-            result = await self.process_pdf(file_record, category)
-            results.append(result)
-
-        success_count = sum(1 for r in results if r['success'])
-        total_chunks = sum(r.get('chunks_count', 0) for r in results if r['success'])
-
-        # Always mark as vectorized after processing
-        # This prevents infinite loops for announcements with no processable files
-        await self.db.mark_announcement_vectorized(announcement_id)
+        await self.db.update_file_paths(found_paths)
         
-        return {
-            'success': success_count == len(files),
-            'announcement_id': announcement_id,
-            'title': announcement['title'],
-            'files_processed': success_count,
-            'total_files': len(files),
-            'total_chunks': total_chunks,
-            'results': results
-        }
+        if jobs:
+            chunk_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            embed_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            write_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            await asyncio.gather(
+                self._extract_stage(jobs, chunk_queue),
+                self._chunk_stage(chunk_queue, embed_queue),
+                self._embed_stage(embed_queue, write_queue),
+                *(self._write_stage(write_queue) for _ in range(DB_WRITERS))
+            )
+        
+        elapsed = time.perf_counter() - start
+        for key, value in self._run_stats.items():
+            self.stats[key] += value
+        self.stats['elapsed'] += elapsed
+        if self._run_stats['files']:
+            print(f"[처리량] 파일 {self._run_stats['files']}개, {elapsed:.1f}초: "
+                  f"{self._run_stats['pages'] / elapsed:.1f} pages/s, {self._run_stats['chunks'] / elapsed:.1f} chunks/s")
+        if self._run_stats['files_unchanged'] or self._run_stats['embeddings_reused'] or self._run_stats['embeddings_dedup']:
+            print(f"[증분] 원본 동일 파일 {self._run_stats['files_unchanged']}개 건너뜀, "
+                  f"임베딩 재사용 {self._run_stats['embeddings_reused']}개 / 공통 문구 {self._run_stats['embeddings_dedup']}개 / "
+                  f"계산 {self._run_stats['embeddings_computed']}개, "
+                  f"삭제된 청크 {self._run_stats['chunks_stale']}개")
+        
+        await self.db.complete_announcements(list(summaries))
+        for summary in summaries.values():
+            summary['success'] = summary['files_processed'] == summary['total_files']
+        return list(summaries.values())
+    
+    async def process_announcement(self, announcement: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        공고의 모든 파일 처리
+        작업 원장에 등록하고 가져온 파일만 처리합니다. (실패 파일이 있으면 공고는 미완료로 유지)
+        """
+        files = await self.db.get_announcement_files(announcement['id'])
+        if not files:
+            return {'success': True, 'announcement_id': announcement['id'], 'files_processed': 0, 'total_chunks': 0}
+        
+        await self.db.enqueue_jobs(announcement['id'])
+        claimed = await self.db.claim_jobs(
+            len(files), self.worker_id, JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS, announcement_id=announcement['id']
+        )
+        results = await self.run_pipeline(claimed)
+        if not results:
+            # 다른 워커가 처리 중이거나 재시도 횟수를 모두 쓴 파일만 남은 경우
+            return {'success': False, 'announcement_id': announcement['id'], 'files_processed': 0,
+                    'total_files': len(files), 'total_chunks': 0, 'results': []}
+        return results[0]
     
     async def vectorize_batch(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """배치 벡터화"""
-        announcements = await self.db.get_unvectorized_announcements(limit)
+        """배치 벡터화 (작업 원장에서 파일 limit개를 가져와 하나의 파이프라인으로 처리)"""
+        files = await self.db.claim_jobs(limit, self.worker_id, JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS)
         
-        if not announcements:
+        if not files:
             return []
         
-        results = []
-        for announcement in announcements:
-            result = await self.process_announcement(announcement)
-            results.append(result)
-        
-        return results
+        return await self.run_pipeline(files)
+    
+    async def print_progress(self):
+        """전체 진행률 / 처리 속도 / 예상 남은 시간 (모든 워커 합산)"""
+        progress = await self.db.get_job_progress(JOB_MAX_ATTEMPTS)
+        # 최근 처리 기록이 없으면 이 워커의 누적 속도로 계산
+        rate = progress['files_per_sec'] or (self.stats['files'] + self.stats['files_unchanged']) / (self.stats['elapsed'] or 1e-9)
+        left = progress['remaining'] + progress['running']
+        eta = str(timedelta(seconds=int(left / rate))) if rate > 0 and left else '-'
+        percentage = progress['finished'] / progress['total'] * 100 if progress['total'] else 100.0
+        print(f"[진행] {progress['finished']}/{progress['total']} 파일 ({percentage:.1f}%) | "
+              f"대기 {progress['remaining']} · 처리 중 {progress['running']} (워커 {progress['workers']}) · "
+              f"실패 {progress['failed']} | {rate * 60:.1f} 파일/분 | 남은 시간 {eta}")
     
     async def vectorize_all(self, batch_size: int = 10):
-        """전체 벡터화"""
+        """
+        전체 벡터화 (작업 원장 기반, 중단 후 다시 실행하면 남은 작업부터 이어서 처리)
+        같은 DB에 여러 프로세스로 실행하면 작업을 나눠 처리합니다.
+        """
+        enqueued = await self.db.enqueue_jobs()
+        if enqueued:
+            print(f"작업 등록: 파일 {enqueued}개")
+        
         while True:
             results = await self.vectorize_batch(batch_size)
             if not results:
@@ -170,10 +468,44 @@ class Vectorizer:
                     for file_result in result.get('results', []):
                         if not file_result['success']:
                             print(f"  실패: {file_result['file_name']} - {file_result.get('error', 'Unknown')}")
+            
+            await self.print_progress()
         
         progress = await self.db.get_vectorization_progress()
         return progress
     
+    async def detect_changed_files(self) -> Dict[str, int]:
+        """
+        벡터화 완료 파일의 원본 해시를 다시 계산해, 바뀐 파일(재게시된 공고문)을 다시 벡터화 대상으로 표시합니다.
+        해시가 없는(해시 컬럼 추가 전에 처리된) 파일은 현재 해시만 기록합니다.
+        """
+        loop = asyncio.get_running_loop()
+        files = await self.db.get_vectorized_files()
+        changed, backfill, missing = [], [], 0
+        for file_record in files:
+            if not Path(file_record['file_path']).exists():
+                missing += 1
+                continue
+            content_hash = await loop.run_in_executor(self.executor, file_sha256, file_record['file_path'])
+            if file_record['content_hash'] is None:
+                backfill.append((file_record['id'], content_hash))
+            elif content_hash != file_record['content_hash']:
+                changed.append(file_record['id'])
+        
+        await self.db.update_content_hashes(backfill)
+        await self.db.reset_files_vectorized(changed)
+        return {'checked': len(files), 'changed': len(changed), 'backfilled': len(backfill), 'missing': missing}
+    
+    def get_throughput(self) -> Dict[str, float]:
+        """누적 처리량 (pages/sec, chunks/sec)"""
+        elapsed = self.stats['elapsed'] or 1e-9
+        return {
+            **self.stats,
+            'pages_per_sec': self.stats['pages'] / elapsed,
+            'chunks_per_sec': self.stats['chunks'] / elapsed
+        }
+    
     def close(self):
         """리소스 정리"""
         self.executor.shutdown(wait=True)
+        self.pdf_pool.shutdown(wait=True)